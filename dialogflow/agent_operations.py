@@ -1,7 +1,14 @@
 # Importing the required Libraries from dialogflowcx_v3
-from google.cloud.dialogflowcx_v3 import AgentsClient, ExportAgentRequest
+from google.cloud.dialogflowcx_v3 import AgentsClient, AgentsAsyncClient, ExportAgentRequest
 from google.cloud.dialogflowcx_v3.types.agent import Agent
 
+try:
+    # Reports the calls to the sinks of final/instrumentation.py when that folder is on the PYTHONPATH.
+    from instrumentation import instrumented
+except ImportError:
+    def instrumented(service, operation=None):
+        return lambda function: function
+
 """
 Create Dialogflow CX Agent with the Parameters provided:
  - project_id - Google Cloud Project in which the Agent will be created
@@ -15,6 +22,7 @@ google.cloud.dialogflowcx_v3.types.Agent
 It contains the system generated name of the agent with the format 
 - projects/<project_id>/locations/<location>/agents/<Unique ID for agent>
 """
+@instrumented('dialogflow')
 def create_agent(project_id:str, location:str, agent_name:str, language_code:str, time_zone:str):
     parent = f"projects/{project_id}/locations/{location}"
     agents_client = AgentsClient()
@@ -35,6 +43,7 @@ Delete the Dialogflow CX Agent with the Parameters provided:
  - projects/<project_id>/locations/<location>/agents/<Unique ID created for the agent>
 The function returns None
 """
+@instrumented('dialogflow')
 def delete_agent(agent_name:str):
     agents_client = AgentsClient()
     response = agents_client.delete_agent(name=agent_name)
@@ -48,6 +57,7 @@ The Parameters required are:
 The function returns the list of Agent created as an object of type 
 google.cloud.dialogflowcx_v3.services.agents.pagers.ListAgentsPager
 """
+@instrumented('dialogflow')
 def list_agents(project_id:str, location:str):
     parent = f"projects/{project_id}/locations/{location}"
     agents_client = AgentsClient()
@@ -65,6 +75,7 @@ google.api_core.operation.Operation
 The result of the operation is an object of type 
 google.cloud.dialogflowcx_v3.types.agent.ExportAgentResponse
 """
+@instrumented('dialogflow')
 def export_agent(agent_name:str):
     agents_client = AgentsClient()
     request = ExportAgentRequest(name=agent_name)
@@ -73,4 +84,22 @@ def export_agent(agent_name:str):
     print("Waiting for the Operation to complete")
 
     response = export_operation.result()
-    return response
\ No newline at end of file
+    return response
+
+"""
+Exports the Dialogflow CX Agent without blocking the event loop. Same parameters as export_agent, plus
+ - timeout - Seconds to wait for the long running operation, or None to wait indefinitely
+ - client - An AgentsAsyncClient to use instead of a new one
+The function is a coroutine returning an object of type 
+google.cloud.dialogflowcx_v3.types.agent.ExportAgentResponse
+"""
+@instrumented('dialogflow')
+async def export_agent_async(agent_name:str, timeout:float=None, client:AgentsAsyncClient=None):
+    agents_client = client or AgentsAsyncClient()
+    request = ExportAgentRequest(name=agent_name)
+
+    export_operation = await agents_client.export_agent(request=request)
+    print("Waiting for the Operation to complete")
+
+    response = await export_operation.result(timeout=timeout)
+    return response
@@ -0,0 +1,45 @@
+from google.cloud.dialogflowcx_v3 import SessionsAsyncClient
+from google.cloud.dialogflowcx_v3.services.sessions.transports import SessionsGrpcAsyncIOTransport
+from conversation import CHANNEL_OPTIONS, api_endpoint, detect_intent_request, parse_query_result
+import asyncio
+
+
+def create_async_sessions_client(endpoint: str, channel=None):
+    """
+    Returns a new SessionsAsyncClient for the endpoint, on a grpc.aio channel with keep-alive.
+    `channel` replaces that channel, e.g. with an insecure channel to a local server.
+    """
+    if channel is None:
+        channel = SessionsGrpcAsyncIOTransport.create_channel(endpoint, options=CHANNEL_OPTIONS)
+    return SessionsAsyncClient(transport=SessionsGrpcAsyncIOTransport(host=endpoint, channel=channel))
+
+
+class AsyncConversations:
+    """
+    Drives many Dialogflow CX sessions of one agent from a single event loop, over one gRPC channel.
+
+    At most `max_concurrency` requests are in flight at once; the others wait their turn.
+    Each request has a deadline of `timeout` seconds, after which it fails with DeadlineExceeded.
+    Must be created and used inside the same running event loop.
+    """
+    def __init__(self, agent: str, language_code: str, max_concurrency: int = 100, timeout: float = 10, client: SessionsAsyncClient = None) -> None:
+        self.agent = agent
+        self.language_code = language_code
+        self.timeout = timeout
+        self.client = client or create_async_sessions_client(api_endpoint(agent))
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def detect_intent_text(self, session_id: str, text: str):
+        """
+        Returns the result of detect intent with text as input, as a DetectIntentResult.
+
+        Using the same `session_id` between requests allows continuation
+        of the conversation.
+        """
+        request = detect_intent_request(self.agent, session_id, text, self.language_code)
+        async with self._semaphore:
+            response = await self.client.detect_intent(request=request, timeout=self.timeout)
+        return parse_query_result(response.query_result)
+
+    async def close(self):
+        await self.client.transport.close()
@@ -0,0 +1,166 @@
+"""
+Local benchmarks against a fake Dialogflow CX server, without Google Cloud credentials.
+
+Usage:
+    python3 benchmark.py pooled [--calls 200]
+    python3 benchmark.py async [--turns 3] [--latency 0.02] [--max-concurrency 500]
+    python3 benchmark.py streaming [--runs 20] [--chunks 10] [--latency 0.1]
+"""
+from google.cloud.dialogflowcx_v3 import AgentsAsyncClient
+from google.cloud.dialogflowcx_v3.services.agents.transports import AgentsGrpcAsyncIOTransport
+from async_conversation import AsyncConversations, create_async_sessions_client
+from conversation import create_sessions_client, detect_intent_text
+from agent_operations import export_agent_async
+from streaming import streaming_detect_intent
+from fake_dialogflow import FakeSessionsServer
+from time import perf_counter, sleep
+import argparse
+import asyncio
+import grpc
+
+AGENT = "projects/fake-project/locations/global/agents/fake-agent"
+LANGUAGE = "pt-br"
+
+
+def percentile(timings: list, fraction: float):
+    ordered = sorted(timings)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def print_timings(name: str, timings: list):
+    print(
+        f"{name:<8} p50 {percentile(timings, 0.5) * 1000:7.2f}ms  "
+        f"p95 {percentile(timings, 0.95) * 1000:7.2f}ms  "
+        f"p99 {percentile(timings, 0.99) * 1000:7.2f}ms"
+    )
+
+
+def benchmark_pooled(args):
+    server = FakeSessionsServer().start()
+
+    cold = []
+    for index in range(args.calls):
+        start = perf_counter()
+        # What prototype.detect_intent_text used to do: a new client and channel per call.
+        client = create_sessions_client(server.address, grpc.insecure_channel(server.address))
+        detect_intent_text(AGENT, f"session-{index}", "Oi", LANGUAGE, client)
+        cold.append(perf_counter() - start)
+        client.transport.close()
+
+    pooled = []
+    client = create_sessions_client(server.address, grpc.insecure_channel(server.address))
+    for index in range(args.calls):
+        start = perf_counter()
+        detect_intent_text(AGENT, f"session-{index}", "Oi", LANGUAGE, client)
+        pooled.append(perf_counter() - start)
+
+    server.stop()
+
+    print(f"{args.calls} detect_intent calls against a local server (no TLS, so the cold cost is a lower bound).")
+    print_timings("cold", cold)
+    print_timings("pooled", pooled)
+
+
+def benchmark_async(args):
+    server = FakeSessionsServer(latency=args.latency, max_workers=args.max_concurrency, polls_until_done=3).start()
+    print(f"Conversations of {args.turns} turns, {args.latency * 1000:.0f}ms per detect_intent call.")
+
+    async def run_sessions(sessions):
+        client = create_async_sessions_client(server.address, grpc.aio.insecure_channel(server.address))
+        conversations = AsyncConversations(AGENT, LANGUAGE, args.max_concurrency, client=client)
+
+        async def conversation(session_id):
+            for turn in range(args.turns):
+                await conversations.detect_intent_text(session_id, "Oi")
+
+        start = perf_counter()
+        await asyncio.gather(*(conversation(f"session-{index}") for index in range(sessions)))
+        elapsed = perf_counter() - start
+        await conversations.close()
+        return elapsed
+
+    for sessions in (10, 100, 1000):
+        elapsed = asyncio.run(run_sessions(sessions))
+        print(f"sessions={sessions:>4}: {sessions * args.turns / elapsed:8.1f} turns/s")
+
+    async def export():
+        transport = AgentsGrpcAsyncIOTransport(host=server.address, channel=grpc.aio.insecure_channel(server.address))
+        client = AgentsAsyncClient(transport=transport)
+        start = perf_counter()
+        # The export is awaited while sessions keep being served on the same loop.
+        export_task = asyncio.create_task(export_agent_async(AGENT, timeout=60, client=client))
+        conversations = AsyncConversations(
+            AGENT, LANGUAGE, args.max_concurrency,
+            client=create_async_sessions_client(server.address, grpc.aio.insecure_channel(server.address))
+        )
+        await asyncio.gather(*(conversations.detect_intent_text(f"session-{index}", "Oi") for index in range(100)))
+        turns_elapsed = perf_counter() - start
+        await export_task
+        print(f"100 turns served in {turns_elapsed:.2f}s while waiting {perf_counter() - start:.2f}s for an agent export.")
+        await conversations.close()
+        await transport.close()
+
+    asyncio.run(export())
+    server.stop()
+
+
+CHUNK_SECONDS = 0.1
+AUDIO_CHUNK = b"\0" * 3200 # 100ms of 16kHz 16-bit mono audio.
+
+
+def recorded_audio(chunks: int):
+    """ Yields audio chunks at the pace they would come from a microphone. """
+    for index in range(chunks):
+        sleep(CHUNK_SECONDS)
+        yield AUDIO_CHUNK
+
+
+def benchmark_streaming(args):
+    server = FakeSessionsServer(latency=args.latency).start()
+    client = create_sessions_client(server.address, grpc.insecure_channel(server.address))
+    print(f"{args.runs} utterances of {args.chunks * CHUNK_SECONDS:.1f}s, {args.latency * 1000:.0f}ms to detect the intent.")
+
+    unary, first_partial, streamed = [], [], []
+    for run in range(args.runs):
+        # Unary: the utterance is recorded in full, then sent (as text, the fake server answers both the same way).
+        start = perf_counter()
+        list(recorded_audio(args.chunks))
+        detect_intent_text(AGENT, f"unary-{run}", "Oi", LANGUAGE, client)
+        unary.append(perf_counter() - start)
+
+        start = perf_counter()
+        first = None
+        for result in streaming_detect_intent(AGENT, f"streaming-{run}", recorded_audio(args.chunks), LANGUAGE, client=client):
+            if first is None:
+                first = perf_counter() - start
+        first_partial.append(first)
+        streamed.append(perf_counter() - start)
+
+    server.stop()
+    print_timings("unary", unary)
+    print_timings("partial", first_partial)
+    print_timings("stream", streamed)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    pooled_parser = subparsers.add_parser('pooled', help="Per-call latency with a new client per call versus a pooled client.")
+    pooled_parser.add_argument('--calls', type=int, default=200)
+    pooled_parser.set_defaults(run=benchmark_pooled)
+
+    async_parser = subparsers.add_parser('async', help="AsyncConversations throughput at 10, 100 and 1000 sessions.")
+    async_parser.add_argument('--turns', type=int, default=3)
+    async_parser.add_argument('--latency', type=float, default=0.02)
+    async_parser.add_argument('--max-concurrency', type=int, default=500)
+    async_parser.set_defaults(run=benchmark_async)
+
+    streaming_parser = subparsers.add_parser('streaming', help="Time to first partial and to final intent, streaming versus unary.")
+    streaming_parser.add_argument('--runs', type=int, default=20)
+    streaming_parser.add_argument('--chunks', type=int, default=10)
+    streaming_parser.add_argument('--latency', type=float, default=0.1)
+    streaming_parser.set_defaults(run=benchmark_streaming)
+
+    args = parser.parse_args()
+    args.run(args)
@@ -0,0 +1,98 @@
+from google.cloud.dialogflowcx_v3 import SessionsClient, AgentsClient
+from google.cloud.dialogflowcx_v3.services.sessions.transports import SessionsGrpcTransport
+from google.cloud.dialogflowcx_v3.types import session
+from threading import Lock
+from typing import NamedTuple
+
+GLOBAL_API_ENDPOINT = "dialogflow.googleapis.com:443"
+
+# Keeps idle channels open between turns instead of paying a new TLS handshake.
+CHANNEL_OPTIONS = [
+    ("grpc.keepalive_time_ms", 30000),
+    ("grpc.keepalive_timeout_ms", 10000),
+    ("grpc.keepalive_permit_without_calls", 1),
+    ("grpc.http2.max_pings_without_data", 0),
+    ("grpc.max_send_message_length", -1),
+    ("grpc.max_receive_message_length", -1),
+]
+
+_sessions_clients = {}
+_lock = Lock()
+
+
+class DetectIntentResult(NamedTuple):
+    """ Result of a detect intent turn. """
+    intent: str
+    confidence: float
+    messages: list
+    query_text: str
+
+
+def api_endpoint(agent: str):
+    """ Returns the regional API endpoint of the agent. """
+    location_id = AgentsClient.parse_agent_path(agent)["location"]
+    if location_id == "global":
+        return GLOBAL_API_ENDPOINT
+    return f"{location_id}-dialogflow.googleapis.com:443"
+
+
+def create_sessions_client(endpoint: str, channel=None):
+    """
+    Returns a new SessionsClient for the endpoint, on a gRPC channel with keep-alive.
+    `channel` replaces that channel, e.g. with an insecure channel to a local server.
+    """
+    if channel is None:
+        channel = SessionsGrpcTransport.create_channel(endpoint, options=CHANNEL_OPTIONS)
+    return SessionsClient(transport=SessionsGrpcTransport(host=endpoint, channel=channel))
+
+
+def get_sessions_client(agent: str):
+    """
+    Returns the process-wide SessionsClient for the agent's regional endpoint, creating it on first use.
+    The client and its gRPC channel are thread safe and are reused by every session.
+    """
+    endpoint = api_endpoint(agent)
+
+    client = _sessions_clients.get(endpoint)
+    if client is None:
+        with _lock:
+            client = _sessions_clients.get(endpoint)
+            if client is None:
+                client = create_sessions_client(endpoint)
+                _sessions_clients[endpoint] = client
+
+    return client
+
+
+def detect_intent_request(agent: str, session_id: str, text: str, language_code: str):
+    session_path = f"{agent}/sessions/{session_id}"
+    text_input = session.TextInput(text=text)
+    query_input = session.QueryInput(text=text_input, language_code=language_code)
+    return session.DetectIntentRequest(session=session_path, query_input=query_input)
+
+
+def parse_query_result(query_result):
+    """ Builds a DetectIntentResult from the query result of a response. """
+    response_messages = [
+        " ".join(msg.text.text) for msg in query_result.response_messages
+    ]
+
+    return DetectIntentResult(
+        intent=query_result.intent.display_name,
+        confidence=round(float(query_result.intent_detection_confidence), 2),
+        messages=response_messages,
+        query_text=query_result.text,
+    )
+
+
+def detect_intent_text(agent: str, session_id: str, text: str, language_code: str, client: SessionsClient = None):
+    """
+    Returns the result of detect intent with text as input, as a DetectIntentResult.
+
+    Using the same `session_id` between requests allows continuation
+    of the conversation. Uses the pooled client of the agent's region unless `client` is given.
+    """
+    client = client or get_sessions_client(agent)
+    request = detect_intent_request(agent, session_id, text, language_code)
+    response = client.detect_intent(request=request)
+    return parse_query_result(response.query_result)
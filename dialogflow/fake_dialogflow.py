@@ -0,0 +1,127 @@
+from google.cloud.dialogflowcx_v3.types import session
+from google.cloud.dialogflowcx_v3.types.agent import ExportAgentRequest, ExportAgentResponse
+from google.longrunning import operations_pb2
+from concurrent.futures import ThreadPoolExecutor
+from time import sleep
+import grpc
+
+SESSIONS_SERVICE = "google.cloud.dialogflow.cx.v3.Sessions"
+AGENTS_SERVICE = "google.cloud.dialogflow.cx.v3.Agents"
+OPERATIONS_SERVICE = "google.longrunning.Operations"
+
+
+def fake_response(text: str, intent: str = "Greeting", confidence: float = 0.95):
+    """ A DetectIntentResponse matching `text` to `intent`. """
+    query_result = session.QueryResult(
+        text=text,
+        intent={"display_name": intent},
+        intent_detection_confidence=confidence,
+        response_messages=[{"text": {"text": [f"Echo: {text}"]}}],
+    )
+    return session.DetectIntentResponse(query_result=query_result)
+
+
+class FakeSessionsServer:
+    """
+    Local stand-in for the Dialogflow CX Sessions gRPC service, listening without TLS on localhost.
+    Every DetectIntent call sleeps `latency` seconds and is counted in `calls`.
+
+    StreamingDetectIntent answers each audio chunk with a partial transcript of one more word, and the
+    end of the audio with a final transcript followed by the detect intent response after `latency`.
+
+    Also serves Agents.ExportAgent as a long running operation that is done after `polls_until_done`
+    GetOperation calls.
+    """
+    def __init__(self, latency: float = 0.0, max_workers: int = 32, polls_until_done: int = 0) -> None:
+        self.latency = latency
+        self.polls_until_done = polls_until_done
+        self.calls = 0
+        self._operations = {}
+        self.server = grpc.server(ThreadPoolExecutor(max_workers=max_workers))
+        self.server.add_generic_rpc_handlers((
+            grpc.method_handlers_generic_handler(SESSIONS_SERVICE, self._handlers()),
+            grpc.method_handlers_generic_handler(AGENTS_SERVICE, self._agents_handlers()),
+            grpc.method_handlers_generic_handler(OPERATIONS_SERVICE, self._operations_handlers()),
+        ))
+        self.port = self.server.add_insecure_port("localhost:0")
+        self.address = f"localhost:{self.port}"
+
+    def _handlers(self):
+        return {
+            "DetectIntent": grpc.unary_unary_rpc_method_handler(
+                self.detect_intent,
+                request_deserializer=session.DetectIntentRequest.deserialize,
+                response_serializer=session.DetectIntentResponse.serialize,
+            ),
+            "StreamingDetectIntent": grpc.stream_stream_rpc_method_handler(
+                self.streaming_detect_intent,
+                request_deserializer=session.StreamingDetectIntentRequest.deserialize,
+                response_serializer=session.StreamingDetectIntentResponse.serialize,
+            ),
+        }
+
+    def _agents_handlers(self):
+        return {
+            "ExportAgent": grpc.unary_unary_rpc_method_handler(
+                self.export_agent,
+                request_deserializer=ExportAgentRequest.deserialize,
+                response_serializer=operations_pb2.Operation.SerializeToString,
+            ),
+        }
+
+    def _operations_handlers(self):
+        return {
+            "GetOperation": grpc.unary_unary_rpc_method_handler(
+                self.get_operation,
+                request_deserializer=operations_pb2.GetOperationRequest.FromString,
+                response_serializer=operations_pb2.Operation.SerializeToString,
+            ),
+        }
+
+    def _operation(self, name: str):
+        remaining = self._operations[name]
+        operation = operations_pb2.Operation(name=name, done=remaining <= 0)
+        if operation.done:
+            operation.response.Pack(ExportAgentResponse.pb(ExportAgentResponse(agent_content=b"{}")))
+        return operation
+
+    def export_agent(self, request, context):
+        name = f"{request.name}/operations/export-{len(self._operations)}"
+        self._operations[name] = self.polls_until_done
+        return self._operation(name)
+
+    def get_operation(self, request, context):
+        self._operations[request.name] -= 1
+        return self._operation(request.name)
+
+    def detect_intent(self, request, context):
+        self.calls += 1
+        if self.latency:
+            sleep(self.latency)
+        return fake_response(request.query_input.text.text)
+
+    def start(self):
+        self.server.start()
+        return self
+
+    def stop(self):
+        self.server.stop(grace=None)
+
+    def streaming_detect_intent(self, request_iterator, context):
+        self.calls += 1
+        words = []
+        text = None
+        for request in request_iterator:
+            if request.query_input.text.text:
+                text = request.query_input.text.text
+            elif request.query_input.audio.audio:
+                words.append(f"palavra{len(words)}")
+                yield session.StreamingDetectIntentResponse(recognition_result={"transcript": " ".join(words)})
+
+        if text is None:
+            text = " ".join(words)
+            yield session.StreamingDetectIntentResponse(recognition_result={"transcript": text, "is_final": True})
+
+        if self.latency:
+            sleep(self.latency)
+        yield session.StreamingDetectIntentResponse(detect_intent_response=fake_response(text))
@@ -0,0 +1,104 @@
+from google.cloud.dialogflowcx_v3 import SessionsClient, SessionsAsyncClient
+from google.cloud.dialogflowcx_v3.types import audio_config, session
+from conversation import DetectIntentResult, get_sessions_client, parse_query_result
+from typing import NamedTuple
+import itertools
+
+DEFAULT_SAMPLE_RATE_HERTZ = 16000
+
+
+class StreamingResult(NamedTuple):
+    """
+    One update of a streaming detect intent. Partial updates carry the `transcript` recognized so far;
+    the last update has `is_final` set and the `result` of the turn.
+    """
+    transcript: str
+    is_final: bool
+    result: DetectIntentResult = None
+
+
+def input_audio_config(sample_rate_hertz: int = DEFAULT_SAMPLE_RATE_HERTZ):
+    """ Config for 16-bit linear PCM audio, ending the turn when the user stops speaking. """
+    return audio_config.InputAudioConfig(
+        audio_encoding=audio_config.AudioEncoding.AUDIO_ENCODING_LINEAR_16,
+        sample_rate_hertz=sample_rate_hertz,
+        single_utterance=True,
+    )
+
+
+# With audio, the first request of a stream opens the turn with the audio config
+# and each following request carries a chunk of audio.
+def _audio_config_request(agent: str, session_id: str, language_code: str, config):
+    return session.StreamingDetectIntentRequest(
+        session=f"{agent}/sessions/{session_id}",
+        query_input=session.QueryInput(audio=session.AudioInput(config=config), language_code=language_code),
+    )
+
+
+def _audio_chunk_request(chunk: bytes):
+    return session.StreamingDetectIntentRequest(query_input=session.QueryInput(audio=session.AudioInput(audio=chunk)))
+
+
+def _text_request(agent: str, session_id: str, text: str, language_code: str):
+    # Text input can only be sent in the first request of a stream, so text chunks are sent together.
+    return session.StreamingDetectIntentRequest(
+        session=f"{agent}/sessions/{session_id}",
+        query_input=session.QueryInput(text=session.TextInput(text=text), language_code=language_code),
+    )
+
+
+def _parse_response(response):
+    if response.detect_intent_response:
+        query_result = response.detect_intent_response.query_result
+        return StreamingResult(query_result.transcript or query_result.text, True, parse_query_result(query_result))
+
+    recognition_result = response.recognition_result
+    return StreamingResult(recognition_result.transcript, False)
+
+
+def streaming_detect_intent(agent: str, session_id: str, chunks, language_code: str, text: bool = False,
+                            config=None, client: SessionsClient = None):
+    """
+    Sends `chunks` (an iterator of audio bytes, or of strings with `text`) as they are produced and
+    yields a StreamingResult for every partial recognition, then one with the final intent.
+
+    Audio is sent while it is being recorded, so the answer arrives as soon as recognition ends instead
+    of after the whole utterance is uploaded. Uses the pooled client of the agent's region unless `client` is given.
+    """
+    client = client or get_sessions_client(agent)
+
+    if text:
+        requests = iter([_text_request(agent, session_id, "".join(chunks), language_code)])
+    else:
+        config_request = _audio_config_request(agent, session_id, language_code, config or input_audio_config())
+        requests = itertools.chain([config_request], map(_audio_chunk_request, chunks))
+
+    for response in client.streaming_detect_intent(requests=requests):
+        yield _parse_response(response)
+
+
+async def streaming_detect_intent_async(agent: str, session_id: str, chunks, language_code: str, client: SessionsAsyncClient,
+                                        text: bool = False, config=None):
+    """
+    asyncio variant of streaming_detect_intent. `chunks` can be an async iterator or a regular iterator.
+    """
+    async def chunk_iterator():
+        if hasattr(chunks, '__aiter__'):
+            async for chunk in chunks:
+                yield chunk
+        else:
+            for chunk in chunks:
+                yield chunk
+
+    async def requests():
+        if text:
+            yield _text_request(agent, session_id, "".join([chunk async for chunk in chunk_iterator()]), language_code)
+            return
+
+        yield _audio_config_request(agent, session_id, language_code, config or input_audio_config())
+        async for chunk in chunk_iterator():
+            yield _audio_chunk_request(chunk)
+
+    stream = await client.streaming_detect_intent(requests=requests())
+    async for response in stream:
+        yield _parse_response(response)
@@ -0,0 +1,30 @@
+from async_lex_bot_controller import AsyncLexBotController
+from lex_bot import drop_empty_slots
+
+class AsyncLexBot:
+    """ asyncio counterpart of LexBot for conversations. Many sessions can be served from a single event loop. """
+    def __init__(self, bot_id, bot_name, bot_alias_id, bot_alias_name, bot_locale, runtime=None,
+                 max_connections: int = 50, timeout: float = 10) -> None:
+        self.id = bot_id
+        self.name = bot_name
+        self.alias_id = bot_alias_id
+        self.alias_name = bot_alias_name
+        self.locale = bot_locale
+        self.controller = AsyncLexBotController(
+            bot_id, bot_name, bot_alias_id, bot_alias_name, bot_locale, runtime, max_connections, timeout
+        )
+
+    async def detect_intent_text(self, session_id: str, text: str, session_state: dict = None):
+        """
+        Returns the result of detect intent with text as input.
+
+        Using the same `session_id` between requests allows keeping context of the conversations.
+        Each user should have it's own session id.
+        """
+        session_state = drop_empty_slots(session_state)
+
+        intent, session_state, confidence, bot_response = await self.controller.detect_intent(session_id, text, session_state)
+        return intent, session_state, confidence, bot_response
+
+    def close(self):
+        self.controller.close()
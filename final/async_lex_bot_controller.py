@@ -0,0 +1,44 @@
+from lex_bot_controller import recognize_text_request, parse_recognize_text_response
+from client_registry import get_client
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+
+class AsyncLexBotController:
+    """
+    asyncio counterpart of LexBotController for the runtime API.
+
+    The blocking boto3 'lexv2-runtime' client runs on a dedicated executor with one thread per pooled
+    HTTP connection, so up to `max_connections` turns are in flight at once without blocking the event loop.
+    """
+    def __init__(self, bot_id, bot_name, bot_alias_id, bot_alias_name, bot_locale, runtime=None,
+                 max_connections: int = 50, timeout: float = 10) -> None:
+        self.runtime = runtime or get_client(
+            'lexv2-runtime',
+            max_pool_connections=max_connections,
+            connect_timeout=timeout,
+            read_timeout=timeout
+        )
+        self.executor = ThreadPoolExecutor(max_workers=max_connections, thread_name_prefix='lex-runtime')
+        self.timeout = timeout # Seconds a single recognize_text call may take before raising TimeoutError.
+        self.id = bot_id
+        self.name = bot_name
+        self.alias_id = bot_alias_id
+        self.alias_name = bot_alias_name
+        self.locale = bot_locale
+
+    async def detect_intent(self, session_id, text, session_state: dict = None):
+        """
+        Returns the result of detect intent with text as input. See LexBotController.detect_intent.
+        Raises asyncio.TimeoutError if the call does not finish within the controller timeout.
+        """
+        request_dict = recognize_text_request(self.id, self.alias_id, self.locale, session_id, text, session_state)
+
+        loop = asyncio.get_running_loop()
+        call = loop.run_in_executor(self.executor, lambda: self.runtime.recognize_text(**request_dict))
+        response = await asyncio.wait_for(call, self.timeout)
+
+        return parse_recognize_text_response(response)
+
+    def close(self):
+        """ Stops the executor threads. """
+        self.executor.shutdown(wait=False)
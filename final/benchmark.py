@@ -0,0 +1,457 @@
+"""
+Local benchmarks that run against in-memory fakes, without AWS credentials. fast-path, backends and simulator use
+the text normalization of the notebook model, so the tensorflow folder must be on the PYTHONPATH for them.
+
+Usage:
+    python3 benchmark.py upload [--intents 100] [--latency 0.05] [--max-tps 200]
+    python3 benchmark.py provision [--polls 3] [--latency 0.05]
+    python3 benchmark.py runtime [--turns 3] [--latency 0.05] [--max-connections 100]
+    python3 benchmark.py handles [--bots 100]
+    python3 benchmark.py sessions [--sessions 100000]
+    PYTHONPATH=../tensorflow python3 benchmark.py fast-path [--latency 0.05] [--threshold 0.9] [--model ../tensorflow/models/simple_intent | --exact-match]
+    PYTHONPATH=../tensorflow python3 benchmark.py backends [--requests 500] [--latency 0.05] [--slow-latency 0.5] [--slow-fraction 0.05]
+    python3 benchmark.py hedging [--turns 400] [--latency 0.05] [--slow-latency 2] [--slow-fraction 0.03] [--timeout 1]
+    python3 benchmark.py instrumentation [--intents 100] [--latency 0.002] [--calls 100000]
+    PYTHONPATH=../tensorflow python3 benchmark.py simulator [--conversations 2000] [--rate 1000]
+    python3 benchmark.py catalog [--intents 1000]
+"""
+from async_lex_bot import AsyncLexBot
+from fake_lex import FakeLexModelsClient, FakeLexRuntimeClient
+from fast_path import DEFAULT_MODEL_DIRECTORY, ExactMatchClassifier, LocalFastPath, load_intent_file
+from nlu_backend import AsyncBackendAdapter, AsyncLexBackend, HedgedBackend, LexBackend, LocalBackend
+from instrumentation import InstrumentedClient, StatsSink
+from intent_catalog import IntentCatalog
+from intent_sync import IntentSync
+from lex_bot import LexBot
+from lex_manager import LexManager
+from lex_simulator import LexRuntimeSimulator
+from load_test import load_conversations, run_load_test
+from session_store import InMemorySessionStore
+from concurrent.futures import ThreadPoolExecutor
+from throttling import Throttle
+from time import perf_counter
+import argparse
+import asyncio
+import boto3
+import client_registry
+import contextlib
+import instrumentation
+import io
+import json
+import os
+import tempfile
+
+INTENTS_FILE_PATH = "../AmazonLex/intents/sample.json"
+LOCAL_INTENTS_FILE_PATH = "../tensorflow/data/simple_intent.json"
+CONVERSATIONS_FILE_PATH = "conversations/sample.jsonl"
+
+
+def load_catalog(size: int):
+    """ Builds a catalog of `size` intents by repeating the sample intents under new names. """
+    with open(INTENTS_FILE_PATH, 'r') as json_file:
+        sample = json.load(json_file)
+
+    catalog = {}
+    templates = list(sample.items())
+    for index in range(size):
+        intent_name, intent_data = templates[index % len(templates)]
+        catalog[f"{intent_name}{index}"] = intent_data
+
+    return catalog
+
+
+def benchmark_upload(args):
+    catalog = load_catalog(args.intents)
+    print(f"Uploading {args.intents} intents, {args.latency * 1000:.0f}ms per call, quota of {args.max_tps} calls/s.")
+
+    # The throttle spaces the calls evenly, so more workers than the quota needs add no throttled calls.
+    for workers in (1, 4, 16, 64):
+        client = FakeLexModelsClient(latency=args.latency, max_tps=args.max_tps)
+        throttle = Throttle(rate=args.max_tps, base_delay=0.05)
+        bot = LexBot('BOTID', 'Bot', 'ALIASID', 'Alias', 'pt_BR', client=client, runtime=object(), throttle=throttle)
+        sync = IntentSync(bot.controller, workers=workers)
+
+        start = perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            sync.apply(sync.plan(catalog))
+        elapsed = perf_counter() - start
+
+        print(
+            f"workers={workers:>2}: {elapsed:6.2f}s, {client.total_calls()} calls, "
+            f"{client.throttled} throttled, {throttle.retries} retries"
+        )
+
+
+def benchmark_provision(args):
+    client = FakeLexModelsClient(latency=args.latency, polls_until_ready=args.polls)
+    manager = LexManager('arn:aws:iam::000000000000:role/FakeRole', client=client)
+
+    start = perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        bot_id, bot_alias_id = manager.create_bot('FakeBot', 'TEST', 'pt_BR')
+    elapsed = perf_counter() - start
+
+    describe_calls = sum(calls for operation, calls in client.calls.items() if operation.startswith('describe_'))
+    print(f"Resources ready after {args.polls} polls each, {args.latency * 1000:.0f}ms per call.")
+    print(f"create_bot: {elapsed:.2f}s with {describe_calls} status polls (fixed sleeps took at least 20s).")
+
+
+def benchmark_runtime(args):
+    print(f"Conversations of {args.turns} turns, {args.latency * 1000:.0f}ms per recognize_text call.")
+
+    for sessions in (10, 100, 1000):
+        runtime = FakeLexRuntimeClient(latency=args.latency)
+        bot = LexBot('BOTID', 'Bot', 'ALIASID', 'Alias', 'pt_BR', client=object(), runtime=runtime)
+
+        # The sync path serves one turn at a time, so its throughput does not depend on the number of sessions.
+        sync_turns = min(sessions * args.turns, 50)
+        start = perf_counter()
+        for turn in range(sync_turns):
+            bot.detect_intent_text(f"session-{turn}", "Oi")
+        sync_throughput = sync_turns / (perf_counter() - start)
+
+        async_bot = AsyncLexBot(
+            'BOTID', 'Bot', 'ALIASID', 'Alias', 'pt_BR',
+            runtime=FakeLexRuntimeClient(latency=args.latency), max_connections=args.max_connections
+        )
+
+        async def conversation(session_id):
+            session_state = None
+            for turn in range(args.turns):
+                _, session_state, _, _ = await async_bot.detect_intent_text(session_id, "Oi", session_state)
+
+        async def run_sessions():
+            await asyncio.gather(*(conversation(f"session-{index}") for index in range(sessions)))
+
+        start = perf_counter()
+        asyncio.run(run_sessions())
+        async_throughput = sessions * args.turns / (perf_counter() - start)
+        async_bot.close()
+
+        print(f"sessions={sessions:>4}: sync {sync_throughput:7.1f} turns/s, async {async_throughput:7.1f} turns/s")
+
+
+def benchmark_handles(args):
+    # Client construction does not call AWS, but boto3 needs a region to resolve endpoints.
+    os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+
+    def time_handles(create_handle):
+        timings = []
+        for index in range(args.bots):
+            start = perf_counter()
+            create_handle(index)
+            timings.append(perf_counter() - start)
+        return timings
+
+    def per_object_clients(index):
+        # What every LexBotController used to do.
+        boto3.client('lexv2-models')
+        boto3.client('lexv2-runtime')
+
+    client_registry.clear()
+    shared = time_handles(lambda index: LexBot(f"BOT{index}", 'Bot', 'ALIASID', 'Alias', 'pt_BR'))
+    per_object = time_handles(per_object_clients)
+
+    print(f"Bot handles: {args.bots}")
+    print(f"per-object clients: 1st {per_object[0] * 1000:8.2f}ms, last {per_object[-1] * 1000:8.2f}ms, total {sum(per_object):6.2f}s")
+    print(f"shared clients:     1st {shared[0] * 1000:8.2f}ms, last {shared[-1] * 1000:8.2f}ms, total {sum(shared):6.2f}s")
+
+
+SAMPLE_SESSION_STATE = {
+    'dialogAction': {'type': 'ElicitSlot', 'slotToElicit': 'UserBirthday'},
+    'intent': {
+        'name': 'RegisterUser',
+        'slots': {
+            'UserName': {'value': {'originalValue': 'André Luiz', 'interpretedValue': 'André Luiz', 'resolvedValues': ['André Luiz']}},
+            'UserEmail': {'value': {'originalValue': 'alpsilva.dev@gmail.com', 'interpretedValue': 'alpsilva.dev@gmail.com', 'resolvedValues': []}},
+            'UserGender': {'value': {'originalValue': 'masculino', 'interpretedValue': 'masculino', 'resolvedValues': ['masculino']}},
+            'UserBirthday': None,
+        },
+        'state': 'InProgress',
+        'confirmationState': 'None',
+    },
+    'sessionAttributes': {},
+    'originatingRequestId': '5c3e4b6a-7d4f-4d3e-9b8a-2f1e0d9c8b7a',
+}
+
+
+def benchmark_sessions(args):
+    store = InMemorySessionStore(max_sessions=args.sessions)
+    serialized_state = json.dumps(SAMPLE_SESSION_STATE)
+
+    start = perf_counter()
+    for index in range(args.sessions):
+        # Each session gets its own state object, as it would from recognize_text.
+        store.put(f"session-{index}", json.loads(serialized_state))
+    put_elapsed = perf_counter() - start
+
+    start = perf_counter()
+    for index in range(args.sessions):
+        store.get(f"session-{index}")
+    get_elapsed = perf_counter() - start
+
+    memory = store.memory_usage()
+    print(f"Sessions: {len(store)}")
+    print(f"Memory: {memory / 2 ** 20:.1f} MiB, {memory / len(store):.0f} bytes per session")
+    print(f"put: {args.sessions / put_elapsed:,.0f}/s, get: {args.sessions / get_elapsed:,.0f}/s")
+
+
+def benchmark_fast_path(args):
+    # The notebook's test utterances, mixed with utterances only the cloud bot knows.
+    texts = [
+        "Oi", "Obrigado", "Grato", "Valeu", "vlw", "Opa", "Dale", "oioi", "ei", "Grata!",
+        "Muito obrigada, de verdade", "Cancelar", "Deixa para outro dia", "encerrar", "cancela", "Esquece", "encerra",
+        "Quero me registrar", "Quero criar uma conta", "Quero realizar um registro de relato",
+    ]
+
+    model_directory = None if args.exact_match else args.model
+    fast_path = LocalFastPath.from_intent_file(LOCAL_INTENTS_FILE_PATH, args.threshold, model_directory)
+    runtime = FakeLexRuntimeClient(latency=args.latency)
+    # The bot must have the intents the fast path answers.
+    client = FakeLexModelsClient()
+    for intent in fast_path.classifier.intents:
+        client.create_intent(intentName=intent, description=intent, sampleUtterances=[])
+    bot = LexBot('BOTID', 'Bot', 'ALIASID', 'Alias', 'pt_BR', client=client, runtime=runtime, fast_path=fast_path)
+
+    start = perf_counter()
+    for index, text in enumerate(texts):
+        bot.detect_intent_text(f"session-{index}", text)
+    elapsed = perf_counter() - start
+
+    stats = fast_path.stats()
+    print(f"{stats['requests']} first turns, {runtime.calls} sent to the cloud, {args.latency * 1000:.0f}ms per cloud call.")
+    print(f"Hit rate: {stats['hit_rate']:.0%}, saved {stats['saved_seconds_per_request'] * 1000:.1f}ms per request.")
+    print(f"Total: {elapsed:.2f}s (all in the cloud: {len(texts) * args.latency:.2f}s).")
+
+
+def percentile(timings: list, fraction: float):
+    ordered = sorted(timings)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def print_timings(name: str, timings: list):
+    print(
+        f"{name:<10} p50 {percentile(timings, 0.5) * 1000:7.1f}ms  "
+        f"p95 {percentile(timings, 0.95) * 1000:7.1f}ms  "
+        f"p99 {percentile(timings, 0.99) * 1000:7.1f}ms"
+    )
+
+
+def benchmark_backends(args):
+    def lex_runtime():
+        return FakeLexRuntimeClient(
+            latency=args.latency, intent='Greeting', confidence=0.9,
+            slow_latency=args.slow_latency, slow_fraction=args.slow_fraction
+        )
+
+    def async_lex_backend():
+        bot = AsyncLexBot('BOTID', 'Bot', 'ALIASID', 'Alias', 'pt_BR', runtime=lex_runtime(), max_connections=100)
+        return AsyncLexBackend(bot)
+
+    texts_by_intent, responses_by_intent = load_intent_file(LOCAL_INTENTS_FILE_PATH)
+    local = LocalBackend(ExactMatchClassifier(texts_by_intent), responses_by_intent)
+    lex = LexBackend(LexBot('BOTID', 'Bot', 'ALIASID', 'Alias', 'pt_BR', client=object(), runtime=lex_runtime()))
+
+    async def run(backend):
+        async def timed(index):
+            start = perf_counter()
+            await backend.detect_intent(f"session-{index}", "Oi")
+            return perf_counter() - start
+
+        # Staggered arrivals, so calls don't all share the same fate.
+        tasks = []
+        for index in range(args.requests):
+            tasks.append(asyncio.ensure_future(timed(index)))
+            await asyncio.sleep(0.002)
+        return await asyncio.gather(*tasks)
+
+    print(f"{args.requests} requests; {args.slow_fraction:.0%} of cloud calls take {args.slow_latency * 1000:.0f}ms instead of {args.latency * 1000:.0f}ms.")
+    print_timings("local", asyncio.run(run(AsyncBackendAdapter(local))))
+    print_timings("lex", asyncio.run(run(AsyncBackendAdapter(lex, max_workers=100))))
+
+    hedged = HedgedBackend(async_lex_backend(), async_lex_backend(), hedge_delay=args.latency * 1.5)
+    print_timings("hedged", asyncio.run(run(hedged)))
+    print(f"hedged wins: {hedged.wins}")
+
+
+def benchmark_hedging(args):
+    print(
+        f"{args.turns} turns in 16 parallel conversations; {args.slow_fraction:.0%} of calls take "
+        f"{args.slow_latency * 1000:.0f}ms instead of {args.latency * 1000:.0f}ms."
+    )
+
+    for name, options in (('plain', {}), ('deadline', {'timeout': args.timeout}), ('hedged', {'timeout': args.timeout, 'hedge': True})):
+        runtime = FakeLexRuntimeClient(latency=args.latency, slow_latency=args.slow_latency, slow_fraction=args.slow_fraction)
+        bot = LexBot(
+            'BOTID', 'Bot', 'ALIASID', 'Alias', 'pt_BR', client=object(), runtime=runtime,
+            session_store=InMemorySessionStore(), **options
+        )
+
+        def conversation(index):
+            for turn in range(args.turns // 16):
+                try:
+                    bot.detect_intent_text(f"session-{index}", "Oi")
+                except TimeoutError:
+                    pass
+
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            list(executor.map(conversation, range(16)))
+
+        # The histogram counts timed out turns at the time they waited, so p99 and max include them.
+        controller = bot.controller
+        latency = controller.latency.summary()
+        print(
+            f"{name:<9} p50 {latency['p50'] * 1000:7.1f}ms  p99 {latency['p99'] * 1000:7.1f}ms  "
+            f"max {latency['max'] * 1000:7.1f}ms  hedges {controller.hedges} (won {controller.hedge_wins}), "
+            f"timeouts {controller.timeouts}"
+        )
+
+
+def benchmark_instrumentation(args):
+    catalog = load_catalog(args.intents)
+    stats = StatsSink()
+    instrumentation.enable(stats)
+
+    client = InstrumentedClient(FakeLexModelsClient(latency=args.latency), 'lexv2-models')
+    bot = LexBot('BOTID', 'Bot', 'ALIASID', 'Alias', 'pt_BR', client=client, runtime=object(), throttle=Throttle(rate=1e9))
+    for _ in range(2):
+        sync = IntentSync(bot.controller)
+        with contextlib.redirect_stdout(io.StringIO()):
+            sync.apply(sync.plan(catalog))
+
+    print(f"Calls of a first upload of {args.intents} intents, then of an upload without changes:")
+    stats.print()
+    instrumentation.disable()
+
+    # Overhead per call against a client that does nothing.
+    class NoopClient:
+        def describe_bot(self, **kwargs):
+            return {}
+
+    for name, sinks in (('uninstrumented', None), ('disabled', ()), ('enabled', (StatsSink(),))):
+        client = NoopClient() if sinks is None else InstrumentedClient(NoopClient(), 'lexv2-models')
+        instrumentation.enable(*(sinks or ()))
+        start = perf_counter()
+        for _ in range(args.calls):
+            client.describe_bot(botId='BOTID')
+        elapsed = perf_counter() - start
+        instrumentation.disable()
+        print(f"{name:<15} {elapsed / args.calls * 1e6:6.2f}us per call")
+
+
+def benchmark_simulator(args):
+    simulator = LexRuntimeSimulator.from_intent_file(INTENTS_FILE_PATH)
+    bot = LexBot('BOTID', 'Bot', 'ALIASID', 'Alias', 'pt_BR', client=object(), runtime=simulator)
+    conversations = load_conversations(CONVERSATIONS_FILE_PATH)
+
+    print(f"{args.conversations} conversations from {CONVERSATIONS_FILE_PATH} against the Lex runtime simulator:")
+    run_load_test(LexBackend(bot), conversations, args.rate, args.conversations, concurrency=16, seed=0).print()
+
+    turns = 0
+    start = perf_counter()
+    for index in range(args.conversations):
+        session_state = None
+        for text in conversations[index % len(conversations)][1]:
+            _, session_state, _, _ = bot.detect_intent_text(f"session-{index}", text, session_state)
+            turns += 1
+    print(f"single thread: {turns / (perf_counter() - start):,.0f} turns/s")
+
+
+def benchmark_catalog(args):
+    catalog = load_catalog(args.intents)
+
+    with tempfile.TemporaryDirectory() as directory:
+        json_path = os.path.join(directory, 'intents.json')
+        catalog_path = os.path.join(directory, 'intents.catalog')
+        state_path = os.path.join(directory, 'state.json')
+        with open(json_path, 'w') as json_file:
+            json.dump(catalog, json_file)
+        IntentCatalog.from_json_file(json_path).save(catalog_path)
+
+        print(f"Loading {args.intents} intents:")
+        for name, path in (('json + validation', json_path), ('compiled catalog', catalog_path)):
+            start = perf_counter()
+            IntentCatalog.load(path)
+            print(f"{name:<18} {(perf_counter() - start) * 1000:7.1f}ms")
+
+        print("Model API calls per deploy:")
+        for name, state_file in (('without state file', None), ('with state file', state_path)):
+            client = FakeLexModelsClient()
+            bot = LexBot('BOTID', 'Bot', 'ALIASID', 'Alias', 'pt_BR', client=client, runtime=object(), throttle=Throttle(rate=1e9))
+            calls = []
+            for _ in range(2):
+                before = client.total_calls()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    bot.upload_intents_from_file(catalog_path, state_file=state_file)
+                calls.append(client.total_calls() - before)
+            print(f"{name:<18} first deploy {calls[0]}, unchanged deploy {calls[1]}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    upload_parser = subparsers.add_parser('upload', help="LexBot intent upload at 1, 4, 16 and 64 workers.")
+    upload_parser.add_argument('--intents', type=int, default=100)
+    upload_parser.add_argument('--latency', type=float, default=0.05)
+    upload_parser.add_argument('--max-tps', type=float, default=200)
+    upload_parser.set_defaults(run=benchmark_upload)
+
+    provision_parser = subparsers.add_parser('provision', help="LexManager.create_bot against resources that become ready after N polls.")
+    provision_parser.add_argument('--polls', type=int, default=3)
+    provision_parser.add_argument('--latency', type=float, default=0.05)
+    provision_parser.set_defaults(run=benchmark_provision)
+
+    runtime_parser = subparsers.add_parser('runtime', help="Sync LexBot versus AsyncLexBot throughput at 10, 100 and 1000 sessions.")
+    runtime_parser.add_argument('--turns', type=int, default=3)
+    runtime_parser.add_argument('--latency', type=float, default=0.05)
+    runtime_parser.add_argument('--max-connections', type=int, default=100)
+    runtime_parser.set_defaults(run=benchmark_runtime)
+
+    handles_parser = subparsers.add_parser('handles', help="Time to get the 1st and the Nth LexBot handle.")
+    handles_parser.add_argument('--bots', type=int, default=100)
+    handles_parser.set_defaults(run=benchmark_handles)
+
+    sessions_parser = subparsers.add_parser('sessions', help="Memory and speed of the in-memory session store.")
+    sessions_parser.add_argument('--sessions', type=int, default=100_000)
+    sessions_parser.set_defaults(run=benchmark_sessions)
+
+    fast_path_parser = subparsers.add_parser('fast-path', help="Hit rate and latency saved by the local fast path.")
+    fast_path_parser.add_argument('--latency', type=float, default=0.05)
+    fast_path_parser.add_argument('--threshold', type=float, default=0.9)
+    fast_path_parser.add_argument('--model', default=DEFAULT_MODEL_DIRECTORY, help="Saved notebook model (see tensorflow/README.md).")
+    fast_path_parser.add_argument('--exact-match', action='store_true', help="Use the dependency-free ExactMatchClassifier instead of the model.")
+    fast_path_parser.set_defaults(run=benchmark_fast_path)
+
+    backends_parser = subparsers.add_parser('backends', help="Latency percentiles of the local, Lex and hedged NLU backends.")
+    backends_parser.add_argument('--requests', type=int, default=500)
+    backends_parser.add_argument('--latency', type=float, default=0.05)
+    backends_parser.add_argument('--slow-latency', type=float, default=0.5)
+    backends_parser.add_argument('--slow-fraction', type=float, default=0.05)
+    backends_parser.set_defaults(run=benchmark_backends)
+
+    hedging_parser = subparsers.add_parser('hedging', help="Latency of LexBot turns without and with deadlines and hedging.")
+    hedging_parser.add_argument('--turns', type=int, default=400)
+    hedging_parser.add_argument('--latency', type=float, default=0.05)
+    hedging_parser.add_argument('--slow-latency', type=float, default=2)
+    hedging_parser.add_argument('--slow-fraction', type=float, default=0.03)
+    hedging_parser.add_argument('--timeout', type=float, default=1)
+    hedging_parser.set_defaults(run=benchmark_hedging)
+
+    instrumentation_parser = subparsers.add_parser('instrumentation', help="API calls made by an intent upload, and the cost of instrumenting a call.")
+    instrumentation_parser.add_argument('--intents', type=int, default=100)
+    instrumentation_parser.add_argument('--latency', type=float, default=0.002)
+    instrumentation_parser.add_argument('--calls', type=int, default=100_000)
+    instrumentation_parser.set_defaults(run=benchmark_instrumentation)
+
+    simulator_parser = subparsers.add_parser('simulator', help="Turns per second of LexBot against the Lex runtime simulator.")
+    simulator_parser.add_argument('--conversations', type=int, default=2000)
+    simulator_parser.add_argument('--rate', type=float, default=1000)
+    simulator_parser.set_defaults(run=benchmark_simulator)
+
+    catalog_parser = subparsers.add_parser('catalog', help="Loading a compiled catalog versus the intents json, and calls skipped by per-intent hashes.")
+    catalog_parser.add_argument('--intents', type=int, default=1000)
+    catalog_parser.set_defaults(run=benchmark_catalog)
+
+    args = parser.parse_args()
+    args.run(args)
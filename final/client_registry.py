@@ -0,0 +1,52 @@
+from botocore.config import Config
+from instrumentation import instrument_client
+from threading import Lock
+import boto3
+
+# Connections kept open per client. Shared by every bot in the process, so size it for the
+# number of concurrent calls, not the number of bots.
+DEFAULT_MAX_POOL_CONNECTIONS = 50
+
+_clients = {}
+_lock = Lock()
+_session = None
+
+
+def get_client(service: str, region_name: str = None, max_pool_connections: int = DEFAULT_MAX_POOL_CONNECTIONS, **config_options):
+    """
+    Returns the process-wide boto3 client for the service, region and config, creating it on first use.
+
+    Creating a client resolves endpoints and credentials and loads the service model, which takes
+    hundreds of milliseconds, and each client has its own connection pool. Clients are thread safe,
+    so LexManager, LexBot and LexBotController share them instead of creating their own.
+    Every client reports its calls to the sinks enabled in instrumentation.py.
+    `config_options` are passed to botocore's Config (e.g. read_timeout, retries).
+    """
+    key = (service, region_name, max_pool_connections, tuple(sorted(config_options.items())))
+
+    client = _clients.get(key)
+    if client is None:
+        # boto3 sessions are not thread safe, so clients are created under the lock.
+        with _lock:
+            client = _clients.get(key)
+            if client is None:
+                config = Config(max_pool_connections=max_pool_connections, tcp_keepalive=True, **config_options)
+                client = instrument_client(_get_session().client(service, region_name=region_name, config=config))
+                _clients[key] = client
+
+    return client
+
+
+def _get_session():
+    global _session
+    if _session is None:
+        _session = boto3.session.Session()
+    return _session
+
+
+def clear():
+    """ Drops every cached client, e.g. after forking a worker process or changing credentials. """
+    global _session
+    with _lock:
+        _clients.clear()
+        _session = None
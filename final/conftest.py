@@ -0,0 +1,7 @@
+"""
+The tests of the fast path and the simulator use the text normalization of the notebook model, in ../tensorflow.
+"""
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'tensorflow'))
@@ -0,0 +1,177 @@
+from intent_catalog import IntentCatalog
+from intent_sync import IntentSync
+from datetime import datetime
+from time import perf_counter
+import json
+import os
+
+STAGES = ('sync', 'build', 'version', 'alias')
+
+# Version descriptions end with the hash of the catalog they were created from.
+CATALOG_MARKER = ' (catalog '
+
+
+class DeployReport:
+    """ Outcome of a deploy: seconds spent per stage, the stages skipped, and the version the alias points to. """
+    def __init__(self) -> None:
+        self.timings = {} # stage -> seconds
+        self.skipped = {} # stage -> reason
+        self.version = None
+        self.plan = None
+
+    def print(self):
+        for stage in STAGES:
+            if stage in self.skipped:
+                print(f"{stage:<8} skipped ({self.skipped[stage]})")
+            elif stage in self.timings:
+                print(f"{stage:<8} {self.timings[stage]:7.2f}s")
+        print(f"Alias points to version {self.version}.")
+
+
+class DeployPipeline:
+    """
+    Deploys an intent catalog to a LexBot in stages:
+
+    1. sync: makes the DRAFT match the catalog (see IntentSync), skipping intents unchanged since the last deploy,
+       or every intent when the latest version was created from the same catalog.
+    2. build: builds the DRAFT locale and waits for it, unless nothing changed and it is already built.
+    3. version: snapshots the DRAFT into a new version, unless the latest version has the same catalog hash.
+    4. alias: points the alias to that version (a single update_bot_alias call) and waits for it.
+
+    With a `state_file`, the progress is saved after each stage, so a deploy that failed midway resumes from the
+    first stage it did not complete when run again with the same catalog. The file also keeps the hashes that let
+    later deploys skip work; it is shared with LexBot.upload_intents_from_file and holds one entry per bot and locale.
+    """
+    def __init__(self, bot, state_file: str = None, prune: bool = False, workers: int = 1) -> None:
+        self.bot = bot
+        self.controller = bot.controller
+        self.state_file = state_file
+        self.prune = prune
+        self.workers = workers
+        self.key = f"{bot.id}/{bot.locale}"
+
+    def _load_states(self):
+        if self.state_file and os.path.exists(self.state_file):
+            with open(self.state_file, 'r') as json_file:
+                return json.load(json_file)
+        return {}
+
+    def _save(self, states: dict):
+        if not self.state_file:
+            return
+
+        # Written to a temporary file first, so a crash never leaves a truncated state.
+        temporary_path = f"{self.state_file}.tmp"
+        with open(temporary_path, 'w') as json_file:
+            json.dump(states, json_file, indent=2)
+        os.replace(temporary_path, self.state_file)
+
+    def plan(self, catalog: IntentCatalog):
+        """ Returns the SyncPlan of the sync stage without changing the bot. """
+        state = self._load_states().get(self.key, {})
+        sync = IntentSync(self.controller, self.prune, self.workers)
+        return sync.plan(catalog.to_dict(), catalog.unchanged_since(state.get('intents', {})))
+
+    def run(self, catalog: IntentCatalog):
+        states = self._load_states()
+        state = states.setdefault(self.key, {})
+        report = DeployReport()
+
+        pending = state.get('pending')
+        if not pending or pending['catalog'] != catalog.hash:
+            pending = state['pending'] = {'catalog': catalog.hash, 'completed': []}
+        elif pending['completed']:
+            print(f"Resuming the deploy of catalog {catalog.hash[:12]} after stage {pending['completed'][-1]}.")
+
+        for stage in STAGES:
+            if stage in pending['completed']:
+                report.skipped[stage] = "completed by a previous run"
+                continue
+
+            start = perf_counter()
+            skipped = getattr(self, f"_{stage}")(catalog, state, pending, report)
+            if skipped:
+                report.skipped[stage] = skipped
+            else:
+                report.timings[stage] = perf_counter() - start
+
+            pending['completed'].append(stage)
+            self._save(states)
+
+        del state['pending']
+        self._save(states)
+
+        report.version = state.get('version')
+        return report
+
+    def _sync(self, catalog: IntentCatalog, state: dict, pending: dict, report: DeployReport):
+        # Without the hashes of a previous deploy, the latest version tells if this catalog was already deployed,
+        # which saves reading every intent back from the bot.
+        if 'intents' not in state:
+            version, version_catalog = self._latest_version()
+            state.update(version=version, version_catalog=version_catalog) # Spares the version stage the same lookup.
+            if version_catalog == catalog.hash:
+                pending['changed'] = False
+                state.update(intents=catalog.hashes(), catalog=catalog.hash)
+                return f"version {version} has the same catalog"
+
+        sync = IntentSync(self.controller, self.prune, self.workers)
+        plan = sync.plan(catalog.to_dict(), catalog.unchanged_since(state.get('intents', {})))
+        sync.apply(plan)
+
+        report.plan = plan
+        pending['changed'] = plan.write_calls() > 0
+        state['intents'] = catalog.hashes()
+        state['catalog'] = catalog.hash
+        print(f"Intents synced to the DRAFT of bot {self.bot.id}: {plan.write_calls()} writes.")
+
+    def _build(self, catalog: IntentCatalog, state: dict, pending: dict, report: DeployReport):
+        if not pending.get('changed') and self.controller.locale_status() == 'Built':
+            return "no changes and the locale is built"
+        self.controller.build()
+
+    def _latest_version(self):
+        """ Returns the latest numbered version and the catalog hash in its description, or (None, None). """
+        versions = [summary for summary in self.controller.iter_versions() if summary['botVersion'].isdigit()]
+        if not versions:
+            return None, None
+
+        latest = max(versions, key=lambda summary: int(summary['botVersion']))
+        description = latest.get('description') or ''
+        marker = description.rfind(CATALOG_MARKER)
+        version_catalog = description[marker + len(CATALOG_MARKER):].rstrip(')') if marker >= 0 else None
+        return latest['botVersion'], version_catalog
+
+    def _version(self, catalog: IntentCatalog, state: dict, pending: dict, report: DeployReport):
+        if state.get('version_catalog') == catalog.hash and state.get('version'):
+            return f"version {state['version']} has the same catalog"
+
+        # Without a state file (nor a lookup by the sync stage), the catalog hash is read back from the description
+        # of the latest version.
+        if 'version_catalog' not in state:
+            version, version_catalog = self._latest_version()
+            if version_catalog == catalog.hash:
+                state['version'] = version
+                state['version_catalog'] = version_catalog
+                return f"version {version} has the same catalog"
+
+        version = self.controller.create_new_version(
+            f"Version with intents uploaded on {datetime.now():%Y-%m-%d %H:%M:%S}{CATALOG_MARKER}{catalog.hash})"
+        )
+        self.controller.wait_for_version(version)
+        state['version'] = version
+        state['version_catalog'] = catalog.hash
+        print(f"Version {version} created.")
+
+    def _alias(self, catalog: IntentCatalog, state: dict, pending: dict, report: DeployReport):
+        version = state['version']
+        if self.controller.alias_version() == version:
+            return f"already on version {version}"
+
+        self.controller.update_alias(version)
+        self.controller.wait_for_alias()
+
+        # Cached answers came from the previous version.
+        if self.bot.response_cache is not None:
+            self.bot.response_cache.clear()
+        print(f"Alias {self.bot.alias_id} points to version {version}.")
@@ -0,0 +1,101 @@
+from collections import Counter
+import json
+
+MATRIX_HEADER = "expected \\ predicted"
+
+
+class EvaluationReport:
+    """ Accuracy and confusion matrix of intent predictions against their expected labels. """
+    def __init__(self) -> None:
+        self.confusion = Counter() # (expected intent, predicted intent) -> count
+        self.total = 0
+        self.correct = 0
+
+    def add(self, expected: str, predicted: str):
+        self.confusion[(expected, predicted)] += 1
+        self.total += 1
+        if expected == predicted:
+            self.correct += 1
+
+    def accuracy(self):
+        return self.correct / self.total if self.total else 0.0
+
+    def labels(self):
+        return sorted({label for pair in self.confusion for label in pair}, key=str)
+
+    def per_intent(self):
+        """ Returns {intent: (precision, recall, support)}. """
+        output = {}
+        for label in self.labels():
+            true_positives = self.confusion[(label, label)]
+            predicted = sum(count for (_, prediction), count in self.confusion.items() if prediction == label)
+            support = sum(count for (expected, _), count in self.confusion.items() if expected == label)
+            precision = true_positives / predicted if predicted else 0.0
+            recall = true_positives / support if support else 0.0
+            output[label] = (precision, recall, support)
+        return output
+
+    def print(self):
+        labels = self.labels()
+        names = [str(label) for label in labels]
+        width = max(len(name) for name in names + [MATRIX_HEADER])
+
+        print(f"Accuracy: {self.accuracy():.2%} ({self.correct}/{self.total})")
+        print()
+        print(f"{MATRIX_HEADER:<{width}} " + " ".join(f"{name:>{len(name)}}" for name in names))
+        for label, name in zip(labels, names):
+            row = " ".join(f"{self.confusion[(label, predicted)]:>{len(predicted_name)}}" for predicted, predicted_name in zip(labels, names))
+            print(f"{name:<{width}} {row}")
+        print()
+
+        for label, (precision, recall, support) in self.per_intent().items():
+            print(f"{str(label):<{width}} precision {precision:.2f} recall {recall:.2f} support {support}")
+
+
+def evaluate(results, labels: dict):
+    """
+    Builds an EvaluationReport from `(text, intent, confidence)` results, such as the ones streamed
+    by LexBot.detect_intent_batch, and a dict of text to expected intent.
+    """
+    report = EvaluationReport()
+    for text, intent, confidence in results:
+        report.add(labels[text], intent)
+    return report
+
+
+def load_labelled_utterances(file_path: str):
+    """
+    Returns a dict of text to expected intent. Accepts an intents file (the sample utterances of each
+    intent are labelled with its name) or a JSONL file with one {"text": ..., "intent": ...} per line.
+    """
+    labels = {}
+    with open(file_path, 'r') as labelled_file:
+        if file_path.endswith('.jsonl'):
+            for line in labelled_file:
+                if line.strip():
+                    utterance = json.loads(line)
+                    labels[utterance['text']] = utterance['intent']
+        else:
+            for intent_name, intent_data in json.load(labelled_file).items():
+                for utterance in intent_data['sampleUtterances']:
+                    labels[utterance] = intent_name
+
+    return labels
+
+
+if __name__ == "__main__":
+    from lex_manager import LexManager
+    from dotenv import load_dotenv
+    import os
+    import sys
+
+    load_dotenv()
+
+    manager = LexManager(os.getenv("LEX_BOTS_IAM_ROLE_ARN"))
+    bot = manager.get_bot(os.getenv('BOT_ID'), os.getenv('BOT_ALIAS_ID'), os.getenv('BOT_LOCALE_ID'))
+
+    file_path = sys.argv[1] if len(sys.argv) > 1 else "../AmazonLex/intents/sample.json"
+    labels = load_labelled_utterances(file_path)
+
+    report = evaluate(bot.detect_intent_batch(labels, concurrency=16), labels)
+    report.print()
@@ -0,0 +1,300 @@
+from botocore.exceptions import ClientError
+from collections import deque
+from itertools import count
+from threading import Lock
+from time import monotonic, sleep
+import copy
+import random
+
+
+class FakeLexModelsClient:
+    """
+    In-memory stand-in for the boto3 'lexv2-models' client, covering the calls made by LexBotController.
+
+    Every call sleeps `latency` seconds to mimic the network round trip and is counted in `calls`.
+    With `max_tps`, calls above that many per second fail with ThrottlingException, like the real service quotas.
+    Bots, locales, versions and aliases report a transitional status for the first `polls_until_ready`
+    describe calls after they are created (or built), then flip to their ready status.
+    """
+    def __init__(self, latency: float = 0.0, max_tps: float = None, polls_until_ready: int = 0) -> None:
+        self.latency = latency
+        self.max_tps = max_tps
+        self.polls_until_ready = polls_until_ready
+        self._pending = {}
+        self._built = False
+        self._versions = 0
+        self._alias_versions = {}
+        self._version_descriptions = {}
+        self.throttled = 0
+        self._recent_calls = deque()
+        self.calls = {}
+        self.intents = {}
+        self.slots = {}
+        self.slot_settings = {} # slot id -> valueElicitationSetting, returned by describe_slot only.
+        self._ids = count(1)
+        self._lock = Lock()
+
+    def _call(self, operation: str):
+        with self._lock:
+            if self.max_tps:
+                now = monotonic()
+                while self._recent_calls and now - self._recent_calls[0] > 1:
+                    self._recent_calls.popleft()
+
+                if len(self._recent_calls) >= self.max_tps:
+                    self.throttled += 1
+                    raise ClientError({'Error': {'Code': 'ThrottlingException', 'Message': 'Rate exceeded'}}, operation)
+
+                self._recent_calls.append(now)
+
+            self.calls[operation] = self.calls.get(operation, 0) + 1
+        if self.latency:
+            sleep(self.latency)
+
+    def _new_id(self):
+        with self._lock:
+            return f"{next(self._ids):010d}"
+
+    def total_calls(self):
+        return sum(self.calls.values())
+
+    @staticmethod
+    def _page(result_key: str, items: list, name_key: str, maxResults: int = 1000, nextToken: str = None, filters: list = None, **kwargs):
+        """ Pages a listing like the Lex V2 list operations, supporting EQ and CO name filters. """
+        for name_filter in filters or []:
+            values = name_filter['values']
+            if name_filter['operator'] == 'EQ':
+                items = [item for item in items if item[name_key] in values]
+            else:
+                items = [item for item in items if any(value in item[name_key] for value in values)]
+
+        start = int(nextToken or 0)
+        response = {result_key: items[start:start + maxResults]}
+        if start + maxResults < len(items):
+            response['nextToken'] = str(start + maxResults)
+        return response
+
+    def list_intents(self, **kwargs):
+        self._call('list_intents')
+        summaries = [
+            {'intentId': intent_id, 'intentName': intent['intentName']}
+            for intent_id, intent in self.intents.items()
+        ]
+        return self._page('intentSummaries', summaries, 'intentName', **kwargs)
+
+    def describe_intent(self, intentId, **kwargs):
+        self._call('describe_intent')
+        return dict(self.intents[intentId])
+
+    def create_intent(self, intentName, description, sampleUtterances, **kwargs):
+        self._call('create_intent')
+        self._built = False # Model changes leave the locale to be built again.
+        intent_id = self._new_id()
+        self.intents[intent_id] = {
+            'intentId': intent_id,
+            'intentName': intentName,
+            'description': description,
+            'sampleUtterances': sampleUtterances,
+            'slotPriorities': [],
+            **self._intent_settings(kwargs),
+        }
+        self.slots[intent_id] = {}
+        return {'intentId': intent_id}
+
+    @staticmethod
+    def _intent_settings(kwargs: dict):
+        return {
+            key: copy.deepcopy(kwargs[key])
+            for key in ('intentConfirmationSetting', 'intentClosingSetting')
+            if key in kwargs
+        }
+
+    def update_intent(self, intentId, intentName, description, sampleUtterances, slotPriorities=None, **kwargs):
+        self._call('update_intent')
+        self._built = False
+        # Like the service, the update replaces the settings; priorities not sent are kept.
+        intent = self.intents[intentId]
+        self.intents[intentId] = {
+            'intentId': intentId,
+            'intentName': intentName,
+            'description': description,
+            'sampleUtterances': sampleUtterances,
+            'slotPriorities': intent['slotPriorities'] if slotPriorities is None else slotPriorities,
+            **self._intent_settings(kwargs),
+        }
+        return {'intentId': intentId}
+
+    def delete_intent(self, intentId, **kwargs):
+        self._call('delete_intent')
+        self._built = False
+        self.intents.pop(intentId)
+        self.slots.pop(intentId)
+
+    def list_slots(self, intentId, **kwargs):
+        self._call('list_slots')
+        summaries = [dict(slot) for slot in self.slots[intentId].values()]
+        return self._page('slotSummaries', summaries, 'slotName', **kwargs)
+
+    def _slot_summary(self, slot_id, slotName, slotTypeId, description, valueElicitationSetting):
+        return {
+            'slotId': slot_id,
+            'slotName': slotName,
+            'slotTypeId': slotTypeId,
+            'description': description,
+            'slotConstraint': valueElicitationSetting.get('slotConstraint'),
+            'valueElicitationPromptSpecification': valueElicitationSetting.get('promptSpecification'),
+        }
+
+    def create_slot(self, intentId, slotName, slotTypeId, description, valueElicitationSetting, **kwargs):
+        self._call('create_slot')
+        self._built = False
+        slot_id = self._new_id()
+        self.slots[intentId][slot_id] = self._slot_summary(
+            slot_id, slotName, slotTypeId, description, valueElicitationSetting
+        )
+        self.slot_settings[slot_id] = copy.deepcopy(valueElicitationSetting)
+        return {'slotId': slot_id}
+
+    def update_slot(self, intentId, slotId, slotName, slotTypeId, description, valueElicitationSetting, **kwargs):
+        self._call('update_slot')
+        self._built = False
+        self.slots[intentId][slotId] = self._slot_summary(
+            slotId, slotName, slotTypeId, description, valueElicitationSetting
+        )
+        self.slot_settings[slotId] = copy.deepcopy(valueElicitationSetting)
+        return {'slotId': slotId}
+
+    def describe_slot(self, intentId, slotId, **kwargs):
+        self._call('describe_slot')
+        summary = self.slots[intentId][slotId]
+        return {
+            'slotId': slotId,
+            'slotName': summary['slotName'],
+            'slotTypeId': summary['slotTypeId'],
+            'description': summary['description'],
+            'valueElicitationSetting': copy.deepcopy(self.slot_settings[slotId]),
+        }
+
+    def delete_slot(self, intentId, slotId, **kwargs):
+        self._call('delete_slot')
+        self._built = False
+        self.slots[intentId].pop(slotId)
+        self.slot_settings.pop(slotId, None)
+
+    def _start(self, resource: tuple):
+        self._pending[resource] = self.polls_until_ready
+
+    def _status(self, resource: tuple, pending_status: str, ready_status: str):
+        remaining = self._pending.get(resource, 0)
+        if remaining > 0:
+            self._pending[resource] = remaining - 1
+            return pending_status
+        return ready_status
+
+    def create_bot(self, botName, **kwargs):
+        self._call('create_bot')
+        bot_id = self._new_id()
+        self._start(('bot', bot_id))
+        return {'botId': bot_id, 'botStatus': 'Creating'}
+
+    def describe_bot(self, botId, **kwargs):
+        self._call('describe_bot')
+        return {'botId': botId, 'botName': 'FakeBot', 'botStatus': self._status(('bot', botId), 'Creating', 'Available')}
+
+    def create_bot_locale(self, botId, botVersion, localeId, **kwargs):
+        self._call('create_bot_locale')
+        self._start(('locale', botId, botVersion, localeId))
+        return {'botLocaleStatus': 'Creating'}
+
+    def build_bot_locale(self, botId, botVersion, localeId, **kwargs):
+        self._call('build_bot_locale')
+        self._start(('locale', botId, botVersion, localeId))
+        self._built = True
+        return {'botLocaleStatus': 'Building'}
+
+    def describe_bot_locale(self, botId, botVersion, localeId, **kwargs):
+        self._call('describe_bot_locale')
+        ready_status = 'Built' if self._built else 'NotBuilt'
+        status = self._status(('locale', botId, botVersion, localeId), 'Building', ready_status)
+        return {'botLocaleStatus': status}
+
+    def create_bot_version(self, botId, description=None, **kwargs):
+        self._call('create_bot_version')
+        with self._lock:
+            self._versions += 1
+            version = str(self._versions)
+            self._version_descriptions[version] = description
+        self._start(('version', botId, version))
+        return {'botVersion': version, 'botStatus': 'Versioning'}
+
+    def list_bot_versions(self, botId, sortBy=None, **kwargs):
+        self._call('list_bot_versions')
+        summaries = [
+            {'botVersion': version, 'description': description, 'botStatus': 'Available'}
+            for version, description in self._version_descriptions.items()
+        ]
+        if sortBy and sortBy.get('order') == 'Descending':
+            summaries.reverse()
+        return self._page('botVersionSummaries', summaries, 'botVersion', **kwargs)
+
+    def describe_bot_version(self, botId, botVersion, **kwargs):
+        self._call('describe_bot_version')
+        return {'botVersion': botVersion, 'botStatus': self._status(('version', botId, botVersion), 'Versioning', 'Available')}
+
+    def create_bot_alias(self, botId, botAliasName, **kwargs):
+        self._call('create_bot_alias')
+        alias_id = self._new_id()
+        self._start(('alias', botId, alias_id))
+        return {'botAliasId': alias_id, 'botAliasStatus': 'Creating'}
+
+    def update_bot_alias(self, botId, botAliasId, botVersion=None, **kwargs):
+        self._call('update_bot_alias')
+        self._alias_versions[(botId, botAliasId)] = botVersion
+        self._start(('alias', botId, botAliasId))
+        return {'botAliasId': botAliasId, 'botAliasStatus': 'Creating'}
+
+    def describe_bot_alias(self, botId, botAliasId, **kwargs):
+        self._call('describe_bot_alias')
+        status = self._status(('alias', botId, botAliasId), 'Creating', 'Available')
+        return {
+            'botAliasId': botAliasId,
+            'botAliasName': 'FakeAlias',
+            'botAliasStatus': status,
+            'botVersion': self._alias_versions.get((botId, botAliasId), 'DRAFT'),
+        }
+
+
+class FakeLexRuntimeClient:
+    """
+    Stand-in for the boto3 'lexv2-runtime' client. Every recognize_text call sleeps `latency` seconds
+    and answers with a closed dialog for a fixed intent. A `slow_fraction` of the calls take
+    `slow_latency` seconds instead, to reproduce a latency tail.
+    """
+    def __init__(self, latency: float = 0.0, intent: str = 'FallbackIntent', confidence: float = 1.0,
+                 slow_latency: float = 0.0, slow_fraction: float = 0.0) -> None:
+        self.latency = latency
+        self.slow_latency = slow_latency
+        self.slow_fraction = slow_fraction
+        self.intent = intent
+        self.confidence = confidence
+        self.calls = 0
+        self._lock = Lock()
+
+    def recognize_text(self, botId, botAliasId, localeId, sessionId, text, sessionState=None, **kwargs):
+        with self._lock:
+            self.calls += 1
+        latency = self.slow_latency if random.random() < self.slow_fraction else self.latency
+        if latency:
+            sleep(latency)
+
+        intent = {'name': self.intent, 'slots': {}, 'state': 'Fulfilled', 'confirmationState': 'None'}
+        return {
+            'messages': [{'content': f"Echo: {text}", 'contentType': 'PlainText'}],
+            'sessionState': {
+                'dialogAction': {'type': 'Close'},
+                'intent': intent,
+                'sessionAttributes': {},
+            },
+            'interpretations': [{'intent': intent, 'nluConfidence': {'score': self.confidence}}],
+            'sessionId': sessionId,
+        }
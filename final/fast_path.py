@@ -0,0 +1,160 @@
+from threading import Lock
+from time import perf_counter
+import json
+import os
+import random
+
+# The notebook model is packaged in ../tensorflow (intent_classifier.py and lite_classifier.py), along with the text
+# normalization it is trained with. That folder must be on the PYTHONPATH to use them; nothing else here needs it.
+TENSORFLOW_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'tensorflow')
+
+# Where `python3 intent_classifier.py train data/simple_intent.json models/simple_intent` saves the model.
+DEFAULT_MODEL_DIRECTORY = os.path.join(TENSORFLOW_DIRECTORY, 'models', 'simple_intent')
+
+
+def load_normalizer():
+    """
+    Returns the normalize function of tensorflow/normalization.py, which the fast path and the simulator share
+    with the notebook model, so an utterance is tokenized the same way everywhere.
+    """
+    try:
+        from normalization import normalize
+    except ImportError:
+        raise ImportError("The text normalization is in the tensorflow folder, which must be on the PYTHONPATH: PYTHONPATH=../tensorflow")
+    return normalize
+
+
+def load_intent_file(file_path: str):
+    """
+    Reads an intents file in the format of tensorflow/data/simple_intent.json.
+    Returns two dicts: intent name to training texts, and intent name to responses.
+    """
+    with open(file_path, 'r') as json_file:
+        data = json.load(json_file)
+
+    texts_by_intent, responses_by_intent = {}, {}
+    for intent in data['intents']:
+        texts_by_intent.setdefault(intent['intent'], []).extend(intent['text'])
+        responses_by_intent.setdefault(intent['intent'], []).extend(intent['responses'])
+
+    return texts_by_intent, responses_by_intent
+
+
+def load_model_classifier(model_directory: str = DEFAULT_MODEL_DIRECTORY):
+    """
+    Loads the notebook model saved in `model_directory`, whose confidences are softmax probabilities
+    (the tensorflow folder must be on the PYTHONPATH). Uses its TensorFlow Lite export when there is one (LiteIntentClassifier, which does not import TensorFlow),
+    and IntentClassifier otherwise.
+    """
+    from lite_classifier import TFLITE_FILE, LiteIntentClassifier
+
+    if os.path.exists(os.path.join(model_directory, TFLITE_FILE)):
+        return LiteIntentClassifier.load(model_directory)
+
+    from intent_classifier import IntentClassifier
+    return IntentClassifier.load(model_directory)
+
+
+class ExactMatchClassifier:
+    """
+    Dependency-free fallback for when the notebook model is not available: a text matches an intent with
+    confidence 1.0 when it is equal to one of its training texts, ignoring case, accents and punctuation.
+    Anything else, paraphrases and typos included, gets (None, 0.0), so a threshold has no effect on it.
+    `normalize` defaults to the normalization of the notebook model (see load_normalizer).
+    """
+    def __init__(self, texts_by_intent: dict, normalize=None) -> None:
+        self.normalize = normalize or load_normalizer()
+        self.intents = list(texts_by_intent) # Labels, like the `intents` of the model classifiers.
+        self.index = {
+            self.normalize(text): intent
+            for intent, texts in texts_by_intent.items()
+            for text in texts
+        }
+
+    def predict(self, texts: list):
+        """ Returns a list of (intent, confidence), one per text. """
+        output = []
+        for text in texts:
+            intent = self.index.get(self.normalize(text))
+            output.append((intent, 1.0 if intent else 0.0))
+        return output
+
+
+class LocalFastPath:
+    """
+    Answers trivial utterances with a local classifier instead of a round trip to the cloud bot.
+
+    `classifier` is any object with a `predict(texts)` method returning `(intent, confidence)` per text, and
+    the intent names it predicts in `intents`.
+    Predictions with confidence at or above `threshold` are answered locally with one of the intent's
+    `responses`. Keeps the hit rate and an estimate of the latency saved, based on the average latency
+    of the cloud calls it did not save.
+    """
+    def __init__(self, classifier, responses: dict, threshold: float = 0.9) -> None:
+        self.classifier = classifier
+        self.responses = responses
+        self.threshold = threshold
+        self.requests = 0
+        self.hits = 0
+        self.local_seconds = 0.0
+        self.cloud_calls = 0
+        self.cloud_seconds = 0.0
+        self._lock = Lock()
+
+    @classmethod
+    def from_intent_file(cls, file_path: str, threshold: float = 0.9, model_directory: str = DEFAULT_MODEL_DIRECTORY):
+        """
+        Builds a fast path answering with the responses of the intents file. Texts are classified by the notebook
+        model saved in `model_directory` (see load_model_classifier), which must have been trained on the same
+        intents. With `model_directory=None`, an ExactMatchClassifier of the file's texts is used instead.
+        """
+        texts_by_intent, responses_by_intent = load_intent_file(file_path)
+        if model_directory is None:
+            return cls(ExactMatchClassifier(texts_by_intent), responses_by_intent, threshold)
+        return cls(load_model_classifier(model_directory), responses_by_intent, threshold)
+
+    def missing_intents(self, intent_names):
+        """ Intents the fast path answers that are not in `intent_names`, e.g. the intent index of the Lex bot. """
+        return [intent for intent in self.classifier.intents if intent in self.responses and intent not in intent_names]
+
+    def classify(self, text: str):
+        """ Returns (intent, confidence, bot_response) if the text can be answered locally, None otherwise. """
+        start = perf_counter()
+        intent, confidence = self.classifier.predict([text])[0]
+        hit = intent is not None and confidence >= self.threshold and intent in self.responses
+        elapsed = perf_counter() - start
+
+        with self._lock:
+            self.requests += 1
+            self.local_seconds += elapsed
+            if hit:
+                self.hits += 1
+
+        if not hit:
+            return None
+
+        return intent, float(confidence), random.choice(self.responses[intent])
+
+    def record_cloud_call(self, elapsed: float):
+        """ Records the latency of a request that fell through to the cloud bot. """
+        with self._lock:
+            self.cloud_calls += 1
+            self.cloud_seconds += elapsed
+
+    def hit_rate(self):
+        return self.hits / self.requests if self.requests else 0.0
+
+    def saved_seconds(self):
+        """ Estimated latency saved in total: average cloud latency times hits, minus the local classification cost. """
+        if not self.cloud_calls:
+            return 0.0
+        return self.hits * self.cloud_seconds / self.cloud_calls - self.local_seconds
+
+    def stats(self):
+        return {
+            'requests': self.requests,
+            'hits': self.hits,
+            'hit_rate': self.hit_rate(),
+            'saved_seconds': self.saved_seconds(),
+            'saved_seconds_per_request': self.saved_seconds() / self.requests if self.requests else 0.0,
+        }
@@ -0,0 +1,340 @@
+"""
+Latency and call-count instrumentation for the cloud API calls.
+
+Every Lex client returned by client_registry.get_client reports its calls through botocore event hooks;
+other clients can be wrapped in an InstrumentedClient and plain functions decorated with `instrumented`.
+Calls are handed to the enabled sinks:
+
+    stats = StatsSink()
+    instrumentation.enable(stats)
+    bot.upload_intents_from_file('intents/sample.json')
+    stats.print()                  # list_intents: 3 calls, p50 ...
+    print(stats.prometheus_text()) # Prometheus text exposition format
+
+Nothing is recorded until `enable` is called, and while disabled every hook returns after a single check.
+"""
+from functools import wraps
+from inspect import iscoroutinefunction
+from latency import BUCKET_BOUNDS, LatencyHistogram
+from threading import Lock
+from time import perf_counter, time
+from typing import NamedTuple
+
+# Error codes (botocore) and exception names (gRPC) of calls rejected for exceeding a quota.
+THROTTLING_ERRORS = {
+    'ThrottlingException',
+    'TooManyRequestsException',
+    'ResourceExhausted',
+    'TooManyRequests',
+}
+
+_sinks = ()
+_lock = Lock()
+
+
+class CallRecord(NamedTuple):
+    """
+    One API call. `start` is the wall-clock time it started at, `error` the error code or exception name
+    if it failed, and `throttles` how many attempts of the call were throttled (including botocore's own retries).
+    The body sizes are None when they are not known, as for the calls of InstrumentedClient and `instrumented`.
+    """
+    service: str
+    operation: str
+    start: float
+    seconds: float
+    error: str = None
+    throttles: int = 0
+    bytes_sent: int = None
+    bytes_received: int = None
+
+
+def enable(*sinks):
+    """ Starts sending every instrumented call to the given sinks, in addition to the already enabled ones. """
+    global _sinks
+    with _lock:
+        _sinks = _sinks + tuple(sink for sink in sinks if sink not in _sinks)
+
+
+def disable():
+    """ Stops recording calls and drops every sink. """
+    global _sinks
+    with _lock:
+        _sinks = ()
+
+
+def enabled():
+    return bool(_sinks)
+
+
+def record(call: CallRecord):
+    for sink in _sinks:
+        sink.record(call)
+
+
+class OperationStats:
+    """ Latency histogram and counters of a single API operation. """
+    def __init__(self) -> None:
+        self.latency = LatencyHistogram()
+        self.errors = 0
+        self.throttles = 0
+        self.bytes_sent = None # None until a call of the operation reports its body sizes.
+        self.bytes_received = None
+
+    @property
+    def calls(self):
+        return self.latency.count
+
+
+class StatsSink:
+    """ Keeps per-operation stats in process memory. Thread safe. """
+    def __init__(self) -> None:
+        self.operations = {} # (service, operation) -> OperationStats
+        self._lock = Lock()
+
+    def record(self, call: CallRecord):
+        key = (call.service, call.operation)
+        with self._lock:
+            stats = self.operations.get(key)
+            if stats is None:
+                stats = self.operations[key] = OperationStats()
+            if call.error:
+                stats.errors += 1
+            stats.throttles += call.throttles
+            if call.bytes_sent is not None:
+                stats.bytes_sent = (stats.bytes_sent or 0) + call.bytes_sent
+            if call.bytes_received is not None:
+                stats.bytes_received = (stats.bytes_received or 0) + call.bytes_received
+            # Recorded under the sink lock too, so a snapshot never sees the counters of a call without its latency.
+            stats.latency.record(call.seconds)
+
+    def _snapshot(self):
+        """ Returns the (key, OperationStats) pairs sorted by key, safe to iterate while other threads record. """
+        with self._lock:
+            return sorted(self.operations.items())
+
+    def calls(self, operation: str, service: str = None):
+        """ Number of calls made to the operation, across services unless one is given. """
+        return sum(
+            stats.calls for (stats_service, stats_operation), stats in self._snapshot()
+            if stats_operation == operation and service in (None, stats_service)
+        )
+
+    def total_calls(self):
+        return sum(stats.calls for _, stats in self._snapshot())
+
+    def reset(self):
+        with self._lock:
+            self.operations.clear()
+
+    def summary(self):
+        return {
+            f"{service}.{operation}": {
+                **stats.latency.summary(),
+                'errors': stats.errors,
+                'throttles': stats.throttles,
+                'bytes_sent': stats.bytes_sent,
+                'bytes_received': stats.bytes_received,
+            }
+            for (service, operation), stats in self._snapshot()
+        }
+
+    def print(self):
+        for name, stats in self.summary().items():
+            sizes = ""
+            if stats['bytes_sent'] is not None or stats['bytes_received'] is not None:
+                sizes = f", {stats['bytes_sent'] or 0} bytes sent, {stats['bytes_received'] or 0} bytes received"
+            print(
+                f"{name}: {stats['count']} calls, p50 {stats['p50'] * 1000:.1f}ms, p99 {stats['p99'] * 1000:.1f}ms, "
+                f"{stats['errors']} errors, {stats['throttles']} throttled{sizes}"
+            )
+
+    def prometheus_text(self, prefix: str = 'cloud_api'):
+        """ Renders the stats in the Prometheus text exposition format, e.g. to serve on a /metrics endpoint. """
+        lines = [
+            f"# HELP {prefix}_call_seconds Latency of the cloud API calls.",
+            f"# TYPE {prefix}_call_seconds histogram",
+        ]
+        operations = self._snapshot()
+
+        for (service, operation), stats in operations:
+            labels = f'service="{service}",operation="{operation}"'
+            counts, count, total, _ = stats.latency.snapshot()
+
+            cumulative = 0
+            for bound, bucket_count in zip(BUCKET_BOUNDS, counts):
+                cumulative += bucket_count
+                lines.append(f'{prefix}_call_seconds_bucket{{{labels},le="{bound:.6g}"}} {cumulative}')
+            lines.append(f'{prefix}_call_seconds_bucket{{{labels},le="+Inf"}} {count}')
+            lines.append(f'{prefix}_call_seconds_sum{{{labels}}} {total}')
+            lines.append(f'{prefix}_call_seconds_count{{{labels}}} {count}')
+
+        for name, attribute, description in (
+            ('errors', 'errors', "Cloud API calls that failed."),
+            ('throttles', 'throttles', "Cloud API attempts rejected for exceeding a quota."),
+            ('sent_bytes', 'bytes_sent', "Bytes sent in cloud API request bodies."),
+            ('received_bytes', 'bytes_received', "Bytes received in cloud API response bodies."),
+        ):
+            lines.append(f"# HELP {prefix}_{name}_total {description}")
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            for (service, operation), stats in operations:
+                value = getattr(stats, attribute)
+                if value is not None: # Operations without known body sizes have no byte counters.
+                    labels = f'service="{service}",operation="{operation}"'
+                    lines.append(f'{prefix}_{name}_total{{{labels}}} {value}')
+
+        return '\n'.join(lines) + '\n'
+
+
+class OpenTelemetrySink:
+    """
+    Reports each call as an OpenTelemetry span, a child of the span current in the calling thread.
+    Needs the opentelemetry-api package; without a configured SDK the spans are dropped.
+    """
+    def __init__(self, tracer=None) -> None:
+        from opentelemetry import trace
+
+        self.tracer = tracer or trace.get_tracer(__name__)
+        self._error_status = lambda description: trace.Status(trace.StatusCode.ERROR, description)
+
+    def record(self, call: CallRecord):
+        span = self.tracer.start_span(
+            f"{call.service}.{call.operation}",
+            start_time=int(call.start * 1e9),
+            attributes={
+                'rpc.service': call.service,
+                'rpc.method': call.operation,
+                'cloud_api.throttles': call.throttles,
+            }
+        )
+        if call.bytes_sent is not None:
+            span.set_attribute('cloud_api.bytes_sent', call.bytes_sent)
+        if call.bytes_received is not None:
+            span.set_attribute('cloud_api.bytes_received', call.bytes_received)
+        if call.error:
+            span.set_status(self._error_status(call.error))
+        span.end(end_time=int((call.start + call.seconds) * 1e9))
+
+
+def _body_size(body):
+    return len(body) if isinstance(body, (bytes, str)) else 0
+
+
+def instrument_client(client):
+    """
+    Registers event hooks that report every call made with the boto3 client. The latency includes
+    botocore's own retries, which are counted as throttles when the service rejected the attempt for its quota.
+    """
+    from botocore import xform_name
+
+    service = client.meta.service_model.service_name
+    events = client.meta.events
+
+    def before_call(model, params, context, **kwargs):
+        if _sinks:
+            context['instrumentation'] = [xform_name(model.name), time(), perf_counter(), 0, _body_size(params.get('body'))]
+
+    def needs_retry(response, request_dict, **kwargs):
+        if _sinks and response is not None:
+            call = request_dict['context'].get('instrumentation')
+            if call and response[1].get('Error', {}).get('Code') in THROTTLING_ERRORS:
+                call[3] += 1
+
+    def after_call(http_response, parsed, context, **kwargs):
+        call = context.get('instrumentation')
+        if call and _sinks:
+            operation, start, started, throttles, bytes_sent = call
+            error = parsed.get('Error', {}).get('Code') if http_response.status_code >= 300 else None
+            record(CallRecord(
+                service, operation, start, perf_counter() - started,
+                error, throttles, bytes_sent, _body_size(http_response.content)
+            ))
+
+    def after_call_error(exception, context, **kwargs):
+        call = context.get('instrumentation')
+        if call and _sinks:
+            operation, start, started, throttles, bytes_sent = call
+            record(CallRecord(
+                service, operation, start, perf_counter() - started,
+                type(exception).__name__, throttles, bytes_sent
+            ))
+
+    events.register('before-call', before_call, unique_id='instrumentation-before-call')
+    events.register('needs-retry', needs_retry, unique_id='instrumentation-needs-retry')
+    events.register('after-call', after_call, unique_id='instrumentation-after-call')
+    events.register('after-call-error', after_call_error, unique_id='instrumentation-after-call-error')
+    return client
+
+
+def _error_name(exception):
+    response = getattr(exception, 'response', None)
+    if isinstance(response, dict) and 'Error' in response:
+        return response['Error'].get('Code')
+    return type(exception).__name__
+
+
+def instrumented(service: str, operation: str = None):
+    """
+    Decorator reporting each call of the function as a call to `operation` (the function name by default),
+    for API calls that are not made with a boto3 client, e.g. the Dialogflow agent operations.
+    Coroutine functions are timed until they return, not until the coroutine is created.
+    """
+    def decorator(function):
+        name = operation or function.__name__
+
+        def failed(start, started, exception):
+            error = _error_name(exception)
+            record(CallRecord(service, name, start, perf_counter() - started, error, int(error in THROTTLING_ERRORS)))
+
+        if iscoroutinefunction(function):
+            @wraps(function)
+            async def async_wrapper(*args, **kwargs):
+                if not _sinks:
+                    return await function(*args, **kwargs)
+
+                start, started = time(), perf_counter()
+                try:
+                    result = await function(*args, **kwargs)
+                except Exception as e:
+                    failed(start, started, e)
+                    raise
+
+                record(CallRecord(service, name, start, perf_counter() - started))
+                return result
+
+            return async_wrapper
+
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _sinks:
+                return function(*args, **kwargs)
+
+            start, started = time(), perf_counter()
+            try:
+                result = function(*args, **kwargs)
+            except Exception as e:
+                failed(start, started, e)
+                raise
+
+            record(CallRecord(service, name, start, perf_counter() - started))
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+class InstrumentedClient:
+    """
+    Wraps a client so every method call is reported, for clients without botocore events
+    (the fakes in fake_lex.py, or a client whose hooks should not be touched). Body sizes are not reported,
+    since the calls do not go through HTTP here.
+    """
+    def __init__(self, client, service: str) -> None:
+        self.client = client
+        self.service = service
+
+    def __getattr__(self, name):
+        attribute = getattr(self.client, name)
+        if not _sinks or not callable(attribute):
+            return attribute
+        return instrumented(self.service, name)(attribute)
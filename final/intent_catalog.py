@@ -0,0 +1,229 @@
+"""
+Compiled intent catalogs.
+
+An intents file (AmazonLex/intents/sample.json) is validated once and compiled into a pickled catalog,
+with a content hash per intent and for the whole catalog:
+
+    python3 intent_catalog.py ../AmazonLex/intents/sample.json intents.catalog
+
+Deploys load the compiled catalog without re-parsing and re-validating the JSON, and use the hashes to
+skip the intents that did not change since the last deploy (see LexBot.upload_intents_from_file).
+"""
+import hashlib
+import json
+import os
+import pickle
+import re
+
+# Bumped whenever the compiled structure changes, so stale catalogs are recompiled instead of misread.
+CATALOG_FORMAT = 2
+
+# First bytes of a compiled catalog file. Files without them are read as JSON intents files, never unpickled.
+CATALOG_MAGIC = b'LEXCATALOG\n'
+
+# Name rules and limits of the Lex V2 model API.
+_NAME = re.compile(r'^([0-9a-zA-Z][_-]?){1,100}$')
+MAX_DESCRIPTION_LENGTH = 200
+MAX_UTTERANCE_LENGTH = 500
+MAX_MESSAGE_GROUPS = 5
+MAX_RETRIES = 5
+SLOT_CONSTRAINTS = {'Required', 'Optional'}
+
+
+class CatalogError(ValueError):
+    """ Raised when an intents file does not match the schema. `errors` lists every problem found. """
+    def __init__(self, errors: list) -> None:
+        super().__init__(f"{len(errors)} error(s) in the intents:\n" + "\n".join(f" - {error}" for error in errors))
+        self.errors = errors
+
+
+def _validate_prompt(prompt, path: str, errors: list):
+    if not isinstance(prompt, dict):
+        errors.append(f"{path}: must be an object.")
+        return
+
+    groups = prompt.get('messageGroups')
+    if not isinstance(groups, list) or not 1 <= len(groups) <= MAX_MESSAGE_GROUPS:
+        errors.append(f"{path}.messageGroups: must be a list of 1 to {MAX_MESSAGE_GROUPS} message groups.")
+    else:
+        for index, group in enumerate(groups):
+            if not isinstance(group, dict) or not isinstance(group.get('message'), dict):
+                errors.append(f"{path}.messageGroups[{index}]: must have a message.")
+
+    retries = prompt.get('maxRetries')
+    if retries is not None and (not isinstance(retries, int) or not 0 <= retries <= MAX_RETRIES):
+        errors.append(f"{path}.maxRetries: must be an integer from 0 to {MAX_RETRIES}.")
+
+
+def _validate_description(description, path: str, errors: list):
+    if not isinstance(description, str) or len(description) > MAX_DESCRIPTION_LENGTH:
+        errors.append(f"{path}.description: must be a string of at most {MAX_DESCRIPTION_LENGTH} characters.")
+
+
+def _validate_slot(slot, path: str, errors: list):
+    if not isinstance(slot, dict):
+        errors.append(f"{path}: must be an object.")
+        return
+
+    if not isinstance(slot.get('name'), str) or not _NAME.match(slot['name']):
+        errors.append(f"{path}.name: must be letters, digits, '_' and '-', up to 100 characters.")
+    if not isinstance(slot.get('slotType'), str) or not slot['slotType']:
+        errors.append(f"{path}.slotType: is required.")
+    _validate_description(slot.get('description'), path, errors)
+
+    setting = slot.get('valueElicitationSetting')
+    if not isinstance(setting, dict):
+        errors.append(f"{path}.valueElicitationSetting: is required.")
+        return
+
+    if setting.get('slotConstraint') not in SLOT_CONSTRAINTS:
+        errors.append(f"{path}.valueElicitationSetting.slotConstraint: must be one of {sorted(SLOT_CONSTRAINTS)}.")
+    if 'promptSpecification' in setting:
+        _validate_prompt(setting['promptSpecification'], f"{path}.valueElicitationSetting.promptSpecification", errors)
+    elif setting.get('slotConstraint') == 'Required':
+        errors.append(f"{path}.valueElicitationSetting.promptSpecification: is required for a Required slot.")
+
+
+def validate_intents(intents):
+    """ Returns the list of problems in a dict of intents, in the format of AmazonLex/intents/sample.json. """
+    errors = []
+    if not isinstance(intents, dict):
+        return ["The intents file must be an object of intent name to intent."]
+
+    for intent_name, intent_data in intents.items():
+        path = intent_name
+        if not _NAME.match(intent_name):
+            errors.append(f"{path}: intent names must be letters, digits, '_' and '-', up to 100 characters.")
+        if not isinstance(intent_data, dict):
+            errors.append(f"{path}: must be an object.")
+            continue
+
+        _validate_description(intent_data.get('description'), path, errors)
+
+        utterances = intent_data.get('sampleUtterances')
+        if not isinstance(utterances, list):
+            errors.append(f"{path}.sampleUtterances: must be a list of strings.")
+        else:
+            seen = set()
+            for index, utterance in enumerate(utterances):
+                if not isinstance(utterance, str) or not utterance.strip() or len(utterance) > MAX_UTTERANCE_LENGTH:
+                    errors.append(f"{path}.sampleUtterances[{index}]: must be a non-empty string of at most {MAX_UTTERANCE_LENGTH} characters.")
+                elif utterance.casefold() in seen:
+                    errors.append(f"{path}.sampleUtterances[{index}]: duplicate utterance {utterance!r}.")
+                else:
+                    seen.add(utterance.casefold())
+
+        slots = intent_data.get('slots')
+        if not isinstance(slots, list):
+            errors.append(f"{path}.slots: must be a list.")
+        else:
+            slot_names = set()
+            for index, slot in enumerate(slots):
+                _validate_slot(slot, f"{path}.slots[{index}]", errors)
+                name = slot.get('name') if isinstance(slot, dict) else None
+                if name in slot_names:
+                    errors.append(f"{path}.slots[{index}].name: duplicate slot {name!r}.")
+                slot_names.add(name)
+
+        for setting_name in ('intentConfirmationSetting', 'intentClosingSetting'):
+            if setting_name in intent_data and not isinstance(intent_data[setting_name], dict):
+                errors.append(f"{path}.{setting_name}: must be an object.")
+        confirmation = intent_data.get('intentConfirmationSetting')
+        if isinstance(confirmation, dict) and confirmation.get('active', True) and 'promptSpecification' in confirmation:
+            _validate_prompt(confirmation['promptSpecification'], f"{path}.intentConfirmationSetting.promptSpecification", errors)
+
+    return errors
+
+
+def content_hash(data):
+    """ Hash of a JSON value that does not depend on key order or formatting. """
+    canonical = json.dumps(data, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class CompiledIntent:
+    """ A validated intent. `data` is its definition in the intents file format, as IntentSync expects it. """
+    __slots__ = ('name', 'hash', 'data')
+
+    def __init__(self, name: str, data: dict) -> None:
+        self.name = name
+        self.hash = content_hash(data)
+        self.data = data
+
+
+class IntentCatalog:
+    """ Validated intents, with a content hash per intent (`hashes()`) and for the whole catalog (`hash`). """
+    __slots__ = ('format', 'intents', 'hash')
+
+    def __init__(self, intents: dict) -> None:
+        errors = validate_intents(intents)
+        if errors:
+            raise CatalogError(errors)
+
+        self.format = CATALOG_FORMAT
+        self.intents = {name: CompiledIntent(name, data) for name, data in intents.items()}
+        self.hash = content_hash(self.hashes())
+
+    def __len__(self):
+        return len(self.intents)
+
+    def hashes(self):
+        """ Returns a dict of intent name to content hash. """
+        return {name: intent.hash for name, intent in self.intents.items()}
+
+    def unchanged_since(self, hashes: dict):
+        """ Names of the intents whose content hash is the same as in `hashes` (e.g. from the last deploy). """
+        return {name for name, intent in self.intents.items() if hashes.get(name) == intent.hash}
+
+    def to_dict(self):
+        """ Returns the intents in the intents file format. """
+        return {name: intent.data for name, intent in self.intents.items()}
+
+    def save(self, file_path: str):
+        with open(file_path, 'wb') as catalog_file:
+            catalog_file.write(CATALOG_MAGIC)
+            pickle.dump(self, catalog_file, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def from_json_file(cls, file_path: str):
+        """ Validates and compiles an intents file. Raises CatalogError if it does not match the schema. """
+        with open(file_path, 'r') as json_file:
+            return cls(json.load(json_file))
+
+    @classmethod
+    def load(cls, file_path: str):
+        """
+        Loads a compiled catalog (a file starting with CATALOG_MAGIC, as written by `save`), or compiles an
+        intents file (any other file, whatever its extension).
+        Only load catalogs you compiled yourself: unpickling runs code from the file.
+        """
+        with open(file_path, 'rb') as catalog_file:
+            if catalog_file.read(len(CATALOG_MAGIC)) != CATALOG_MAGIC:
+                return cls.from_json_file(file_path)
+            catalog = pickle.load(catalog_file)
+
+        if not isinstance(catalog, cls) or catalog.format != CATALOG_FORMAT:
+            raise CatalogError([f"{file_path} is not a compiled intent catalog of format {CATALOG_FORMAT}; compile it again."])
+        return catalog
+
+
+def compile_intent_file(source_path: str, catalog_path: str = None):
+    """ Compiles an intents file into `catalog_path` (the source path with a .catalog extension by default). """
+    catalog = IntentCatalog.from_json_file(source_path)
+    catalog_path = catalog_path or os.path.splitext(source_path)[0] + '.catalog'
+    catalog.save(catalog_path)
+    return catalog_path, catalog
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) < 2:
+        sys.exit("Usage: python3 intent_catalog.py <intents.json> [<output.catalog>]")
+
+    try:
+        catalog_path, catalog = compile_intent_file(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else None)
+    except CatalogError as e:
+        sys.exit(str(e))
+
+    print(f"{len(catalog)} intents compiled to {catalog_path} (hash {catalog.hash[:12]}).")
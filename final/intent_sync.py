@@ -0,0 +1,307 @@
+from lex_bot_controller import LexBotController
+from pagination import page_count
+from concurrent.futures import ThreadPoolExecutor
+
+# Intent settings of the intents file that update_intent replaces as a whole, so they are diffed and sent as well.
+INTENT_SETTINGS = ('intentConfirmationSetting', 'intentClosingSetting')
+
+
+class SlotChange:
+    """ A single slot operation: 'create' | 'update' | 'delete' | 'unchanged'. """
+    def __init__(self, action: str, name: str, slot_id: str = None, data: dict = None) -> None:
+        self.action = action
+        self.name = name
+        self.slot_id = slot_id
+        self.data = data
+
+
+class IntentChange:
+    """ Operations needed to make one remote intent match its local definition. """
+    def __init__(self, action: str, name: str, intent_id: str = None, data: dict = None) -> None:
+        self.action = action # 'create' | 'update' | 'delete' | 'unchanged'
+        self.name = name
+        self.intent_id = intent_id
+        self.data = data
+        self.slot_changes = []
+        self.update_intent = False
+
+    def calls(self):
+        """ Number of write calls needed to apply this change. """
+        if self.action == 'delete':
+            return 1
+
+        slot_calls = len([change for change in self.slot_changes if change.action != 'unchanged'])
+        if self.action == 'create':
+            return 1 + slot_calls + (1 if self.slot_changes else 0)
+
+        return slot_calls + (1 if self.update_intent else 0)
+
+
+class SyncPlan:
+    """ The diff between the local intents file and the bot DRAFT. """
+    def __init__(self) -> None:
+        self.changes = []
+        self.read_calls = 0
+        self.legacy_calls = 0
+
+    def write_calls(self):
+        return sum(change.calls() for change in self.changes)
+
+    def total_calls(self):
+        return self.read_calls + self.write_calls()
+
+    def saved_calls(self):
+        return self.legacy_calls - self.total_calls()
+
+    def print(self):
+        for change in self.changes:
+            print(f"[{change.action}] intent {change.name}")
+            for slot_change in change.slot_changes:
+                if slot_change.action != 'unchanged':
+                    print(f"    [{slot_change.action}] slot {slot_change.name}")
+
+        print(f"Model API calls: {self.total_calls()} ({self.read_calls} reads, {self.write_calls()} writes).")
+        print(f"Calls with the previous per-intent upsert: {self.legacy_calls}. Saved: {self.saved_calls()}.")
+
+
+def _matches(local, remote):
+    """
+    Checks if every value defined locally is equal in the remote definition.
+    Keys only present remotely are ignored, since the API fills in defaults the intents file does not declare.
+    """
+    if isinstance(local, dict):
+        if not isinstance(remote, dict):
+            return False
+        return all(key in remote and _matches(value, remote[key]) for key, value in local.items())
+
+    if isinstance(local, list):
+        if not isinstance(remote, list) or len(local) != len(remote):
+            return False
+        return all(_matches(item, remote_item) for item, remote_item in zip(local, remote))
+
+    return local == remote
+
+
+def _slot_summary_matches(slot_data: dict, remote_slot: dict):
+    """ Compares a local slot against its summary from list_slots, which only has part of its settings. """
+    value_elicitation_setting = slot_data['valueElicitationSetting']
+    return (
+        slot_data['slotType'] == remote_slot.get('slotTypeId')
+        and slot_data['description'] == remote_slot.get('description')
+        and value_elicitation_setting.get('slotConstraint') == remote_slot.get('slotConstraint')
+        and _matches(
+            value_elicitation_setting.get('promptSpecification'),
+            remote_slot.get('valueElicitationPromptSpecification')
+        )
+    )
+
+
+class IntentSync:
+    """
+    Syncs a dict of intents (in the format of AmazonLex/intents/sample.json) to the bot DRAFT.
+
+    The remote catalog is read once, diffed against the local intents, and only the
+    create/update/delete calls that are actually needed are issued. Slots whose list_slots summary matches
+    are described to compare their whole valueElicitationSetting (retries, sample utterances, ...).
+
+    Intents are independent of each other and are applied on a pool of `workers` threads.
+    The slots of an intent are applied in order by the same worker, before its slot priorities.
+    Pacing and retries on throttling are handled by the controller's throttle.
+    """
+    def __init__(self, controller: LexBotController, prune: bool = False, workers: int = 1) -> None:
+        self.controller = controller
+        self.prune = prune # Deletes remote intents and slots that are not in the local file.
+        self.workers = workers
+
+    def plan(self, intents: dict, unchanged: set = frozenset()) -> SyncPlan:
+        """
+        Fetches the remote catalog and returns the changes needed to match `intents`.
+        Intents named in `unchanged` (e.g. same content hash as in the last deploy) are not read nor diffed
+        when they exist remotely, so they cost no calls besides the intent listing.
+        """
+        plan = SyncPlan()
+
+        # Built-in intents (such as AMAZON.FallbackIntent) have a parent signature and are never touched.
+        intent_index = {
+            intent['intentName']: intent['intentId']
+            for intent in self.controller.iter_intents()
+            if not intent.get('parentIntentSignature')
+        }
+        plan.read_calls += page_count(len(intent_index))
+
+        for intent_name, intent_data in intents.items():
+            plan.legacy_calls += 3 + 2 * len(intent_data['slots'])
+
+            intent_id = intent_index.get(intent_name)
+            if intent_id is None:
+                change = IntentChange('create', intent_name, data=intent_data)
+                change.slot_changes = [
+                    SlotChange('create', slot_data['name'], data=slot_data)
+                    for slot_data in intent_data['slots']
+                ]
+                plan.changes.append(change)
+                continue
+
+            if intent_name in unchanged:
+                plan.changes.append(IntentChange('unchanged', intent_name, intent_id, intent_data))
+                continue
+
+            remote_intent = self.controller.describe_intent(intent_id)
+            remote_slots = {slot['slotName']: slot for slot in self.controller.iter_slots(intent_id)}
+            plan.read_calls += 1 + page_count(len(remote_slots))
+
+            plan.changes.append(self._diff_intent(plan, intent_name, intent_id, intent_data, remote_intent, remote_slots))
+
+        if self.prune:
+            for intent_name, intent_id in intent_index.items():
+                if intent_name not in intents:
+                    plan.changes.append(IntentChange('delete', intent_name, intent_id))
+
+        return plan
+
+    def _slot_matches(self, plan: SyncPlan, intent_id: str, slot_data: dict, remote_slot: dict):
+        """ Compares a local slot against the remote one, describing it only when the summary matches. """
+        if not _slot_summary_matches(slot_data, remote_slot):
+            return False
+
+        remote_definition = self.controller.describe_slot(intent_id, remote_slot['slotId'])
+        plan.read_calls += 1
+        return _matches(slot_data['valueElicitationSetting'], remote_definition.get('valueElicitationSetting'))
+
+    def _diff_intent(self, plan: SyncPlan, intent_name: str, intent_id: str, intent_data: dict, remote_intent: dict, remote_slots: dict):
+        change = IntentChange('unchanged', intent_name, intent_id, intent_data)
+
+        remote_utterances = [utterance['utterance'] for utterance in remote_intent.get('sampleUtterances', [])]
+        intent_changed = (
+            intent_data['description'] != remote_intent.get('description')
+            or intent_data['sampleUtterances'] != remote_utterances
+            or any(
+                # A setting removed from the file is cleared remotely by the update, which does not send it.
+                not _matches(intent_data[key], remote_intent.get(key)) if key in intent_data else remote_intent.get(key) is not None
+                for key in INTENT_SETTINGS
+            )
+        )
+
+        local_slot_names = []
+        for slot_data in intent_data['slots']:
+            slot_name = slot_data['name']
+            local_slot_names.append(slot_name)
+            remote_slot = remote_slots.get(slot_name)
+
+            if remote_slot is None:
+                change.slot_changes.append(SlotChange('create', slot_name, data=slot_data))
+            elif self._slot_matches(plan, intent_id, slot_data, remote_slot):
+                change.slot_changes.append(SlotChange('unchanged', slot_name, remote_slot['slotId'], slot_data))
+            else:
+                change.slot_changes.append(SlotChange('update', slot_name, remote_slot['slotId'], slot_data))
+
+        if self.prune:
+            for slot_name, remote_slot in remote_slots.items():
+                if slot_name not in local_slot_names:
+                    change.slot_changes.append(SlotChange('delete', slot_name, remote_slot['slotId']))
+
+        # Priorities follow the order of the slots in the local file.
+        slot_ids_by_priority = [
+            priority['slotId']
+            for priority in sorted(remote_intent.get('slotPriorities', []), key=lambda priority: priority['priority'])
+        ]
+        local_slot_ids = [
+            slot_change.slot_id
+            for slot_change in change.slot_changes
+            if slot_change.action != 'delete'
+        ]
+        priorities_changed = local_slot_ids != slot_ids_by_priority
+
+        change.update_intent = intent_changed or priorities_changed
+        if change.update_intent or change.calls() > 0:
+            change.action = 'update'
+
+        return change
+
+    def apply(self, plan: SyncPlan):
+        """ Issues the calls in the plan. Returns a dict of intent name to intent id. """
+        changes = [change for change in plan.changes if change.action != 'unchanged']
+        intent_ids = {
+            change.name: change.intent_id
+            for change in plan.changes
+            if change.action == 'unchanged'
+        }
+
+        if self.workers > 1:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                results = list(executor.map(self.apply_change, changes))
+        else:
+            results = [self.apply_change(change) for change in changes]
+
+        for change, intent_id in zip(changes, results):
+            if intent_id:
+                intent_ids[change.name] = intent_id
+
+        return intent_ids
+
+    def apply_change(self, change: IntentChange):
+        """ Issues the calls for a single intent. Returns the intent id, or None if it was deleted. """
+        if change.action == 'delete':
+            self.controller.delete_intent(change.intent_id)
+            print(f"Intent {change.name} deleted.")
+            return None
+
+        if change.action == 'unchanged':
+            return change.intent_id
+
+        intent_data = change.data
+        description = intent_data['description']
+        sample_utterances = [
+            {'utterance': utterance}
+            for utterance
+            in intent_data['sampleUtterances']
+        ]
+        settings = {key: intent_data[key] for key in INTENT_SETTINGS if key in intent_data}
+
+        intent_id = change.intent_id
+        if change.action == 'create':
+            intent_id = self.controller.insert_intent(change.name, description, sample_utterances, settings)
+            print(f"Intent {change.name} created with ID {intent_id}.")
+
+        slots_priorites = []
+        for slot_change in change.slot_changes:
+            slot_id = self._apply_slot_change(intent_id, change.name, slot_change)
+            if slot_id:
+                slots_priorites.append({
+                    'priority': len(slots_priorites),
+                    'slotId': slot_id
+                })
+
+        if change.update_intent or (change.action == 'create' and slots_priorites):
+            print(f"Updating intent {change.name}...")
+            # The priorities are always sent, even empty, so the ones of pruned slots do not stay on the intent.
+            self.controller.update_intent(intent_id, change.name, description, sample_utterances, slots_priorites, settings)
+
+        return intent_id
+
+    def _apply_slot_change(self, intent_id: str, intent_name: str, slot_change: SlotChange):
+        if slot_change.action == 'delete':
+            self.controller.delete_slot(intent_id, slot_change.slot_id)
+            print(f"Slot {slot_change.name} deleted from Intent {intent_name}.")
+            return None
+
+        if slot_change.action == 'unchanged':
+            return slot_change.slot_id
+
+        slot_data = slot_change.data
+        args = (
+            slot_data['name'],
+            slot_data['slotType'],
+            slot_data['description'],
+            slot_data['valueElicitationSetting']
+        )
+
+        if slot_change.action == 'create':
+            slot_id = self.controller.insert_slot(intent_id, *args)
+            print(f"Slot {slot_change.name} created with ID {slot_id} for Intent {intent_name}.")
+        else:
+            slot_id = slot_change.slot_id
+            self.controller.update_slot(intent_id, slot_id, *args)
+            print(f"Slot {slot_change.name} updated for Intent {intent_name}.")
+
+        return slot_id
@@ -0,0 +1,56 @@
+from bisect import bisect_left
+from threading import Lock
+
+# Bucket upper bounds in seconds: 12 per decade from 0.1ms to 100s, so percentiles are within ~10%.
+BUCKET_BOUNDS = [10 ** (exponent / 12) for exponent in range(-48, 25)]
+
+
+class LatencyHistogram:
+    """ Fixed-bucket latency histogram. Recording is O(log buckets) and memory does not grow. Thread safe. """
+    def __init__(self) -> None:
+        self.counts = [0] * (len(BUCKET_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._lock = Lock()
+
+    def record(self, seconds: float):
+        index = bisect_left(BUCKET_BOUNDS, seconds)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total += seconds
+            self.max = max(self.max, seconds)
+
+    def percentile(self, fraction: float):
+        """ Upper bound of the bucket holding the given fraction (0 ~ 1) of the samples, or None without samples. """
+        with self._lock:
+            if not self.count:
+                return None
+
+            target = fraction * self.count
+            seen = 0
+            for index, count in enumerate(self.counts):
+                seen += count
+                if seen >= target and count:
+                    return min(BUCKET_BOUNDS[index], self.max) if index < len(BUCKET_BOUNDS) else self.max
+
+            return self.max
+
+    def snapshot(self):
+        """ Returns a consistent copy of (counts, count, total, max), e.g. to export the buckets. """
+        with self._lock:
+            return list(self.counts), self.count, self.total, self.max
+
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'mean': self.mean(),
+            'p50': self.percentile(0.5),
+            'p95': self.percentile(0.95),
+            'p99': self.percentile(0.99),
+            'max': self.max,
+        }
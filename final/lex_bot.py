@@ -1,17 +1,74 @@
 from lex_bot_controller import LexBotController
-from datetime import datetime
-from pprint import pprint
-from time import sleep
-import json
+from intent_catalog import IntentCatalog
+from deploy_pipeline import DeployPipeline
+from session_store import SessionStore
+from fast_path import LocalFastPath
+from response_cache import ResponseCache
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from time import perf_counter
+from uuid import uuid4
+import copy
+
+def drop_empty_slots(session_state: dict):
+    """
+    Returns the session state without the slots that have no value, since Lex rejects them in requests.
+    The given state is not modified; it is only copied when there are empty slots to drop.
+    """
+    if not session_state:
+        return session_state
+
+    slots = session_state['intent']['slots']
+    if all(value is not None for value in slots.values()):
+        return session_state
+
+    intent = dict(session_state['intent'])
+    intent['slots'] = {slot: value for slot, value in slots.items() if value is not None}
+    session_state = dict(session_state)
+    session_state['intent'] = intent
+    return session_state
 
 class LexBot:
-    def __init__(self, bot_id, bot_name, bot_alias_id, bot_alias_name, bot_locale) -> None:
+    """
+    Handle of a Lex V2 bot alias and locale: detect intent turns, with optional session store, local fast path,
+    response cache, deadlines and hedging, and intent uploads through DeployPipeline.
+
+    The response cache is only cleared when this LexBot deploys through DeployPipeline. It is only safe without
+    a TTL when this process owns the deploys of the bot; otherwise give the ResponseCache a `ttl`, or other
+    processes and aliases moved outside the pipeline keep serving answers of the previous version.
+    """
+    def __init__(self, bot_id, bot_name, bot_alias_id, bot_alias_name, bot_locale, client=None, runtime=None, throttle=None, session_store: SessionStore = None, fast_path: LocalFastPath = None,
+                 response_cache: ResponseCache = None, timeout: float = None, hedge: bool = False) -> None:
         self.id = bot_id
         self.name = bot_name
         self.alias_id = bot_alias_id
         self.alias_name = bot_alias_name
         self.locale = bot_locale
-        self.controller = LexBotController(bot_id, bot_name, bot_alias_id, bot_alias_name, bot_locale)
+        # `timeout` bounds each recognize_text call; `hedge` fires a second call for turns slower than the p95.
+        # The latency of the calls is kept in `self.controller.latency`.
+        self.controller = LexBotController(
+            bot_id, bot_name, bot_alias_id, bot_alias_name, bot_locale, client, runtime, throttle, timeout, hedge
+        )
+        # When set, the latest session state of each session id is kept here and used when none is passed.
+        self.session_store = session_store
+        # When set, utterances outside of an ongoing dialog are first tried on a local classifier. Its intents must
+        # exist in the bot, so callers get the same intent names from local and cloud answers.
+        if fast_path is not None:
+            missing_intents = fast_path.missing_intents(self.controller.intent_index())
+            if missing_intents:
+                raise ValueError(f"The fast path answers intents that bot {bot_name} does not have: {', '.join(missing_intents)}.")
+        self.fast_path = fast_path
+        # When set, results of turns without session state are cached until new intents are deployed (or their TTL).
+        self.response_cache = response_cache
+
+    def close(self):
+        """ Stops the threads of the recognize_text calls with a timeout or hedging. """
+        self.controller.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
 
     def get_status(self):
         """ Returns the status of the Amazon Lex bot. """
@@ -23,73 +80,104 @@ class LexBot:
 
         Using the same `session_id` between requests allows keeping context of the conversations.
         Each user should have it's own session id.
-        """
-        if session_state:
-            slots = session_state['intent']['slots']
-            pop_list = []
-            for slot, value in slots.items():
-                if value is None:
-                    pop_list.append(slot)
-            
-            for pop_slot in pop_list:
-                slots.pop(pop_slot)
+        With a session store, `session_state` can be omitted and the state of the previous turn is used.
+
+        With a fast path, turns that are not answering the bot (no session state, or a closed dialog) are first
+        classified locally. Confident local answers skip the cloud and return `session_state` unchanged.
 
+        With a response cache, turns without session state may be answered from the cache. The session is then
+        not started in the cloud, so the returned state must be passed (or stored) for the next turn.
+        """
+        if session_state is None and self.session_store is not None:
+            session_state = self.session_store.get(session_id)
+
+        if self.fast_path is not None and (session_state is None or session_state['dialogAction']['type'] == 'Close'):
+            local_result = self.fast_path.classify(text)
+            if local_result is not None:
+                intent, confidence, bot_response = local_result
+                return intent, session_state, confidence, bot_response
+
+        cache_key = None
+        if session_state is None and self.response_cache is not None:
+            cache_key = ResponseCache.key(self.id, self.alias_id, self.locale, text)
+            cached_result = self.response_cache.get(cache_key)
+            if cached_result is not None:
+                # Each session gets its own copy of the cached state, which callers may change.
+                intent, session_state, confidence, bot_response = cached_result
+                session_state = copy.deepcopy(session_state)
+                if self.session_store is not None:
+                    self.session_store.put(session_id, session_state)
+                return intent, session_state, confidence, bot_response
+
+        session_state = drop_empty_slots(session_state)
+
+        start = perf_counter()
         intent, session_state, confidence, bot_response = self.controller.detect_intent(session_id, text, session_state)
-        return intent, session_state, confidence, bot_response
+        if self.fast_path is not None:
+            self.fast_path.record_cloud_call(perf_counter() - start)
 
-    def _upload_intents(self, intents: dict):
-        """ Uploads the intents in the dict to the Amazon Lex bot identified by the bot id and alias id. """
-        now = str(datetime.now())
+        if cache_key is not None:
+            self.response_cache.put(cache_key, (intent, copy.deepcopy(session_state), confidence, bot_response))
 
-        new_version = self.controller.create_new_version(f"Version with intents uploaded on {now}")
-        
-        # Sleeps for 5 seconds in order for the new version to finish processing in the cloud.
-        sleep(5)
+        if self.session_store is not None:
+            self.session_store.put(session_id, session_state)
 
-        # Update alias to point to new version  
-        self.controller.update_alias()
+        return intent, session_state, confidence, bot_response
 
-        for intent_name, intent_data in intents.items():            
-            sample_utterances = [
-                {'utterance': utterance}
-                for utterance
-                in intent_data['sampleUtterances']
-            ]
+    def detect_intent_batch(self, utterances, concurrency: int = 8):
+        """
+        Classifies many independent utterances concurrently, each in a new session.
 
-            description = intent_data['description']
-            
-            intent_id = self.controller.upsert_intent(intent_name, description, sample_utterances)
-            print(f"Intent {intent_name} created with ID {intent_id}.")
+        Yields `(text, intent, confidence)` as soon as each result arrives, so results are not in input order.
+        `utterances` can be any iterable; at most `2 * concurrency` of them are in flight at once.
+        """
+        def classify(text):
+            intent, _, confidence, _ = self.controller.detect_intent(str(uuid4()), text)
+            return text, intent, confidence
 
-            slots = intent_data['slots']
-            slots_priorites = []
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            pending = set()
+            for text in utterances:
+                if len(pending) >= 2 * concurrency:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield future.result()
 
-            for index, slot_data in enumerate(slots):
-                slot_name = slot_data['name']
-                slot_type = slot_data['slotType']
-                slot_description = slot_data['description']
-                value_elicitation_setting = slot_data['valueElicitationSetting']
+                pending.add(executor.submit(classify, text))
 
-                slot_id = self.controller.upsert_slot(
-                    intent_id, slot_name, slot_type, slot_description, value_elicitation_setting
-                )
-                print(f"Slot {slot_name} created with ID {slot_id} for Intent {intent_name}.")
+            for future in as_completed(pending):
+                yield future.result()
 
-                slots_priorites.append({
-                    'priority': index,
-                    'slotId': slot_id
-                })
+    def _upload_intents(self, intents: dict, dry_run: bool = False, prune: bool = False, workers: int = 1, state_file: str = None):
+        """
+        Deploys the intents in the dict to the Amazon Lex bot identified by the bot id and alias id.
 
-            print(f"Updating slot priorities for intent {intent_name}...")
-            self.controller.update_intent(intent_id, intent_name, description, sample_utterances, slots_priorites)
+        The intents are validated, synced to the DRAFT (only the intents and slots that differ are created, updated
+        or, if `prune`, deleted), built, published as a new version and the alias is pointed to it. Stages with
+        nothing to do are skipped; see DeployPipeline. Returns a DeployReport with the time spent per stage.
+        With `dry_run`, prints the sync plan and the number of calls it saves without changing the bot.
+        With `workers` > 1, independent intents are uploaded in parallel (slots of an intent stay in order).
+        """
+        catalog = intents if isinstance(intents, IntentCatalog) else IntentCatalog(intents)
+        pipeline = DeployPipeline(self, state_file, prune, workers)
 
-        print(f"Intents uploaded to bot {self.id} alias {self.alias_id}. Proceeding to build alias...")
+        if dry_run:
+            plan = pipeline.plan(catalog)
+            plan.print()
+            return plan
 
-    def upload_intents_from_file(self, file_path: str):
-        """ Consumes the json file and returns intents as a dict. """
-        intents = {}
+        report = pipeline.run(catalog)
+        report.print()
+        return report
 
-        with open(file_path, 'r') as json_file:
-            intents = json.load(json_file)
+    def upload_intents_from_file(self, file_path: str, dry_run: bool = False, prune: bool = False, workers: int = 1, state_file: str = None):
+        """
+        Consumes the intents file (json, or a catalog compiled with intent_catalog.py) and deploys its intents to the bot.
+        The intents are validated before any call is made; a CatalogError lists every problem found.
 
-        self._upload_intents(intents)
\ No newline at end of file
+        With a `state_file`, the content hash of each intent is saved there after the sync, and intents with
+        the same hash on the next upload are skipped without reading them from the bot. Delete the file to
+        diff every intent again, e.g. after editing the bot in the console. The file also lets a failed
+        deploy resume from its last completed stage.
+        """
+        return self._upload_intents(IntentCatalog.load(file_path), dry_run, prune, workers, state_file)
@@ -1,9 +1,57 @@
-import boto3
-from pprint import pprint
+from throttling import Throttle, ThrottledClient
+from client_registry import get_client
+from pagination import paginate
+from latency import LatencyHistogram
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from threading import Lock
+from time import monotonic, perf_counter
+import waiters
+
+def recognize_text_request(bot_id, bot_alias_id, locale_id, session_id, text, session_state: dict = None):
+    """ Builds the arguments of a lexv2-runtime recognize_text call. """
+    request_dict = {
+        'botId': bot_id,
+        'botAliasId': bot_alias_id,
+        'localeId': locale_id,
+        'sessionId': session_id,
+        'text': text
+    }
+    
+    if session_state:
+        request_dict['sessionState'] = session_state
+
+    return request_dict
+
+def parse_recognize_text_response(response: dict):
+    """ Returns intent, session_state, confidence and bot_response from a recognize_text response. """
+    intent, confidence, bot_response = None, -1, None
+    
+    # Lex sends no message when the intent has no response configured for the turn, e.g. a fallback.
+    if response.get('messages'):
+        bot_response = response['messages'][0]['content']
+
+    interpretations = response['interpretations']
+    session_state = response['sessionState']
+    dialog_action_type = session_state['dialogAction']['type']
+
+    if len(interpretations) > 0:
+        most_confident = interpretations[0]
+        intent = most_confident['intent']['name']
+        
+        # The fallback intent comes without a confidence score.
+        if dialog_action_type != "ConfirmIntent" and 'nluConfidence' in most_confident:
+            confidence = most_confident['nluConfidence']['score']
+
+    return intent, session_state, confidence, bot_response
+
 class LexBotController:
-    def __init__(self, bot_id, bot_name, bot_alias_id, bot_alias_name, bot_locale) -> None:
-        self.client = boto3.client('lexv2-models')
-        self.runtime = boto3.client('lexv2-runtime')
+    def __init__(self, bot_id, bot_name, bot_alias_id, bot_alias_name, bot_locale, client=None, runtime=None, throttle: Throttle = None,
+                 timeout: float = None, hedge: bool = False, hedge_percentile: float = 0.95, hedge_min_samples: int = 20,
+                 max_workers: int = 32) -> None:
+        # Model API calls are paced and retried on throttling. Pass the same throttle to controllers sharing a quota.
+        self.throttle = throttle or Throttle()
+        self.client = ThrottledClient(client or get_client('lexv2-models'), self.throttle)
+        self.runtime = runtime or get_client('lexv2-runtime')
         self.id = bot_id
         self.name = bot_name
         self.alias_id = bot_alias_id
@@ -11,6 +59,24 @@ class LexBotController:
         self.locale = bot_locale
         self.version = "DRAFT" # Study how to best represent a bot version here.
 
+        # Seconds a detect_intent call may take before raising TimeoutError. None waits indefinitely.
+        self.timeout = timeout
+        # Fires a second identical recognize_text when the first is slower than the `hedge_percentile` latency.
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        # Latency of recognize_text as seen by the caller. Timed out turns count with the time they waited (the
+        # timeout), so the tail and the hedge threshold are not biased low by the slowest calls being left out.
+        self.latency = LatencyHistogram()
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.timeouts = 0
+        self._lock = Lock() # Guards the counters, updated from the threads of detect_intent_batch.
+        # Runs the calls with a deadline or hedged. A call that timed out keeps its worker until botocore's own
+        # read timeout ends it, so `max_workers` must cover the concurrent turns plus the calls still timing out.
+        # Threads are only started on first use.
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='lex-recognize-text')
+
     def detect_intent(self, session_id, text, session_state: dict = None):
         """
         Returns the result of detect intent with text as input.
@@ -19,43 +85,77 @@ class LexBotController:
         Each user should have it's own session id.
         """
         # If the session id does not exist yet, throws bad request exception.
-        
-        request_dict = {
-            'botId': self.id,
-            'botAliasId': self.alias_id,
-            'localeId': self.locale,
-            'sessionId': session_id,
-            'text': text
-        }
-        
-        if session_state:
-            # session_state = self.runtime.get_session(
-            #     botId=self.id,
-            #     botAliasId=self.alias_id,
-            #     localeId=self.locale,
-            #     sessionId=session_id
-            # )['sessionState']
-            request_dict['sessionState'] = session_state
-
-        # TODO: Study start conversation and similars
-        response = self.runtime.recognize_text(**request_dict)
-
-        intent, confidence, bot_response = None, -1, None
-        
-        bot_response = response['messages'][0]['content']
+        request_dict = recognize_text_request(self.id, self.alias_id, self.locale, session_id, text, session_state)
+
+        start = perf_counter()
+        if self.timeout is None and not self.hedge:
+            response = self.runtime.recognize_text(**request_dict)
+        else:
+            # Hedging only when the request carries the session state: both calls then start from the same
+            # state and the winner's state is sent on the next turn, whatever the other call left in the cloud.
+            try:
+                response = self._recognize_text_with_deadline(request_dict, self.hedge and bool(session_state))
+            except TimeoutError:
+                self.latency.record(perf_counter() - start)
+                raise
+        self.latency.record(perf_counter() - start)
+
+        return parse_recognize_text_response(response)
+
+    def _recognize_text_with_deadline(self, request_dict: dict, hedge: bool):
+        """ Calls recognize_text on the executor, hedging and enforcing the timeout. The first answer wins. """
+        deadline = monotonic() + self.timeout if self.timeout is not None else None
+
+        def remaining():
+            return max(0.0, deadline - monotonic()) if deadline is not None else None
 
-        interpretations = response['interpretations']
-        session_state = response['sessionState']
-        dialog_action_type = session_state['dialogAction']['type']
+        first = self._executor.submit(self.runtime.recognize_text, **request_dict)
+        pending = {first}
 
-        if len(interpretations) > 0:
-            most_confident = interpretations[0]
-            intent = most_confident['intent']['name']
-            
-            if dialog_action_type != "ConfirmIntent":
-                confidence = most_confident['nluConfidence']['score']
+        hedge_delay = None
+        if hedge and self.latency.count >= self.hedge_min_samples:
+            hedge_delay = self.latency.percentile(self.hedge_percentile)
 
-        return intent, session_state, confidence, bot_response
+        if hedge_delay is not None:
+            time_left = remaining()
+            done, _ = wait(pending, timeout=hedge_delay if time_left is None else min(hedge_delay, time_left))
+            if not done and (time_left is None or time_left > hedge_delay):
+                pending.add(self._executor.submit(self.runtime.recognize_text, **request_dict))
+                with self._lock:
+                    self.hedges += 1
+
+        error = None
+        while pending:
+            done, pending = wait(pending, timeout=remaining(), return_when=FIRST_COMPLETED)
+            if not done:
+                # Calls still waiting for a worker are dropped; running ones cannot be interrupted.
+                for future in pending:
+                    future.cancel()
+                with self._lock:
+                    self.timeouts += 1
+                raise TimeoutError(f"recognize_text did not answer within {self.timeout} seconds.")
+
+            for future in done:
+                if future.exception() is None:
+                    for other in pending:
+                        other.cancel()
+                    if future is not first:
+                        with self._lock:
+                            self.hedge_wins += 1
+                    return future.result()
+                error = future.exception()
+
+        raise error
+
+    def close(self):
+        """ Stops the executor threads, dropping the calls still waiting for one. """
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
     
     def get_status(self):
         """
@@ -67,22 +167,29 @@ class LexBotController:
         return bot_info['botStatus']
 
     def build(self):
-        """ Requests a build of the bot and waits for it to finish. """
+        """ Requests a build of the bot locale and waits for it to finish. """
         self.client.build_bot_locale(
             botId=self.id,
             botVersion=self.version,
             localeId=self.locale
         )
 
-        wait_time = 5
-        print("Build requested. Checking status...")
-        status = "Updating"
-        while status == "Updating":
-            status = self.get_status()
-            print(f"Current status: {status}. Checking again in {wait_time} seconds...")
-        
+        print("Build requested. Waiting for the locale to be built...")
+        status = self.wait_for_locale(ready={'Built'})
         print(f"Build finished with status: {status}")
 
+    def wait_for_locale(self, **kwargs):
+        """ Waits for the bot locale of the current version to settle. See `waiters.wait_until` for the options. """
+        return waiters.wait_for_bot_locale(self.client, self.id, self.version, self.locale, **kwargs)
+
+    def wait_for_version(self, version: str, **kwargs):
+        """ Waits for a bot version to be Available. """
+        return waiters.wait_for_bot_version(self.client, self.id, version, **kwargs)
+
+    def wait_for_alias(self, **kwargs):
+        """ Waits for the bot alias to be Available. """
+        return waiters.wait_for_bot_alias(self.client, self.id, self.alias_id, **kwargs)
+
     def create_new_version(self, version_description: str):
         """ creates a new version of the bot and return the version. """ 
         response = self.client.create_bot_version(
@@ -97,19 +204,21 @@ class LexBotController:
 
         return response['botVersion']
 
+    def iter_versions(self, sort_by: dict = None):
+        """ Lazily yields every Amazon Lex bot version associated with this bot ID, across pages. """
+        return paginate(self.client.list_bot_versions, 'botVersionSummaries', sort_by=sort_by, botId=self.id)
+
     def list_versions(self):
         """ List all Amazon Lex bot versions associated with this bot ID. """
-        versions = self.client.list_bot_versions(botId=self.id)['botVersionSummaries']
-        output = [ dict(version) for version in versions ]
-        return output
+        return list(self.iter_versions())
 
-    def update_alias(self):
-        """ updates the alias to point to the version_id """
+    def update_alias(self, version: str = None):
+        """ updates the alias to point to the given version (the DRAFT by default) """
         self.client.update_bot_alias(
             botId=self.id,
             botAliasId=self.alias_id,
             botAliasName=self.alias_name,
-            botVersion=self.version,
+            botVersion=version or self.version,
             botAliasLocaleSettings={
                 self.locale: {
                     'enabled': True,
@@ -117,45 +226,99 @@ class LexBotController:
             },
         )
 
+    def alias_version(self):
+        """ Returns the version the alias points to. """
+        response = self.client.describe_bot_alias(botId=self.id, botAliasId=self.alias_id)
+        return response.get('botVersion')
+
+    def locale_status(self):
+        """ Returns the status of the bot locale in the current version, e.g. 'Built' or 'NotBuilt'. """
+        response = self.client.describe_bot_locale(botId=self.id, botVersion=self.version, localeId=self.locale)
+        return response['botLocaleStatus']
+
+    def iter_aliases(self):
+        """ Lazily yields every Amazon Lex bot alias associated with this bot ID, across pages. """
+        return paginate(self.client.list_bot_aliases, 'botAliasSummaries', botId=self.id)
+
     def list_aliases(self):
         """ List all Amazon Lex bots aliases associated with this bot ID. """
-        aliases = self.client.list_bot_aliases(botId=self.id)['botAliasSummaries']
-        output = [ dict(alias) for alias in aliases ]
-        return output
+        return list(self.iter_aliases())
     
+    def iter_intents(self, filters: list = None, sort_by: dict = None):
+        """ Lazily yields every Amazon Lex intent of this bot, in this locale, across pages. """
+        return paginate(
+            self.client.list_intents,
+            'intentSummaries',
+            filters=filters,
+            sort_by=sort_by,
+            botId=self.id,
+            botVersion=self.version,
+            localeId=self.locale
+        )
+
     def list_intents(self):
         """ List all Amazon Lex intents associated with this bot, in this intent. """
-        intents = self.client.list_intents(
+        return list(self.iter_intents())
+
+    def intent_index(self):
+        """ Returns a dict of intent name to intent id, built with a single listing. """
+        return {intent['intentName']: intent['intentId'] for intent in self.iter_intents()}
+
+    def describe_intent(self, intent_id: str):
+        """ Returns the full definition of an intent in the bot. """
+        return self.client.describe_intent(
             botId=self.id,
-            botVersion = self.version,
-            localeId=self.locale
-        )['intentSummaries']
-        output = [ dict(intent) for intent in intents ]
-        return output
+            botVersion=self.version,
+            localeId=self.locale,
+            intentId=intent_id
+        )
+
+    def delete_intent(self, intent_id: str):
+        """ Deletes an intent (and its slots) from the bot. """
+        self.client.delete_intent(
+            botId=self.id,
+            botVersion=self.version,
+            localeId=self.locale,
+            intentId=intent_id
+        )
+
+    def intent_exists(self, name: str, intent_index: dict = None):
+        """
+        Checks if the intent exists in the bot. Returns id if True, None if False
+        Looks it up in `intent_index` when given, otherwise lists only the intents with that name.
+        """
+        if intent_index is not None:
+            return intent_index.get(name)
 
-    def intent_exists(self, name: str):
-        """ Checks if the intent exists in the bot. Returns id if True, None if False """
-        intents = self.list_intents()
+        name_filter = [{'name': 'IntentName', 'values': [name], 'operator': 'EQ'}]
         output = None
-        for intent in intents:
+        for intent in self.iter_intents(filters=name_filter):
             if intent['intentName'] == name:
                 output = intent['intentId']
 
         return output
 
-    def upsert_intent(self, name: str, description: dict, sample_utterances: list):
-        """ Inserts (or updates if already exists) intent in the bot and returns the intent id. """
-        intent_id = self.intent_exists(name)
+    def upsert_intent(self, name: str, description: dict, sample_utterances: list, intent_index: dict = None):
+        """
+        Inserts (or updates if already exists) intent in the bot and returns the intent id.
+        Pass the `intent_index` of the bot to upsert many intents without listing them again.
+        """
+        intent_id = self.intent_exists(name, intent_index)
 
         if intent_id:
             self.update_intent(intent_id, name, description, sample_utterances)
         else:
             intent_id = self.insert_intent(name, description, sample_utterances)
+            if intent_index is not None:
+                intent_index[name] = intent_id
 
         return intent_id
         
-    def insert_intent(self, name: str, description: dict, sample_utterances: list):
-        """ inserts a new intent in the bot and returns the intent id. """
+    def insert_intent(self, name: str, description: dict, sample_utterances: list, settings: dict = None):
+        """
+        inserts a new intent in the bot and returns the intent id.
+        `settings` holds other create_intent arguments, such as intentConfirmationSetting and intentClosingSetting.
+        """
         response = self.client.create_intent(
             botId=self.id,
             botVersion=self.version,
@@ -163,12 +326,17 @@ class LexBotController:
             intentName=name,
             description=description,
             sampleUtterances=sample_utterances,
+            **(settings or {})
         )
 
         return response['intentId']
     
-    def update_intent(self, intent_id: str, name: str, description: dict, sample_utterances: list, slot_priorities: list = None):
-        """ Updates an intent in the bot. """
+    def update_intent(self, intent_id: str, name: str, description: dict, sample_utterances: list, slot_priorities: list = None,
+                      settings: dict = None):
+        """
+        Updates an intent in the bot. The update replaces the intent: settings not passed are cleared.
+        `slot_priorities` is only sent when not None: pass an empty list to clear the priorities of deleted slots.
+        """
         update_dict = {
             'botId': self.id,
             'botVersion': self.version,
@@ -177,42 +345,64 @@ class LexBotController:
             'intentName': name,
             'description': description,
             'sampleUtterances': sample_utterances,
+            **(settings or {})
         }
 
-        if slot_priorities:
+        if slot_priorities is not None:
             update_dict['slotPriorities'] = slot_priorities
         
         self.client.update_intent(**update_dict)
 
-    def list_slots(self, intent_id):
-        """ List all Amazon Lex slots associated with this bot, in this intent. """
-        slots = self.client.list_slots(
+    def iter_slots(self, intent_id, filters: list = None, sort_by: dict = None):
+        """ Lazily yields every Amazon Lex slot of this bot, in this intent, across pages. """
+        return paginate(
+            self.client.list_slots,
+            'slotSummaries',
+            filters=filters,
+            sort_by=sort_by,
             botId=self.id,
-            botVersion = self.version,
+            botVersion=self.version,
             localeId=self.locale,
             intentId=intent_id
-        )['slotSummaries']
-        output = [ dict(slot) for slot in slots ]
-        return output
+        )
+
+    def list_slots(self, intent_id):
+        """ List all Amazon Lex slots associated with this bot, in this intent. """
+        return list(self.iter_slots(intent_id))
 
-    def slot_exists(self, intent_id: str, name: str):
-        """ Checks if the slot exists in the bot, in the given intent. Returns id if True, None if False """
-        slots = self.list_slots(intent_id)
+    def slot_index(self, intent_id: str):
+        """ Returns a dict of slot name to slot id for the intent, built with a single listing. """
+        return {slot['slotName']: slot['slotId'] for slot in self.iter_slots(intent_id)}
+
+    def slot_exists(self, intent_id: str, name: str, slot_index: dict = None):
+        """
+        Checks if the slot exists in the bot, in the given intent. Returns id if True, None if False
+        Looks it up in `slot_index` when given, otherwise lists only the slots with that name.
+        """
+        if slot_index is not None:
+            return slot_index.get(name)
+
+        name_filter = [{'name': 'SlotName', 'values': [name], 'operator': 'EQ'}]
         output = None
-        for slot in slots:
+        for slot in self.iter_slots(intent_id, filters=name_filter):
             if slot['slotName'] == name:
                 output = slot['slotId']
 
         return output
 
-    def upsert_slot(self, intent_id: str, name: str, type_id: str, description: str, value_elicitation_setting: dict):
-        """ Inserts (or updates if already exists) slot in the bot, for the given intent, and returns the slot id. """
-        slot_id = self.slot_exists(intent_id, name)
+    def upsert_slot(self, intent_id: str, name: str, type_id: str, description: str, value_elicitation_setting: dict, slot_index: dict = None):
+        """
+        Inserts (or updates if already exists) slot in the bot, for the given intent, and returns the slot id.
+        Pass the `slot_index` of the intent to upsert many slots without listing them again.
+        """
+        slot_id = self.slot_exists(intent_id, name, slot_index)
 
         if slot_id:
             self.update_slot(intent_id, slot_id, name, type_id, description, value_elicitation_setting)
         else:
             slot_id = self.insert_slot(intent_id, name, type_id, description, value_elicitation_setting)
+            if slot_index is not None:
+                slot_index[name] = slot_id
 
         return slot_id
 
@@ -245,4 +435,24 @@ class LexBotController:
             'valueElicitationSetting':value_elicitation_setting
         }
 
-        self.client.update_slot(**update_dict)
\ No newline at end of file
+        self.client.update_slot(**update_dict)
+
+    def describe_slot(self, intent_id: str, slot_id: str):
+        """ Returns the full definition of a slot, including its whole valueElicitationSetting. """
+        return self.client.describe_slot(
+            botId=self.id,
+            botVersion=self.version,
+            localeId=self.locale,
+            intentId=intent_id,
+            slotId=slot_id
+        )
+
+    def delete_slot(self, intent_id: str, slot_id: str):
+        """ Deletes a slot from the given intent. """
+        self.client.delete_slot(
+            botId=self.id,
+            botVersion=self.version,
+            localeId=self.locale,
+            intentId=intent_id,
+            slotId=slot_id
+        )
\ No newline at end of file
@@ -1,11 +1,12 @@
 from lex_bot import LexBot
-from pprint import pprint
-from time import sleep
-import boto3
+from client_registry import get_client
+from session_store import DEFAULT_SESSION_TTL
+from pagination import paginate
+import waiters
 
 class LexManager:
-    def __init__(self, iam_role_arn) -> None:
-        self.client = boto3.client('lexv2-models')
+    def __init__(self, iam_role_arn, client=None) -> None:
+        self.client = client or get_client('lexv2-models')
         self.iam_role_arn = iam_role_arn
 
     def create_bot(self, bot_name: str, bot_alias: str, bot_locale: str):
@@ -20,9 +21,11 @@ class LexManager:
         Creates a new locale with the specified language code and loads this language intents.
         Creates a new alias with the specified alias name.
 
+        Each step waits for the resource it created to be ready in the cloud before moving on.
+
         Returns the new bot ID and and AliasID.
         """
-        timeout = 20 * 60 # Time in seconds the bot will retain information about a particular conversation.
+        timeout = DEFAULT_SESSION_TTL # Time in seconds the bot will retain information about a particular conversation.
         bot_version = "DRAFT"
 
         create_bot_res = self.client.create_bot(
@@ -36,7 +39,7 @@ class LexManager:
 
         new_bot_id = create_bot_res['botId']
         print(f"Newly created bot ID: {new_bot_id}")
-        sleep(5)
+        waiters.wait_for_bot(self.client, new_bot_id)
 
         # create bot version
         create_bot_version_res = self.client.create_bot_version(
@@ -51,7 +54,7 @@ class LexManager:
 
         new_bot_version_number = create_bot_version_res['botVersion']
         print(f"Newly created bot version number: {new_bot_version_number}")
-        sleep(5)
+        waiters.wait_for_bot_version(self.client, new_bot_id, new_bot_version_number)
 
         # Determines the threshold where Amazon Lex will insert the AMAZON.FallbackIntent, AMAZON.KendraSearchIntent, or both when returning alternative intents.
         # AMAZON.FallbackIntent and AMAZON.KendraSearchIntent are only inserted if they are configured for the bot.
@@ -74,7 +77,7 @@ class LexManager:
             localeId=bot_locale,
             nluIntentConfidenceThreshold=nlu_intent_confidence_thresold,
         )
-        sleep(5)
+        waiters.wait_for_bot_locale(self.client, new_bot_id, bot_version, bot_locale)
 
         create_bot_alias_res = self.client.create_bot_alias(
             botAliasName=bot_alias,
@@ -85,15 +88,21 @@ class LexManager:
 
         new_bot_alias_id = create_bot_alias_res['botAliasId']
         print(f"Newly created bot alias ID: {new_bot_alias_id}")
-        sleep(5)
+        waiters.wait_for_bot_alias(self.client, new_bot_id, new_bot_alias_id)
 
         return new_bot_id, new_bot_alias_id
 
+    def iter_bots(self, filters: list = None, sort_by: dict = None):
+        """ Lazily yields every Amazon Lex bot in the region, across pages. """
+        return paginate(self.client.list_bots, 'botSummaries', filters=filters, sort_by=sort_by)
+
     def list_bots(self):
         """ List all Amazon Lex bots in the region. """
-        bots = self.client.list_bots()['botSummaries']
-        output = [ dict(bot) for bot in bots ]
-        return output
+        return list(self.iter_bots())
+
+    def bot_index(self):
+        """ Returns a dict of bot name to bot id, built with a single listing. """
+        return {bot['botName']: bot['botId'] for bot in self.iter_bots()}
 
     def get_bot(self, bot_id, bot_alias_id, bot_locale) -> LexBot:
         """
@@ -122,13 +131,17 @@ class LexManager:
     def list_bot_aliases(self, bot_id: str):
         """ List all Amazon Lex bots aliases associated with the bot Id. """
         print(f"List of Lex bots aliases for the bot ID {bot_id}:")
-        aliases = self.client.list_bot_aliases(botId=bot_id)['botAliasSummaries']
-        output = [ dict(alias) for alias in aliases ]
-        return output
+        return list(self.iter_bot_aliases(bot_id))
+
+    def iter_bot_aliases(self, bot_id: str):
+        """ Lazily yields every Amazon Lex bot alias associated with the bot Id, across pages. """
+        return paginate(self.client.list_bot_aliases, 'botAliasSummaries', botId=bot_id)
 
     def list_bot_versions(self, bot_id: str):
         """ List all Amazon Lex bot versions associated with the bot Id. """
         print(f"List of Lex bots versions for the bot ID {bot_id}:")
-        versions = self.client.list_bot_versions(botId=bot_id)['botVersionSummaries']
-        output = [ dict(version) for version in versions ]
-        return output
\ No newline at end of file
+        return list(self.iter_bot_versions(bot_id))
+
+    def iter_bot_versions(self, bot_id: str, sort_by: dict = None):
+        """ Lazily yields every Amazon Lex bot version associated with the bot Id, across pages. """
+        return paginate(self.client.list_bot_versions, 'botVersionSummaries', sort_by=sort_by, botId=bot_id)
\ No newline at end of file
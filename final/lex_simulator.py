@@ -0,0 +1,350 @@
+"""
+Offline simulator of the Lex V2 runtime, driven by an intents file in the format of AmazonLex/intents/sample.json.
+
+LexRuntimeSimulator stands in for the boto3 'lexv2-runtime' client in-process (pair it with
+fake_lex.FakeLexModelsClient for the model calls). Run this module to serve it over HTTP on the AWS REST path
+of RecognizeText, so any boto3 client can use it:
+
+    PYTHONPATH=../tensorflow python3 lex_simulator.py [--intents ../AmazonLex/intents/sample.json] [--port 8000]
+
+    runtime = boto3.client('lexv2-runtime', endpoint_url='http://localhost:8000', region_name='us-east-1',
+                           aws_access_key_id='simulator', aws_secret_access_key='simulator')
+"""
+from datetime import date
+from fast_path import load_normalizer
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from session_store import InMemorySessionStore
+from threading import Lock
+from time import sleep
+import json
+import re
+
+FALLBACK_INTENT = 'FallbackIntent'
+
+YES = {'sim', 's', 'yes', 'y', 'claro', 'pode', 'ok', 'isso', 'confirmo', 'pode sim', 'sim pode'}
+NO = {'nao', 'n', 'no', 'cancelar', 'cancela', 'nao pode'}
+
+_EMAIL = re.compile(r'[\w.+-]+@[\w-]+(\.[\w-]+)+')
+_DATE = re.compile(r'(\d{1,2})[/.-](\d{1,2})[/.-](\d{4})|(\d{4})-(\d{1,2})-(\d{1,2})')
+_TIME = re.compile(r'(\d{1,2})(?:[:h](\d{2}))?\s*(?:h|horas)?$')
+_NUMBER = re.compile(r'-?\d+([.,]\d+)?')
+
+
+def _resolve_date(text: str):
+    match = _DATE.search(text)
+    if not match:
+        return None
+    day, month, year = (match.group(1), match.group(2), match.group(3)) if match.group(1) else (match.group(6), match.group(5), match.group(4))
+    try:
+        return date(int(year), int(month), int(day)).isoformat()
+    except ValueError:
+        return None
+
+
+def _resolve_time(text: str):
+    match = _TIME.search(text.strip())
+    if not match or int(match.group(1)) > 23 or int(match.group(2) or 0) > 59:
+        return None
+    return f"{int(match.group(1)):02d}:{match.group(2) or '00'}"
+
+
+def _resolve_email(text: str):
+    match = _EMAIL.search(text)
+    return match.group(0) if match else None
+
+
+def _resolve_number(text: str):
+    match = _NUMBER.search(text)
+    return match.group(0).replace(',', '.') if match else None
+
+
+# Built-in slot types the simulator validates. Any other type accepts the utterance as is.
+SLOT_RESOLVERS = {
+    'AMAZON.Date': _resolve_date,
+    'AMAZON.Time': _resolve_time,
+    'AMAZON.EmailAddress': _resolve_email,
+    'AMAZON.Number': _resolve_number,
+}
+
+
+def _message(setting: dict):
+    """ Text of the first plain text message of a prompt or response setting, or None. """
+    for group in (setting or {}).get('messageGroups', []):
+        text = group.get('message', {}).get('plainTextMessage', {}).get('value')
+        if text:
+            return text
+    return None
+
+
+class SimulatedIntent:
+    """ What the simulator needs to know about an intent: utterances, slots in elicitation order and responses. """
+    __slots__ = ('name', 'utterances', 'words', 'slots', 'confirmation_prompt', 'confirmation_response', 'declination_response', 'closing_response')
+
+    def __init__(self, name: str, utterances: list, slots: list, confirmation_prompt: str = None,
+                 confirmation_response: str = None, declination_response: str = None, closing_response: str = None) -> None:
+        self.name = name
+        self.utterances = utterances
+        self.words = [] # Words of each utterance, set by the simulator with its normalization.
+        self.slots = slots # [(slot name, slot type, prompt)]
+        self.confirmation_prompt = confirmation_prompt
+        self.confirmation_response = confirmation_response
+        self.declination_response = declination_response
+        self.closing_response = closing_response
+
+    def score(self, words: set):
+        """ Best word overlap (Jaccard index) between the words and a sample utterance. """
+        return max((len(words & utterance) / len(words | utterance) for utterance in self.words if utterance), default=0.0)
+
+
+def _simulated_intent(name: str, utterances: list, slots: list, intent_data: dict):
+    """ Builds a SimulatedIntent, taking its responses from the intentConfirmationSetting and intentClosingSetting. """
+    confirmation = intent_data.get('intentConfirmationSetting', {})
+    closing = intent_data.get('intentClosingSetting', {})
+    active_confirmation = confirmation.get('active', True) and confirmation.get('promptSpecification')
+
+    return SimulatedIntent(
+        name,
+        utterances,
+        slots,
+        _message(confirmation.get('promptSpecification')) if active_confirmation else None,
+        _message(confirmation.get('confirmationResponse')) if active_confirmation else None,
+        _message(confirmation.get('declinationResponse')) if active_confirmation else None,
+        _message(closing.get('closingResponse')) if closing.get('active', True) else None,
+    )
+
+
+class LexRuntimeSimulator:
+    """
+    Stand-in for the boto3 'lexv2-runtime' client that runs the Lex dialog locally. Thread safe.
+
+    A turn outside of a dialog is classified by word overlap with the sample utterances (FallbackIntent below
+    `threshold`). The intent's slots are then elicited in order with their prompts (ElicitSlot), built-in slot
+    types being validated and re-elicited when the answer does not parse; once filled, the intent is confirmed
+    (ConfirmIntent) if it has a confirmation prompt, and closed (Close) as Fulfilled, or Failed when denied.
+
+    Like Lex, the latest state of each session is kept for turns that do not send a `sessionState`.
+    Each call sleeps `latency` seconds. Texts are compared after `normalize`, by default the normalization of the
+    notebook model (see fast_path.load_normalizer).
+    """
+    def __init__(self, intents: list, threshold: float = 0.4, latency: float = 0.0, normalize=None) -> None:
+        self.normalize = normalize or load_normalizer()
+        self.intents = {intent.name: intent for intent in intents}
+        for intent in intents:
+            intent.words = [set(self.normalize(utterance).split()) for utterance in intent.utterances]
+        self.threshold = threshold
+        self.latency = latency
+        self.sessions = InMemorySessionStore()
+        self.calls = 0
+        self._lock = Lock()
+
+    @classmethod
+    def from_intent_file(cls, file_path: str, **kwargs):
+        """ Builds a simulator from an intents file in the format of AmazonLex/intents/sample.json. """
+        with open(file_path, 'r') as json_file:
+            data = json.load(json_file)
+
+        intents = [
+            _simulated_intent(
+                intent_name,
+                intent_data['sampleUtterances'],
+                [
+                    (slot['name'], slot['slotType'], _message(slot['valueElicitationSetting'].get('promptSpecification')))
+                    for slot in intent_data.get('slots', [])
+                ],
+                intent_data
+            )
+            for intent_name, intent_data in data.items()
+        ]
+
+        return cls(intents, **kwargs)
+
+    @classmethod
+    def from_models_client(cls, client, **kwargs):
+        """
+        Builds a simulator from the intents uploaded to a fake_lex.FakeLexModelsClient. Slots are elicited in
+        the order of the intent's slotPriorities.
+        """
+        intents = []
+        for intent_id, intent in client.intents.items():
+            slots = client.slots[intent_id]
+            priorities = {priority['slotId']: priority['priority'] for priority in intent.get('slotPriorities', [])}
+            ordered = sorted(slots.values(), key=lambda slot: priorities.get(slot['slotId'], len(priorities)))
+
+            intents.append(_simulated_intent(
+                intent['intentName'],
+                [utterance['utterance'] if isinstance(utterance, dict) else utterance for utterance in intent['sampleUtterances']],
+                [(slot['slotName'], slot['slotTypeId'], _message(slot.get('valueElicitationPromptSpecification'))) for slot in ordered],
+                intent
+            ))
+
+        return cls(intents, **kwargs)
+
+    def classify(self, text: str):
+        """ Returns [(intent name, score)] from most to least likely, above zero. """
+        words = set(self.normalize(text).split())
+        scores = [(name, round(intent.score(words), 2)) for name, intent in self.intents.items()]
+        return sorted((score for score in scores if score[1] > 0), key=lambda score: -score[1])
+
+    def recognize_text(self, botId, botAliasId, localeId, sessionId, text, sessionState=None, **kwargs):
+        with self._lock:
+            self.calls += 1
+        if self.latency:
+            sleep(self.latency)
+
+        if sessionState is None:
+            sessionState = self.sessions.get(sessionId)
+
+        dialog_action = (sessionState or {}).get('dialogAction', {})
+        active = self.intents.get((sessionState or {}).get('intent', {}).get('name'))
+
+        if active is not None and dialog_action.get('type') == 'ElicitSlot':
+            response = self._fill_slot(active, sessionState, dialog_action['slotToElicit'], text)
+        elif active is not None and dialog_action.get('type') == 'ConfirmIntent':
+            response = self._confirm(active, sessionState, text)
+        else:
+            response = self._start_intent(sessionState, text)
+
+        response['sessionId'] = sessionId
+        self.sessions.put(sessionId, response['sessionState'])
+        return response
+
+    def _start_intent(self, session_state: dict, text: str):
+        scores = self.classify(text)
+        attributes = (session_state or {}).get('sessionAttributes', {})
+
+        if not scores or scores[0][1] < self.threshold:
+            intent_state = {'name': FALLBACK_INTENT, 'slots': {}, 'state': 'ReadyForFulfillment', 'confirmationState': 'None'}
+            return self._response(intent_state, {'type': 'Close'}, None, attributes, scores)
+
+        intent = self.intents[scores[0][0]]
+        intent_state = {
+            'name': intent.name,
+            'slots': {name: None for name, _, _ in intent.slots},
+            'state': 'InProgress',
+            'confirmationState': 'None',
+        }
+        return self._next_step(intent, intent_state, attributes, scores)
+
+    def _fill_slot(self, intent: SimulatedIntent, session_state: dict, slot_name: str, text: str):
+        intent_state = dict(session_state['intent'])
+        intent_state['slots'] = dict(intent_state.get('slots') or {})
+        slot_type = next((slot_type for name, slot_type, _ in intent.slots if name == slot_name), None)
+
+        resolver = SLOT_RESOLVERS.get(slot_type)
+        value = resolver(text) if resolver else text.strip()
+        if value:
+            intent_state['slots'][slot_name] = {
+                'value': {'originalValue': text, 'interpretedValue': value, 'resolvedValues': [value]}
+            }
+
+        return self._next_step(intent, intent_state, session_state.get('sessionAttributes', {}), [(intent.name, 1.0)])
+
+    def _next_step(self, intent: SimulatedIntent, intent_state: dict, attributes: dict, scores: list):
+        """ Elicits the first empty slot, else asks for confirmation, else closes the intent. """
+        for name, _, prompt in intent.slots:
+            if not intent_state['slots'].get(name):
+                return self._response(intent_state, {'type': 'ElicitSlot', 'slotToElicit': name}, prompt, attributes, scores)
+
+        if intent.confirmation_prompt:
+            return self._response(intent_state, {'type': 'ConfirmIntent'}, intent.confirmation_prompt, attributes, scores)
+
+        intent_state['state'] = 'Fulfilled'
+        return self._response(intent_state, {'type': 'Close'}, intent.closing_response, attributes, scores)
+
+    def _confirm(self, intent: SimulatedIntent, session_state: dict, text: str):
+        intent_state = dict(session_state['intent'])
+        attributes = session_state.get('sessionAttributes', {})
+        answer = self.normalize(text)
+        scores = [(intent.name, 1.0)]
+
+        if answer in YES:
+            intent_state.update(state='Fulfilled', confirmationState='Confirmed')
+            message = intent.confirmation_response or intent.closing_response
+            return self._response(intent_state, {'type': 'Close'}, message, attributes, scores)
+
+        if answer in NO:
+            intent_state.update(state='Failed', confirmationState='Denied')
+            return self._response(intent_state, {'type': 'Close'}, intent.declination_response, attributes, scores)
+
+        return self._response(intent_state, {'type': 'ConfirmIntent'}, intent.confirmation_prompt, attributes, scores)
+
+    def _response(self, intent_state: dict, dialog_action: dict, message: str, attributes: dict, scores: list):
+        """ Builds a recognize_text response. Interpretations list the active intent first, then the other candidates. """
+        # Like Lex, the fallback interpretation has no confidence score.
+        interpretations = [{'intent': intent_state}]
+        if scores and intent_state['name'] == scores[0][0]:
+            interpretations[0]['nluConfidence'] = {'score': scores[0][1]}
+
+        for name, score in scores:
+            if name != intent_state['name']:
+                interpretations.append({
+                    'intent': {'name': name, 'slots': {}, 'confirmationState': 'None'},
+                    'nluConfidence': {'score': score},
+                })
+        if intent_state['name'] != FALLBACK_INTENT:
+            interpretations.append({'intent': {'name': FALLBACK_INTENT, 'slots': {}}})
+
+        return {
+            'messages': [{'content': message, 'contentType': 'PlainText'}] if message else [],
+            'sessionState': {
+                'dialogAction': dialog_action,
+                'intent': intent_state,
+                'sessionAttributes': attributes,
+            },
+            'interpretations': interpretations,
+        }
+
+
+# RecognizeText REST path: POST /bots/{botId}/botAliases/{botAliasId}/botLocales/{localeId}/sessions/{sessionId}/text
+_RECOGNIZE_TEXT_PATH = re.compile(r'^/bots/([^/]+)/botAliases/([^/]+)/botLocales/([^/]+)/sessions/([^/]+)/text$')
+
+
+def create_server(simulator: LexRuntimeSimulator, host: str = 'localhost', port: int = 8000):
+    """ Returns an HTTP server answering RecognizeText requests with the simulator. Call serve_forever() to run it. """
+    class RecognizeTextHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_POST(self):
+            match = _RECOGNIZE_TEXT_PATH.match(self.path.split('?')[0])
+            body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+
+            if match is None:
+                self._send(404, {'message': f"Unknown path {self.path}"}, 'ResourceNotFoundException')
+                return
+
+            bot_id, bot_alias_id, locale_id, session_id = match.groups()
+            response = simulator.recognize_text(
+                botId=bot_id, botAliasId=bot_alias_id, localeId=locale_id, sessionId=session_id,
+                text=body.get('text', ''), sessionState=body.get('sessionState')
+            )
+            self._send(200, response)
+
+        def _send(self, status: int, payload: dict, error_type: str = None):
+            data = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            if error_type:
+                self.send_header('x-amzn-ErrorType', error_type)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return ThreadingHTTPServer((host, port), RecognizeTextHandler)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--intents', default="../AmazonLex/intents/sample.json")
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--latency', type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = create_server(LexRuntimeSimulator.from_intent_file(args.intents, latency=args.latency), args.host, args.port)
+    print(f"Lex runtime simulator listening on http://{args.host}:{args.port}")
+    server.serve_forever()
@@ -0,0 +1,288 @@
+"""
+Load test that replays scripted conversations against an NLU backend.
+
+Conversations arrive as a Poisson process at `--rate` per second (open loop: arrivals do not wait for
+earlier conversations to finish), and the turns of each conversation are sent one after the other,
+passing the state of each turn to the next. Reports throughput, per-turn latency percentiles and error rates.
+
+Usage:
+    python3 load_test.py conversations/sample.jsonl --backend lex --record recordings.jsonl
+    python3 load_test.py conversations/sample.jsonl --backend replay --replay recordings.jsonl [--latency 0.05]
+    PYTHONPATH=../tensorflow python3 load_test.py conversations/sample.jsonl --backend local [--model ../tensorflow/models/simple_intent | --exact-match]
+    python3 load_test.py conversations/sample.jsonl --backend dialogflow --agent projects/.../agents/...
+
+The replay backend answers with recognize_text responses recorded by a previous run, so it runs offline.
+"""
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from latency import LatencyHistogram
+from threading import Lock
+from time import perf_counter, sleep
+from uuid import uuid4
+import argparse
+import copy
+import json
+import random
+
+
+def load_conversations(file_path: str):
+    """
+    Reads a JSONL file with one conversation per line: {"id": ..., "turns": ["Quero me registrar", ...]}.
+    Turns may also be objects with a "text" key. Returns a list of (id, texts).
+    """
+    conversations = []
+    with open(file_path, 'r') as conversations_file:
+        for line_number, line in enumerate(conversations_file, 1):
+            if not line.strip():
+                continue
+
+            conversation = json.loads(line)
+            texts = [turn['text'] if isinstance(turn, dict) else turn for turn in conversation['turns']]
+            conversations.append((conversation.get('id', f"conversation-{line_number}"), texts))
+
+    return conversations
+
+
+class LoadTestReport:
+    """ Throughput, turn latency and errors of a load test run. Thread safe. """
+    def __init__(self) -> None:
+        self.latency = LatencyHistogram() # Latency of the answered turns.
+        self.start_delay = LatencyHistogram() # Delay between the arrival of a conversation and its first turn.
+        self.conversations = 0
+        self.failed_conversations = 0
+        self.turns = 0
+        self.errors = Counter() # Exception name -> failed turns.
+        self.elapsed = 0.0
+        self._lock = Lock()
+
+    def record_turn(self, seconds: float):
+        self.latency.record(seconds)
+        with self._lock:
+            self.turns += 1
+
+    def record_error(self, error: Exception):
+        with self._lock:
+            self.turns += 1
+            self.errors[type(error).__name__] += 1
+
+    def record_conversation(self, start_delay: float, failed: bool):
+        self.start_delay.record(start_delay)
+        with self._lock:
+            self.conversations += 1
+            if failed:
+                self.failed_conversations += 1
+
+    def throughput(self):
+        return self.turns / self.elapsed if self.elapsed else 0.0
+
+    def error_rate(self):
+        return sum(self.errors.values()) / self.turns if self.turns else 0.0
+
+    def summary(self):
+        return {
+            'conversations': self.conversations,
+            'failed_conversations': self.failed_conversations,
+            'turns': self.turns,
+            'elapsed': self.elapsed,
+            'throughput': self.throughput(),
+            'error_rate': self.error_rate(),
+            'errors': dict(self.errors),
+            'latency': self.latency.summary(),
+            'start_delay': self.start_delay.summary(),
+        }
+
+    def print(self):
+        print(
+            f"{self.conversations} conversations ({self.failed_conversations} failed), {self.turns} turns "
+            f"in {self.elapsed:.2f}s: {self.throughput():.1f} turns/s"
+        )
+        if self.latency.count:
+            latency = self.latency.summary()
+            print(
+                f"turn latency: p50 {latency['p50'] * 1000:.1f}ms, p95 {latency['p95'] * 1000:.1f}ms, "
+                f"p99 {latency['p99'] * 1000:.1f}ms, max {latency['max'] * 1000:.1f}ms"
+            )
+        if self.start_delay.count:
+            print(f"start delay: p99 {self.start_delay.percentile(0.99) * 1000:.1f}ms")
+        print(f"error rate: {self.error_rate():.2%}" + (f" {dict(self.errors)}" if self.errors else ""))
+
+
+def run_load_test(backend, conversations: list, rate: float, count: int = None, concurrency: int = 64,
+                  think_time: float = 0.0, seed: int = None):
+    """
+    Replays `count` conversations (all of them by default, cycling through the list if more) against
+    the NLUBackend and returns a LoadTestReport.
+
+    Conversations arrive at `rate` per second on average, with exponential inter-arrival times. Up to
+    `concurrency` conversations run at once; later arrivals wait, which shows up in the start delay.
+    A turn that raises ends its conversation, since the following turns depend on its state.
+    """
+    report = LoadTestReport()
+    arrivals = random.Random(seed)
+    count = len(conversations) if count is None else count
+
+    def run_conversation(texts, arrival):
+        start_delay = perf_counter() - arrival
+        session_id = str(uuid4())
+        state = None
+        failed = False
+
+        for index, text in enumerate(texts):
+            if index and think_time:
+                sleep(think_time)
+
+            start = perf_counter()
+            try:
+                result = backend.detect_intent(session_id, text, state)
+            except Exception as e:
+                report.record_error(e)
+                failed = True
+                break
+
+            report.record_turn(perf_counter() - start)
+            state = result.state
+
+        report.record_conversation(start_delay, failed)
+
+    start = perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='load-test') as executor:
+        arrival = start
+        for index in range(count):
+            arrival += arrivals.expovariate(rate)
+            delay = arrival - perf_counter()
+            if delay > 0:
+                sleep(delay)
+
+            _, texts = conversations[index % len(conversations)]
+            executor.submit(run_conversation, texts, arrival)
+
+    report.elapsed = perf_counter() - start
+    return report
+
+
+def _recording_key(text: str, session_state: dict):
+    return json.dumps([text, session_state], sort_keys=True)
+
+
+class RecordingRuntimeClient:
+    """
+    Wraps a 'lexv2-runtime' client and appends each recognize_text request and response to a JSONL file,
+    to be replayed by ReplayRuntimeClient.
+    """
+    def __init__(self, runtime, file_path: str) -> None:
+        self.runtime = runtime
+        self.file_path = file_path
+        self._lock = Lock()
+
+    def recognize_text(self, **kwargs):
+        response = self.runtime.recognize_text(**kwargs)
+        recorded = {key: value for key, value in response.items() if key != 'ResponseMetadata'}
+
+        with self._lock, open(self.file_path, 'a') as recording_file:
+            recording_file.write(json.dumps({
+                'text': kwargs['text'],
+                'sessionState': kwargs.get('sessionState'),
+                'response': recorded,
+            }, default=str) + '\n')
+
+        return response
+
+
+class ReplayRuntimeClient:
+    """
+    Stand-in for the 'lexv2-runtime' client that answers recognize_text with recorded responses.
+    Responses are matched on the text and the session state sent, so replaying the recorded conversations
+    follows the same dialog. Each call sleeps `latency` seconds. Requests that were not recorded raise KeyError.
+    """
+    def __init__(self, file_path: str, latency: float = 0.0) -> None:
+        self.latency = latency
+        self.calls = 0
+        self.responses = {}
+        self._lock = Lock()
+        with open(file_path, 'r') as recording_file:
+            for line in recording_file:
+                if line.strip():
+                    recording = json.loads(line)
+                    self.responses[_recording_key(recording['text'], recording['sessionState'])] = recording['response']
+
+    def recognize_text(self, botId, botAliasId, localeId, sessionId, text, sessionState=None, **kwargs):
+        with self._lock:
+            self.calls += 1
+        key = _recording_key(text, sessionState)
+        if key not in self.responses:
+            raise KeyError(f"No recorded response for {text!r} with this session state.")
+
+        if self.latency:
+            sleep(self.latency)
+
+        response = copy.deepcopy(self.responses[key])
+        response['sessionId'] = sessionId
+        return response
+
+
+def _create_lex_backend(runtime=None):
+    from dotenv import load_dotenv
+    from lex_bot import LexBot
+    from nlu_backend import LexBackend
+    import os
+
+    load_dotenv()
+
+    bot = LexBot(
+        os.getenv('BOT_ID'), os.getenv('BOT_NAME'), os.getenv('BOT_ALIAS_ID'), os.getenv('BOT_ALIAS_NAME'),
+        os.getenv('BOT_LOCALE_ID'), runtime=runtime
+    )
+    return LexBackend(bot)
+
+
+def create_backend(args):
+    if args.backend == 'lex':
+        runtime = None
+        if args.record:
+            from client_registry import get_client
+            runtime = RecordingRuntimeClient(get_client('lexv2-runtime'), args.record)
+        return _create_lex_backend(runtime)
+
+    if args.backend == 'replay':
+        from lex_bot import LexBot
+        from nlu_backend import LexBackend
+
+        runtime = ReplayRuntimeClient(args.replay, args.latency)
+        return LexBackend(LexBot('BOTID', 'Bot', 'ALIASID', 'Alias', 'pt_BR', client=object(), runtime=runtime))
+
+    if args.backend == 'local':
+        from fast_path import ExactMatchClassifier, load_intent_file, load_model_classifier
+        from nlu_backend import LocalBackend
+
+        texts_by_intent, responses_by_intent = load_intent_file(args.intents)
+        classifier = ExactMatchClassifier(texts_by_intent) if args.exact_match else load_model_classifier(args.model)
+        return LocalBackend(classifier, responses_by_intent)
+
+    from nlu_backend import DialogflowBackend
+    return DialogflowBackend(args.agent, args.language_code)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('conversations', help="JSONL file with one conversation per line.")
+    parser.add_argument('--backend', choices=('lex', 'replay', 'local', 'dialogflow'), default='replay')
+    parser.add_argument('--rate', type=float, default=10, help="Conversations started per second, on average.")
+    parser.add_argument('--count', type=int, default=None, help="Conversations to run, cycling through the file.")
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--think-time', type=float, default=0.0, help="Seconds between the turns of a conversation.")
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--record', help="lex backend: append the recognize_text responses to this JSONL file.")
+    parser.add_argument('--replay', default='recordings.jsonl', help="replay backend: recorded responses.")
+    parser.add_argument('--latency', type=float, default=0.0, help="replay backend: seconds per call.")
+    parser.add_argument('--intents', default="../tensorflow/data/simple_intent.json", help="local backend: intents file.")
+    parser.add_argument('--model', default="../tensorflow/models/simple_intent", help="local backend: saved notebook model.")
+    parser.add_argument('--exact-match', action='store_true', help="local backend: exact match of the intents file instead of the model.")
+    parser.add_argument('--agent', help="dialogflow backend: projects/<project>/locations/<location>/agents/<agent>.")
+    parser.add_argument('--language-code', default='pt-br')
+    args = parser.parse_args()
+
+    conversations = load_conversations(args.conversations)
+    report = run_load_test(
+        create_backend(args), conversations, args.rate, args.count, args.concurrency, args.think_time, args.seed
+    )
+    report.print()
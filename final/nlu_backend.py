@@ -0,0 +1,180 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple, Protocol
+import asyncio
+import random
+
+
+class NLUResult(NamedTuple):
+    """
+    Result of a detect intent turn, the same for every provider.
+    `state` is the provider's conversation state to pass to the next turn (Lex session state), or None.
+    """
+    intent: str
+    confidence: float
+    messages: list
+    state: dict = None
+
+
+class NLUBackend(Protocol):
+    """ A provider that can detect the intent of a turn. """
+    name: str
+
+    def detect_intent(self, session_id: str, text: str, state: dict = None) -> NLUResult:
+        ...
+
+
+class AsyncNLUBackend(Protocol):
+    """ asyncio variant of NLUBackend. """
+    name: str
+
+    async def detect_intent(self, session_id: str, text: str, state: dict = None) -> NLUResult:
+        ...
+
+
+class LexBackend:
+    """ NLUBackend adapter for LexBot. """
+    name = 'lex'
+
+    def __init__(self, bot) -> None:
+        self.bot = bot
+
+    def detect_intent(self, session_id: str, text: str, state: dict = None) -> NLUResult:
+        intent, session_state, confidence, bot_response = self.bot.detect_intent_text(session_id, text, state)
+        return NLUResult(intent, confidence, [bot_response] if bot_response is not None else [], session_state)
+
+
+class AsyncLexBackend:
+    """ AsyncNLUBackend adapter for AsyncLexBot. """
+    name = 'lex'
+
+    def __init__(self, bot) -> None:
+        self.bot = bot
+
+    async def detect_intent(self, session_id: str, text: str, state: dict = None) -> NLUResult:
+        intent, session_state, confidence, bot_response = await self.bot.detect_intent_text(session_id, text, state)
+        return NLUResult(intent, confidence, [bot_response] if bot_response is not None else [], session_state)
+
+
+class DialogflowBackend:
+    """
+    NLUBackend adapter for a Dialogflow CX agent, through dialogflow/conversation.py
+    (the dialogflow folder must be on the PYTHONPATH). Dialogflow keeps the state on its side, so `state` is unused.
+    """
+    name = 'dialogflow'
+
+    def __init__(self, agent: str, language_code: str) -> None:
+        from conversation import detect_intent_text
+
+        self.agent = agent
+        self.language_code = language_code
+        self._detect_intent_text = detect_intent_text
+
+    def detect_intent(self, session_id: str, text: str, state: dict = None) -> NLUResult:
+        result = self._detect_intent_text(self.agent, session_id, text, self.language_code)
+        return NLUResult(result.intent, result.confidence, result.messages)
+
+
+class AsyncDialogflowBackend:
+    """ AsyncNLUBackend adapter for dialogflow/async_conversation.AsyncConversations. """
+    name = 'dialogflow'
+
+    def __init__(self, conversations) -> None:
+        self.conversations = conversations
+
+    async def detect_intent(self, session_id: str, text: str, state: dict = None) -> NLUResult:
+        result = await self.conversations.detect_intent_text(session_id, text)
+        return NLUResult(result.intent, result.confidence, result.messages)
+
+
+class LocalBackend:
+    """
+    NLUBackend adapter for a local classifier, the notebook's response() path.
+    `classifier` has a `predict(texts)` method returning `(intent, confidence)` per text, and
+    `responses` maps each intent to the responses one is picked from.
+    """
+    name = 'local'
+
+    def __init__(self, classifier, responses: dict) -> None:
+        self.classifier = classifier
+        self.responses = responses
+
+    def detect_intent(self, session_id: str, text: str, state: dict = None) -> NLUResult:
+        intent, confidence = self.classifier.predict([text])[0]
+        messages = [random.choice(self.responses[intent])] if intent in self.responses else []
+        return NLUResult(intent, float(confidence), messages)
+
+
+class AsyncBackendAdapter:
+    """ Runs a sync NLUBackend on an executor, so it can be used where an AsyncNLUBackend is expected. """
+    def __init__(self, backend: NLUBackend, max_workers: int = 16) -> None:
+        self.backend = backend
+        self.name = backend.name
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"nlu-{backend.name}")
+
+    async def detect_intent(self, session_id: str, text: str, state: dict = None) -> NLUResult:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self.backend.detect_intent, session_id, text, state)
+
+
+class HedgedBackend:
+    """
+    Races two async backends and returns the first confident answer, to cut tail latency.
+
+    The `secondary` is only called if the `primary` has not answered within `hedge_delay` seconds
+    (0 races both from the start). The first result with confidence at or above `min_confidence` wins
+    and the other call is cancelled; if neither is confident, the most confident result is returned.
+    A state returned by one backend means nothing to the other (a Lex session state to Dialogflow), so only
+    stateless turns (`state` None) are hedged: a turn that carries a state goes to the primary alone.
+    """
+    name = 'hedged'
+
+    def __init__(self, primary: AsyncNLUBackend, secondary: AsyncNLUBackend, hedge_delay: float = 0.0, min_confidence: float = 0.5) -> None:
+        self.primary = primary
+        self.secondary = secondary
+        self.hedge_delay = hedge_delay
+        self.min_confidence = min_confidence
+        self.wins = {'primary': 0, 'secondary': 0}
+
+    async def detect_intent(self, session_id: str, text: str, state: dict = None) -> NLUResult:
+        if state is not None:
+            return await self.primary.detect_intent(session_id, text, state)
+
+        primary = asyncio.ensure_future(self.primary.detect_intent(session_id, text, state))
+        pending = {primary}
+        roles = {primary: 'primary'}
+
+        if self.hedge_delay:
+            done, _ = await asyncio.wait(pending, timeout=self.hedge_delay)
+            if done and self._confident(primary):
+                self.wins['primary'] += 1
+                return primary.result()
+
+        secondary = asyncio.ensure_future(self.secondary.detect_intent(session_id, text, state))
+        pending.add(secondary)
+        roles[secondary] = 'secondary'
+
+        finished = [task for task in pending if task.done()]
+        pending = {task for task in pending if not task.done()}
+
+        try:
+            while True:
+                for task in finished:
+                    if self._confident(task):
+                        self.wins[roles[task]] += 1
+                        return task.result()
+
+                if not pending:
+                    break
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                finished = list(done)
+        finally:
+            for task in pending:
+                task.cancel()
+
+        results = [task.result() for task in roles if not task.exception()]
+        if not results:
+            return primary.result() # Raises the primary's error.
+        return max(results, key=lambda result: result.confidence)
+
+    def _confident(self, task):
+        return not task.exception() and task.result().confidence >= self.min_confidence
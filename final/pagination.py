@@ -0,0 +1,32 @@
+# Largest page size accepted by the Lex V2 list operations.
+MAX_RESULTS = 1000
+
+
+def page_count(item_count: int):
+    """ Number of list calls `paginate` makes to list `item_count` items: an empty listing still takes one. """
+    return max(1, -(-item_count // MAX_RESULTS))
+
+
+def paginate(operation, result_key: str, filters: list = None, sort_by: dict = None, **kwargs):
+    """
+    Yields the items of every page of a Lex V2 list operation, following `nextToken` lazily:
+    the next page is only requested once the items of the current one have been consumed.
+
+    `filters` and `sort_by` are passed as the operation's server-side `filters` and `sortBy`, e.g.
+    filters=[{'name': 'IntentName', 'values': ['Register'], 'operator': 'CO'}],
+    sort_by={'attribute': 'IntentName', 'order': 'Ascending'}.
+    """
+    kwargs.setdefault('maxResults', MAX_RESULTS)
+    if filters:
+        kwargs['filters'] = filters
+    if sort_by:
+        kwargs['sortBy'] = sort_by
+
+    while True:
+        response = operation(**kwargs)
+        yield from response[result_key]
+
+        next_token = response.get('nextToken')
+        if not next_token:
+            return
+        kwargs['nextToken'] = next_token
@@ -0,0 +1,72 @@
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic
+
+
+def normalize_text(text: str):
+    """ Case and whitespace insensitive form of an utterance, used in cache keys. """
+    return ' '.join(text.casefold().split())
+
+
+class ResponseCache:
+    """
+    Bounded LRU cache of detect intent results for turns that start a conversation (no session state).
+    Such turns always get the same answer from the same bot version, so they don't need a recognize_text call.
+
+    Keys are (bot id, alias id, locale, normalized text). Results are returned as stored, so callers that hand
+    the cached session states out (as LexBot does) must copy them. Thread safe.
+
+    The cache is cleared when DeployPipeline moves the alias in this process. When the alias can move in other
+    ways (another process, the console), set `ttl` so entries expire after that many seconds.
+    """
+    def __init__(self, max_size: int = 10_000, ttl: float = None) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict() # key -> (expires_at, result); expires_at is None without a TTL.
+        self._lock = Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def key(bot_id: str, bot_alias_id: str, locale_id: str, text: str):
+        return bot_id, bot_alias_id, locale_id, normalize_text(text)
+
+    def get(self, key: tuple):
+        """ Returns the cached result, or None. Counts a hit or a miss. """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] is not None and entry[0] <= monotonic():
+                del self._entries[key]
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: tuple, result: tuple):
+        expires_at = monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._entries[key] = (expires_at, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """ Drops every entry, e.g. when a new bot version is published. Counters are kept. """
+        with self._lock:
+            self._entries.clear()
+
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self):
+        """ Hits are recognize_text calls saved. """
+        return {'size': len(self._entries), 'hits': self.hits, 'misses': self.misses, 'hit_rate': self.hit_rate()}
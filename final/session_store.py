@@ -0,0 +1,176 @@
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic, time
+import json
+import sqlite3
+import sys
+
+# Time in seconds a conversation is kept without new turns.
+# Same value LexManager.create_bot sets as the bot's idleSessionTTLInSeconds.
+DEFAULT_SESSION_TTL = 20 * 60
+
+
+class SessionStore(ABC):
+    """
+    Keeps the latest Lex `sessionState` of each conversation, keyed by session id,
+    so callers of LexBot.detect_intent_text don't need to thread it through by hand.
+    Stores must implement every method; an incomplete store raises TypeError when it is created.
+    """
+    @abstractmethod
+    def get(self, session_id: str):
+        """ Returns the session state, or None if the session is unknown or expired. """
+
+    @abstractmethod
+    def put(self, session_id: str, session_state: dict):
+        ...
+
+    @abstractmethod
+    def delete(self, session_id: str):
+        ...
+
+
+class InMemorySessionStore(SessionStore):
+    """
+    LRU + TTL store in process memory. Thread safe.
+
+    States are stored serialized as JSON, so `put` keeps a snapshot and each `get` returns a new copy: callers
+    may change the states they get or put without affecting the stored ones (nor other sessions, such as the
+    ones started from the same ResponseCache entry). Each access moves the session to the end of the LRU order
+    and renews its TTL, so the least recently used session is also the first to expire.
+
+    The least recently used sessions are evicted once the store holds more than `max_sessions` sessions, or more
+    than `max_bytes` of serialized states. A typical state takes about 0.9KB in all (`python3 benchmark.py
+    sessions`), so 100,000 sessions take about 90MiB; `max_bytes` caps the memory when the states are larger.
+    """
+    def __init__(self, ttl: float = DEFAULT_SESSION_TTL, max_sessions: int = 100_000, max_bytes: int = 256 * 2 ** 20) -> None:
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.evictions = 0
+        self._sessions = OrderedDict() # session_id -> (expires_at, serialized session_state)
+        self._bytes = 0 # Length of the serialized states.
+        self._lock = Lock()
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def _remove(self, session_id: str):
+        _, serialized_state = self._sessions.pop(session_id)
+        self._bytes -= len(serialized_state)
+
+    def _evict_expired(self, now: float):
+        while self._sessions:
+            session_id, (expires_at, _) = next(iter(self._sessions.items()))
+            if expires_at > now:
+                break
+            self._remove(session_id)
+            self.evictions += 1
+
+    def get(self, session_id: str):
+        now = monotonic()
+        with self._lock:
+            self._evict_expired(now)
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return None
+
+            serialized_state = entry[1]
+            self._sessions[session_id] = (now + self.ttl, serialized_state)
+            self._sessions.move_to_end(session_id)
+
+        return json.loads(serialized_state)
+
+    def put(self, session_id: str, session_state: dict):
+        serialized_state = json.dumps(session_state, separators=(',', ':'))
+        now = monotonic()
+        with self._lock:
+            self._evict_expired(now)
+            if session_id in self._sessions:
+                self._remove(session_id)
+            self._sessions[session_id] = (now + self.ttl, serialized_state)
+            self._bytes += len(serialized_state)
+
+            while len(self._sessions) > self.max_sessions or (self._bytes > self.max_bytes and len(self._sessions) > 1):
+                self._remove(next(iter(self._sessions)))
+                self.evictions += 1
+
+    def delete(self, session_id: str):
+        with self._lock:
+            if session_id in self._sessions:
+                self._remove(session_id)
+
+    def memory_usage(self):
+        """ Approximate number of bytes held by the store, including the session states. """
+        with self._lock:
+            total = sys.getsizeof(self._sessions)
+            for session_id, entry in self._sessions.items():
+                total += sys.getsizeof(session_id) + sys.getsizeof(entry) + sys.getsizeof(entry[0]) + sys.getsizeof(entry[1])
+            return total
+
+
+class SqliteSessionStore(SessionStore):
+    """
+    Store backed by a SQLite database file, so sessions survive restarts and can be shared by
+    worker processes on the same host. States are serialized as JSON.
+
+    Expired sessions are deleted every `evict_every` puts, so the file does not grow with every session
+    ever started.
+    """
+    def __init__(self, path: str, ttl: float = DEFAULT_SESSION_TTL, evict_every: int = 1000) -> None:
+        self.ttl = ttl
+        self.evict_every = evict_every
+        self._puts = 0
+        self._lock = Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS sessions ('
+            'session_id TEXT PRIMARY KEY, session_state TEXT NOT NULL, expires_at REAL NOT NULL)'
+        )
+        self._connection.execute('CREATE INDEX IF NOT EXISTS sessions_expires_at ON sessions (expires_at)')
+
+    def __len__(self):
+        with self._lock:
+            return self._connection.execute(
+                'SELECT COUNT(*) FROM sessions WHERE expires_at > ?', (time(),)
+            ).fetchone()[0]
+
+    def get(self, session_id: str):
+        now = time()
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT session_state FROM sessions WHERE session_id = ? AND expires_at > ?', (session_id, now)
+            ).fetchone()
+            if row is None:
+                return None
+
+            self._connection.execute(
+                'UPDATE sessions SET expires_at = ? WHERE session_id = ?', (now + self.ttl, session_id)
+            )
+            return json.loads(row[0])
+
+    def put(self, session_id: str, session_state: dict):
+        with self._lock:
+            self._connection.execute(
+                'INSERT OR REPLACE INTO sessions (session_id, session_state, expires_at) VALUES (?, ?, ?)',
+                (session_id, json.dumps(session_state), time() + self.ttl)
+            )
+            self._puts += 1
+            if self._puts % self.evict_every == 0:
+                self._delete_expired()
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._connection.execute('DELETE FROM sessions WHERE session_id = ?', (session_id,))
+
+    def _delete_expired(self):
+        return self._connection.execute('DELETE FROM sessions WHERE expires_at <= ?', (time(),)).rowcount
+
+    def evict_expired(self):
+        """ Deletes expired sessions from the database. Returns how many were deleted. """
+        with self._lock:
+            return self._delete_expired()
+
+    def close(self):
+        self._connection.close()
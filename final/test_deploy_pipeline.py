@@ -0,0 +1,68 @@
+"""
+DeployPipeline must resume a failed deploy from its state file, and skip the sync of an already deployed catalog.
+
+    python3 -m pytest test_deploy_pipeline.py
+"""
+import json
+import pytest
+
+pytest.importorskip('boto3')
+
+from deploy_pipeline import DeployPipeline
+from fake_lex import FakeLexModelsClient
+from intent_catalog import IntentCatalog
+from lex_bot import LexBot
+from throttling import Throttle
+
+INTENTS_FILE_PATH = "../AmazonLex/intents/sample.json"
+
+
+class FailingVersionClient(FakeLexModelsClient):
+    """ Fails the first create_bot_version call, as if the deploy crashed after the build. """
+    def __init__(self) -> None:
+        super().__init__()
+        self.fail_version = True
+
+    def create_bot_version(self, botId, description=None, **kwargs):
+        if self.fail_version:
+            self.fail_version = False
+            raise RuntimeError("Connection lost.")
+        return super().create_bot_version(botId, description, **kwargs)
+
+
+def create_bot(client):
+    return LexBot('BOTID', 'Bot', 'ALIASID', 'Alias', 'pt_BR', client=client, runtime=object(), throttle=Throttle(rate=10_000))
+
+
+def test_failed_deploy_resumes_after_the_last_completed_stage(tmp_path):
+    state_file = str(tmp_path / 'state.json')
+    catalog = IntentCatalog.from_json_file(INTENTS_FILE_PATH)
+    client = FailingVersionClient()
+    pipeline = DeployPipeline(create_bot(client), state_file)
+
+    with pytest.raises(RuntimeError):
+        pipeline.run(catalog)
+    with open(state_file, 'r') as json_file:
+        assert json.load(json_file)['BOTID/pt_BR']['pending']['completed'] == ['sync', 'build']
+
+    calls = dict(client.calls)
+    report = pipeline.run(catalog)
+
+    assert report.skipped['sync'] == report.skipped['build'] == "completed by a previous run"
+    assert report.version == '1'
+    assert client.calls['list_intents'] == calls['list_intents']
+    assert client.calls['build_bot_locale'] == calls['build_bot_locale']
+    assert client._alias_versions[('BOTID', 'ALIASID')] == '1'
+
+
+def test_deployed_catalog_skips_the_sync_without_state_file():
+    catalog = IntentCatalog.from_json_file(INTENTS_FILE_PATH)
+    client = FakeLexModelsClient()
+    DeployPipeline(create_bot(client)).run(catalog)
+
+    before = client.total_calls()
+    report = DeployPipeline(create_bot(client)).run(catalog)
+
+    assert report.skipped['sync'] == "version 1 has the same catalog"
+    assert report.version == '1'
+    assert client.total_calls() - before == 3
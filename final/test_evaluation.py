@@ -0,0 +1,40 @@
+"""
+EvaluationReport must compute accuracy, precision and recall from its confusion matrix.
+
+    python3 -m pytest test_evaluation.py
+"""
+import pytest
+
+from evaluation import EvaluationReport, evaluate
+
+# (expected intent, predicted intent) -> count. None is the fallback, predicted when no intent matched.
+CONFUSION = {
+    ('Greeting', 'Greeting'): 3,
+    ('Greeting', 'Thanks'): 1,
+    ('Thanks', 'Thanks'): 2,
+    ('Thanks', 'Greeting'): 2,
+    ('Cancel', None): 1,
+}
+
+
+def test_precision_and_recall_of_a_known_confusion_matrix():
+    report = EvaluationReport()
+    for (expected, predicted), count in CONFUSION.items():
+        for _ in range(count):
+            report.add(expected, predicted)
+
+    assert report.accuracy() == pytest.approx(5 / 9)
+    assert report.per_intent() == {
+        'Cancel': (0.0, 0.0, 1),
+        'Greeting': (pytest.approx(3 / 5), pytest.approx(3 / 4), 4),
+        'Thanks': (pytest.approx(2 / 3), pytest.approx(2 / 4), 4),
+        None: (0.0, 0.0, 0),
+    }
+
+
+def test_evaluate_labels_each_result_by_its_text():
+    labels = {"Oi": 'Greeting', "Valeu": 'Thanks'}
+    report = evaluate([("Oi", 'Greeting', 0.9), ("Valeu", 'Greeting', 0.6)], labels)
+
+    assert (report.correct, report.total) == (1, 2)
+    assert report.confusion == {('Greeting', 'Greeting'): 1, ('Thanks', 'Greeting'): 1}
@@ -0,0 +1,35 @@
+"""
+LexBot must refuse a fast path that answers intents its Lex bot does not have.
+
+    python3 -m pytest test_fast_path.py
+"""
+import pytest
+
+pytest.importorskip('boto3')
+
+from fake_lex import FakeLexModelsClient
+from fast_path import ExactMatchClassifier, LocalFastPath
+from lex_bot import LexBot
+
+TEXTS_BY_INTENT = {'Greeting': ["Oi", "Olá"], 'Thanks': ["Obrigado"]}
+RESPONSES = {'Greeting': ["Olá!"], 'Thanks': ["De nada!"]}
+
+
+def create_bot(intent_names):
+    client = FakeLexModelsClient()
+    for intent_name in intent_names:
+        client.create_intent(intentName=intent_name, description=intent_name, sampleUtterances=[])
+
+    fast_path = LocalFastPath(ExactMatchClassifier(TEXTS_BY_INTENT), RESPONSES)
+    return LexBot('BOTID', 'Bot', 'ALIASID', 'Alias', 'pt_BR', client=client, runtime=object(), fast_path=fast_path)
+
+
+def test_fast_path_intents_must_exist_in_the_bot():
+    with pytest.raises(ValueError, match="Thanks"):
+        create_bot(['Greeting', 'RegisterUser'])
+
+
+def test_fast_path_answers_with_intents_of_the_bot():
+    bot = create_bot(['Greeting', 'Thanks', 'RegisterUser'])
+    intent, _, confidence, bot_response = bot.detect_intent_text('session', "olá!")
+    assert (intent, confidence, bot_response) == ('Greeting', 1.0, "Olá!")
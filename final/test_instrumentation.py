@@ -0,0 +1,45 @@
+"""
+StatsSink.prometheus_text must render valid cumulative histograms and counters of the recorded calls.
+
+    python3 -m pytest test_instrumentation.py
+"""
+from instrumentation import CallRecord, StatsSink
+from latency import BUCKET_BOUNDS
+
+
+def sample_value(text: str, name: str):
+    for line in text.splitlines():
+        if line.startswith(name + ' '):
+            return float(line.split()[-1])
+    return None
+
+
+def test_prometheus_text():
+    sink = StatsSink()
+    for seconds in (0.001, 0.002, 0.05):
+        sink.record(CallRecord('lexv2-models', 'list_intents', 0.0, seconds, bytes_sent=10, bytes_received=100))
+    sink.record(CallRecord('lexv2-models', 'list_intents', 0.0, 0.5, 'ThrottlingException', 1, 10, 0))
+    sink.record(CallRecord('dialogflow', 'detect_intent', 0.0, 0.02))
+
+    text = sink.prometheus_text()
+    labels = 'service="lexv2-models",operation="list_intents"'
+
+    assert '# TYPE cloud_api_call_seconds histogram' in text
+    buckets = [
+        float(line.split()[-1]) for line in text.splitlines()
+        if line.startswith(f'cloud_api_call_seconds_bucket{{{labels},')
+    ]
+    assert len(buckets) == len(BUCKET_BOUNDS) + 1
+    assert buckets == sorted(buckets) and buckets[-1] == 4
+    assert sample_value(text, f'cloud_api_call_seconds_count{{{labels}}}') == 4
+    assert abs(sample_value(text, f'cloud_api_call_seconds_sum{{{labels}}}') - 0.553) < 1e-9
+
+    assert sample_value(text, f'cloud_api_errors_total{{{labels}}}') == 1
+    assert sample_value(text, f'cloud_api_throttles_total{{{labels}}}') == 1
+    assert sample_value(text, f'cloud_api_sent_bytes_total{{{labels}}}') == 40
+    assert sample_value(text, f'cloud_api_received_bytes_total{{{labels}}}') == 300
+
+    # Calls without known body sizes get no byte counters.
+    dialogflow_labels = 'service="dialogflow",operation="detect_intent"'
+    assert sample_value(text, f'cloud_api_call_seconds_count{{{dialogflow_labels}}}') == 1
+    assert sample_value(text, f'cloud_api_sent_bytes_total{{{dialogflow_labels}}}') is None
@@ -0,0 +1,25 @@
+"""
+IntentCatalog.load must only unpickle compiled catalogs, and read any other file as a JSON intents file.
+
+    python3 -m pytest test_intent_catalog.py
+"""
+import shutil
+
+from intent_catalog import IntentCatalog, compile_intent_file
+
+INTENTS_FILE_PATH = "../AmazonLex/intents/sample.json"
+
+
+def test_compiled_catalog_round_trip(tmp_path):
+    catalog_path, catalog = compile_intent_file(INTENTS_FILE_PATH, str(tmp_path / 'intents.bin'))
+    loaded = IntentCatalog.load(catalog_path)
+
+    assert loaded.hash == catalog.hash
+    assert loaded.to_dict() == catalog.to_dict()
+
+
+def test_json_files_load_whatever_their_extension(tmp_path):
+    intents_path = tmp_path / 'intents.txt'
+    shutil.copy(INTENTS_FILE_PATH, intents_path)
+
+    assert IntentCatalog.load(str(intents_path)).hash == IntentCatalog.from_json_file(INTENTS_FILE_PATH).hash
@@ -0,0 +1,109 @@
+"""
+IntentSync must upload every change to a slot's valueElicitationSetting, not only the fields of the list_slots summary,
+and every change to the intent settings and slot priorities.
+
+    python3 -m pytest test_intent_sync.py
+"""
+import copy
+import json
+import pytest
+
+pytest.importorskip('boto3')
+
+from fake_lex import FakeLexModelsClient
+from intent_sync import IntentSync
+from lex_bot_controller import LexBotController
+from throttling import Throttle
+
+INTENTS_FILE_PATH = "../AmazonLex/intents/sample.json"
+
+
+@pytest.fixture
+def synced():
+    """ A controller on a fake bot whose DRAFT matches the sample intents, and those intents. """
+    with open(INTENTS_FILE_PATH, 'r') as json_file:
+        intents = json.load(json_file)
+
+    client = FakeLexModelsClient()
+    controller = LexBotController(
+        'BOTID', 'Bot', 'ALIASID', 'Alias', 'pt_BR', client=client, runtime=object(), throttle=Throttle(rate=10_000)
+    )
+    sync = IntentSync(controller)
+    sync.apply(sync.plan(intents))
+    return controller, client, intents
+
+
+def slot_actions(plan):
+    return {
+        (change.name, slot_change.name): slot_change.action
+        for change in plan.changes
+        for slot_change in change.slot_changes
+    }
+
+
+def test_unchanged_intents_need_no_writes(synced):
+    controller, _, intents = synced
+    assert IntentSync(controller).plan(intents).write_calls() == 0
+
+
+@pytest.mark.parametrize('field, value', [
+    ('sampleUtterances', [{'utterance': 'Meu nome é {UserName}'}]),
+    ('defaultValueSpecification', {'defaultValueList': [{'defaultValue': 'Anônimo'}]}),
+    ('waitAndContinueSpecification', {'active': True}),
+])
+def test_value_elicitation_setting_changes_are_uploaded(synced, field, value):
+    controller, client, intents = synced
+    intents = copy.deepcopy(intents)
+    intent_name = next(iter(intents))
+    slot = intents[intent_name]['slots'][0]
+    slot['valueElicitationSetting'][field] = value
+
+    sync = IntentSync(controller)
+    plan = sync.plan(intents)
+    assert slot_actions(plan)[(intent_name, slot['name'])] == 'update'
+    assert plan.write_calls() == 1
+
+    sync.apply(plan)
+    assert client.calls['update_slot'] == 1
+    assert sync.plan(intents).write_calls() == 0
+
+
+def test_retry_changes_are_uploaded(synced):
+    controller, _, intents = synced
+    intents = copy.deepcopy(intents)
+    intent_name = next(iter(intents))
+    slot = intents[intent_name]['slots'][0]
+    slot['valueElicitationSetting']['promptSpecification']['maxRetries'] = 1
+
+    assert slot_actions(IntentSync(controller).plan(intents))[(intent_name, slot['name'])] == 'update'
+
+
+def test_pruning_every_slot_clears_the_priorities(synced):
+    controller, client, intents = synced
+    intents = copy.deepcopy(intents)
+    intent_name = next(iter(intents))
+    intents[intent_name]['slots'] = []
+
+    sync = IntentSync(controller, prune=True)
+    sync.apply(sync.plan(intents))
+
+    intent_id = controller.intent_exists(intent_name)
+    assert client.intents[intent_id]['slotPriorities'] == []
+    assert sync.plan(intents).write_calls() == 0
+
+
+@pytest.mark.parametrize('setting', ['intentConfirmationSetting', 'intentClosingSetting'])
+def test_intent_setting_changes_are_uploaded(synced, setting):
+    controller, client, intents = synced
+    intents = copy.deepcopy(intents)
+    intent_name = next(iter(intents))
+    intents[intent_name][setting]['active'] = not intents[intent_name][setting]['active']
+
+    sync = IntentSync(controller)
+    plan = sync.plan(intents)
+    assert plan.write_calls() == 1
+
+    sync.apply(plan)
+    intent_id = controller.intent_exists(intent_name)
+    assert client.intents[intent_id][setting] == intents[intent_name][setting]
+    assert sync.plan(intents).write_calls() == 0
@@ -0,0 +1,72 @@
+"""
+LexRuntimeSimulator must run the Lex dialog: elicit the slots in order, re-elicit invalid values,
+confirm the intent and close it.
+
+    python3 -m pytest test_lex_simulator.py
+"""
+import pytest
+
+from lex_simulator import FALLBACK_INTENT, LexRuntimeSimulator
+
+INTENTS_FILE_PATH = "../AmazonLex/intents/sample.json"
+
+
+@pytest.fixture
+def simulator():
+    return LexRuntimeSimulator.from_intent_file(INTENTS_FILE_PATH)
+
+
+def turn(simulator, text, session_id='session'):
+    response = simulator.recognize_text('BOTID', 'ALIASID', 'pt_BR', session_id, text)
+    session_state = response['sessionState']
+    return session_state['dialogAction'], session_state['intent'], response.get('messages', [])
+
+
+def test_slots_are_elicited_in_order_then_confirmed(simulator):
+    dialog_action, intent, messages = turn(simulator, "Quero me registrar")
+    assert intent['name'] == 'RegisterUser'
+    assert dialog_action == {'type': 'ElicitSlot', 'slotToElicit': 'UserName'}
+    assert messages[0]['content'] == "Olá, qual o seu nome?"
+
+    dialog_action, _, _ = turn(simulator, "Ana")
+    assert dialog_action == {'type': 'ElicitSlot', 'slotToElicit': 'UserEmail'}
+
+    # An invalid e-mail leaves the slot empty, so it is elicited again.
+    dialog_action, intent, _ = turn(simulator, "não tenho")
+    assert dialog_action == {'type': 'ElicitSlot', 'slotToElicit': 'UserEmail'}
+    assert not intent['slots']['UserEmail']
+
+    turn(simulator, "ana@example.com")
+    turn(simulator, "Feminino")
+    dialog_action, intent, _ = turn(simulator, "31/12/1990")
+    assert dialog_action == {'type': 'ConfirmIntent'}
+    assert intent['slots']['UserEmail']['value']['interpretedValue'] == "ana@example.com"
+    assert intent['slots']['UserBirthday']['value']['interpretedValue'] == "1990-12-31"
+
+    dialog_action, intent, _ = turn(simulator, "Sim")
+    assert dialog_action == {'type': 'Close'}
+    assert (intent['state'], intent['confirmationState']) == ('Fulfilled', 'Confirmed')
+
+
+def test_denied_confirmation_fails_the_intent(simulator):
+    for text in ("Quero me registrar", "Ana", "ana@example.com", "Feminino", "31/12/1990"):
+        turn(simulator, text)
+
+    dialog_action, intent, _ = turn(simulator, "Não")
+    assert dialog_action == {'type': 'Close'}
+    assert (intent['state'], intent['confirmationState']) == ('Failed', 'Denied')
+
+
+def test_unknown_utterances_fall_back(simulator):
+    dialog_action, intent, _ = turn(simulator, "Qual a previsão do tempo?")
+    assert intent['name'] == FALLBACK_INTENT
+    assert dialog_action == {'type': 'Close'}
+
+
+def test_sessions_are_independent(simulator):
+    turn(simulator, "Quero me registrar", 'first')
+    turn(simulator, "Ana", 'first')
+
+    dialog_action, intent, _ = turn(simulator, "Quero me registrar", 'second')
+    assert dialog_action == {'type': 'ElicitSlot', 'slotToElicit': 'UserName'}
+    assert intent['slots']['UserName'] is None
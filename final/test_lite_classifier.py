@@ -0,0 +1,54 @@
+"""
+The TensorFlow Lite export of the notebook model must predict like the Keras model it was exported from.
+
+    python3 -m pytest test_lite_classifier.py
+"""
+import importlib
+import pytest
+
+pytest.importorskip('tensorflow')
+
+INTENTS_FILE_PATH = "../tensorflow/data/simple_intent.json"
+
+
+def require_interpreter():
+    """ Skips the test unless one of the interpreters LiteIntentClassifier runs on is installed. """
+    for module in ('ai_edge_litert.interpreter', 'tflite_runtime.interpreter'):
+        try:
+            importlib.import_module(module)
+            return
+        except ImportError:
+            pass
+    pytest.skip("Needs ai-edge-litert or tflite-runtime (pip install -r ../tensorflow/requirements-lite.txt).")
+
+
+@pytest.fixture(scope='module')
+def model_directory(tmp_path_factory):
+    """ A small model trained on the notebook intents, saved and exported to TensorFlow Lite. """
+    from intent_classifier import IntentClassifier
+
+    directory = str(tmp_path_factory.mktemp('simple_intent'))
+    classifier = IntentClassifier(embed_dim=16, lstm_num=8, epochs=20, seed=0).fit(INTENTS_FILE_PATH)
+    classifier.save(directory)
+    classifier.export_tflite(directory)
+    return directory
+
+
+def test_exported_model_matches_keras(model_directory):
+    require_interpreter()
+    from lite_classifier import check_parity
+
+    difference, mismatches = check_parity(model_directory, tolerance=1e-4)
+    assert difference <= 1e-4
+    assert mismatches == []
+
+
+def test_exported_model_predicts_like_keras(model_directory):
+    require_interpreter()
+    from intent_classifier import IntentClassifier, NOTEBOOK_TESTS
+    from lite_classifier import LiteIntentClassifier
+
+    texts = [text for text, _ in NOTEBOOK_TESTS]
+    keras_intents = [intent for intent, _ in IntentClassifier.load(model_directory).predict(texts)]
+    lite_intents = [intent for intent, _ in LiteIntentClassifier.load(model_directory).predict(texts)]
+    assert lite_intents == keras_intents
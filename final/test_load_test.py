@@ -0,0 +1,57 @@
+"""
+Conversations recorded against a runtime must replay offline with the same answers.
+
+    python3 -m pytest test_load_test.py
+"""
+import pytest
+
+pytest.importorskip('boto3')
+
+from lex_bot import LexBot
+from lex_simulator import LexRuntimeSimulator
+from load_test import RecordingRuntimeClient, ReplayRuntimeClient, load_conversations, run_load_test
+from nlu_backend import LexBackend
+
+INTENTS_FILE_PATH = "../AmazonLex/intents/sample.json"
+CONVERSATIONS_FILE_PATH = "conversations/sample.jsonl"
+
+
+def create_backend(runtime):
+    return LexBackend(LexBot('BOTID', 'Bot', 'ALIASID', 'Alias', 'pt_BR', client=object(), runtime=runtime))
+
+
+def converse(backend, texts):
+    """ Sends the turns of a conversation, passing each state to the next turn. Returns the results. """
+    results, state = [], None
+    for text in texts:
+        result = backend.detect_intent('session', text, state)
+        results.append(result)
+        state = result.state
+    return results
+
+
+def test_recorded_conversations_replay_the_same(tmp_path):
+    recording_path = str(tmp_path / 'recordings.jsonl')
+    conversations = load_conversations(CONVERSATIONS_FILE_PATH)
+
+    recording = RecordingRuntimeClient(LexRuntimeSimulator.from_intent_file(INTENTS_FILE_PATH), recording_path)
+    recorded = [converse(create_backend(recording), texts) for _, texts in conversations]
+
+    replay = ReplayRuntimeClient(recording_path)
+    replayed = [converse(create_backend(replay), texts) for _, texts in conversations]
+
+    assert replayed == recorded
+    assert replay.calls == sum(len(texts) for _, texts in conversations)
+
+    report = run_load_test(create_backend(replay), conversations, rate=1000, count=30, seed=0)
+    assert report.conversations == 30
+    assert report.errors == {}
+
+
+def test_unrecorded_turns_fail(tmp_path):
+    recording_path = str(tmp_path / 'recordings.jsonl')
+    recording = RecordingRuntimeClient(LexRuntimeSimulator.from_intent_file(INTENTS_FILE_PATH), recording_path)
+    converse(create_backend(recording), ["Quero me registrar"])
+
+    with pytest.raises(KeyError):
+        converse(create_backend(ReplayRuntimeClient(recording_path)), ["Quero fazer uma reclamação"])
@@ -0,0 +1,50 @@
+"""
+The fast path, the Lex simulator and the notebook model must tokenize an utterance the same way.
+
+    python3 -m pytest test_normalization.py
+"""
+from fast_path import ExactMatchClassifier
+from normalization import normalize, normalize_batch
+import pytest
+
+UTTERANCES = [
+    "Olá, está aí?",
+    "Não, OBRIGADO!!",
+    "Muito obrigada, de verdade",
+    "Straße até amanhã",
+    "Søren, ça va? Æble",
+    "Ｏｂｒｉｇａｄｏ",
+    "İstanbul",
+    "café\nnão",
+    "12h30 ok_ok",
+]
+
+
+def test_fast_path_and_classifier_normalize_the_same():
+    assert normalize_batch(UTTERANCES) == [normalize(text) for text in UTTERANCES]
+
+
+def test_non_ascii_letters_are_kept():
+    assert normalize("Straße até amanhã") == "straße ate amanha"
+    assert normalize("Søren, ça va? Æble") == "søren ca va æble"
+    assert normalize("Ｏｂｒｉｇａｄｏ") == "obrigado"
+
+
+def test_fast_path_index_matches_model_tokens():
+    classifier = ExactMatchClassifier({'Intent': UTTERANCES})
+    assert set(classifier.index) == set(normalize_batch(UTTERANCES))
+    assert [intent for intent, _ in classifier.predict(UTTERANCES)] == ['Intent'] * len(UTTERANCES)
+
+
+def test_model_encodes_the_fast_path_tokens():
+    pytest.importorskip('numpy')
+    from lite_classifier import encode_texts
+
+    words = sorted({word for text in UTTERANCES for word in normalize(text).split()})
+    word_index = {word: index for index, word in enumerate(words, 2)}
+    length = max(len(normalize(text).split()) for text in UTTERANCES)
+
+    sequences = encode_texts(UTTERANCES, word_index, 1, length)
+    for text, sequence in zip(UTTERANCES, sequences):
+        tokens = [word_index[word] for word in normalize(text).split()]
+        assert list(sequence[length - len(tokens):]) == tokens
@@ -0,0 +1,40 @@
+"""
+Session stores must keep their own copy of each state, stay within their bounds and drop expired sessions.
+
+    python3 -m pytest test_session_store.py
+"""
+from session_store import InMemorySessionStore, SqliteSessionStore
+
+STATE = {'dialogAction': {'type': 'ElicitSlot', 'slotToElicit': 'UserName'}, 'intent': {'name': 'RegisterUser', 'slots': {}}}
+
+
+def test_in_memory_states_are_copied():
+    store = InMemorySessionStore()
+    state = {'intent': {'name': 'RegisterUser', 'slots': {}}}
+    store.put('a', state)
+    store.put('b', state)
+
+    state['intent']['slots']['UserName'] = 'Ana'
+    store.get('a')['intent']['name'] = 'Changed'
+
+    assert store.get('a') == store.get('b') == {'intent': {'name': 'RegisterUser', 'slots': {}}}
+
+
+def test_in_memory_byte_bound_evicts_least_recently_used():
+    store = InMemorySessionStore(max_bytes=3 * len('{"dialogAction":{}}'))
+    for session_id in 'abcd':
+        store.put(session_id, {'dialogAction': {}})
+
+    assert len(store) == 3
+    assert store.get('a') is None
+    assert store.evictions == 1
+
+
+def test_sqlite_evicts_expired_sessions_on_put(tmp_path):
+    store = SqliteSessionStore(str(tmp_path / 'sessions.db'), ttl=-1, evict_every=10)
+    for index in range(10):
+        store.put(f"session-{index}", STATE)
+
+    count = store._connection.execute('SELECT COUNT(*) FROM sessions').fetchone()[0]
+    store.close()
+    assert count == 0
@@ -0,0 +1,89 @@
+from botocore.exceptions import ClientError
+from threading import Lock
+from time import monotonic, sleep
+import random
+
+# Error codes returned by the Lex V2 APIs when a call can succeed if retried later. ConflictException and
+# PreconditionFailedException are not: they mean the bot is busy or changed, which the caller must handle.
+RETRYABLE_ERRORS = {
+    'ThrottlingException',
+    'TooManyRequestsException',
+    'InternalServerException',
+}
+
+
+class TokenBucket:
+    """
+    Paces calls to at most `rate` per second, allowing bursts of up to `capacity` calls. Thread safe.
+    The default capacity of 1 spaces the calls evenly: a bucket as large as the rate would let many threads
+    spend a whole second of quota at once, which the service throttles.
+    """
+    def __init__(self, rate: float, capacity: float = 1) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = self.capacity
+        self.updated = monotonic()
+        self._lock = Lock()
+
+    def acquire(self):
+        """ Blocks until a token is available and takes it. """
+        while True:
+            with self._lock:
+                now = monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                wait_time = (1 - self.tokens) / self.rate
+
+            sleep(wait_time)
+
+
+class Throttle:
+    """
+    Paces calls with a token bucket and retries throttled calls with exponential backoff and full jitter.
+    A single instance should be shared by every thread calling the same API, so they share the same budget.
+    """
+    def __init__(self, rate: float = 10, capacity: float = 1, max_attempts: int = 8, base_delay: float = 0.5, max_delay: float = 20) -> None:
+        self.bucket = TokenBucket(rate, capacity)
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retries = 0
+        self._lock = Lock() # Guards `retries`, updated by every thread sharing the throttle.
+
+    def call(self, function, *args, **kwargs):
+        """ Calls the function, retrying while it fails with a retryable error. """
+        for attempt in range(self.max_attempts):
+            self.bucket.acquire()
+            try:
+                return function(*args, **kwargs)
+            except ClientError as error:
+                code = error.response.get('Error', {}).get('Code')
+                if code not in RETRYABLE_ERRORS or attempt == self.max_attempts - 1:
+                    raise
+
+                with self._lock:
+                    self.retries += 1
+                delay = min(self.max_delay, self.base_delay * 2 ** attempt)
+                sleep(random.uniform(0, delay))
+
+
+class ThrottledClient:
+    """ Wraps a boto3 client so every API call goes through the given throttle. """
+    def __init__(self, client, throttle: Throttle) -> None:
+        self.client = client
+        self.throttle = throttle
+
+    def __getattr__(self, name):
+        attribute = getattr(self.client, name)
+        if not callable(attribute):
+            return attribute
+
+        def throttled(*args, **kwargs):
+            return self.throttle.call(attribute, *args, **kwargs)
+
+        return throttled
@@ -0,0 +1,93 @@
+from threading import Event
+from time import monotonic
+
+# Statuses from which a Lex resource will not become ready without intervention.
+FAILED_STATUSES = {'Failed', 'Deleting', 'Inactive'}
+
+
+class WaiterError(Exception):
+    """ Raised when a resource reaches a failed status while waiting for it. """
+
+
+class WaiterTimeout(TimeoutError):
+    """ Raised when a resource is not ready before the deadline. """
+
+
+class WaiterCancelled(Exception):
+    """ Raised when the cancel event is set while waiting. """
+
+
+def wait_until(get_status, ready: set, failed: set = FAILED_STATUSES, timeout: float = 600,
+               initial_delay: float = 0.5, max_delay: float = 10, backoff: float = 1.5, cancel: Event = None):
+    """
+    Polls `get_status()` until it returns one of the `ready` statuses, and returns that status.
+
+    The first poll is immediate, so resources that are already ready cost a single call. The delay between
+    polls starts at `initial_delay` and grows by `backoff` up to `max_delay`, so slow operations are not
+    polled in a tight loop. Raises WaiterError on a failed status, WaiterTimeout once `timeout` seconds
+    have passed and WaiterCancelled as soon as the `cancel` event is set.
+    """
+    cancel = cancel or Event()
+    deadline = monotonic() + timeout
+    delay = initial_delay
+
+    while True:
+        status = get_status()
+        if status in ready:
+            return status
+
+        if status in failed:
+            raise WaiterError(f"Resource reached status {status}.")
+
+        remaining = deadline - monotonic()
+        if remaining <= 0:
+            raise WaiterTimeout(f"Resource still in status {status} after {timeout} seconds.")
+
+        if cancel.wait(min(delay, remaining)):
+            raise WaiterCancelled(f"Stopped waiting with resource in status {status}.")
+
+        delay = min(max_delay, delay * backoff)
+
+
+def wait_for_bot(client, bot_id: str, **kwargs):
+    """ Waits for the bot to be Available. """
+    return wait_until(
+        lambda: client.describe_bot(botId=bot_id)['botStatus'],
+        ready={'Available'},
+        **kwargs
+    )
+
+
+def wait_for_bot_locale(client, bot_id: str, bot_version: str, locale_id: str, ready: set = None, **kwargs):
+    """
+    Waits for the bot locale to settle. By default any settled status is accepted:
+    NotBuilt right after creation, Built after a build.
+    """
+    return wait_until(
+        lambda: client.describe_bot_locale(
+            botId=bot_id,
+            botVersion=bot_version,
+            localeId=locale_id
+        )['botLocaleStatus'],
+        ready=ready or {'NotBuilt', 'Built'},
+        failed={'Failed', 'Deleting'},
+        **kwargs
+    )
+
+
+def wait_for_bot_version(client, bot_id: str, bot_version: str, **kwargs):
+    """ Waits for the bot version to be Available. """
+    return wait_until(
+        lambda: client.describe_bot_version(botId=bot_id, botVersion=bot_version)['botStatus'],
+        ready={'Available'},
+        **kwargs
+    )
+
+
+def wait_for_bot_alias(client, bot_id: str, bot_alias_id: str, **kwargs):
+    """ Waits for the bot alias to be Available. """
+    return wait_until(
+        lambda: client.describe_bot_alias(botId=bot_id, botAliasId=bot_alias_id)['botAliasStatus'],
+        ready={'Available'},
+        **kwargs
+    )
@@ -0,0 +1,211 @@
+"""
+CPU benchmarks of the local intent model.
+
+Usage:
+    python3 benchmark.py batching [--model models/simple_intent] [--utterances 2048]
+    python3 benchmark.py micro-batching [--clients 64] [--max-batch 32] [--max-wait 0.002]
+    python3 benchmark.py normalization [--utterances 100000]
+    python3 benchmark.py startup [--model models/simple_intent]
+
+The model is trained on data/simple_intent.json and saved to --model when that directory does not exist yet.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from intent_classifier import IntentClassifier, load_intents
+from lite_classifier import TFLITE_FILE
+from micro_batcher import MicroBatcher
+from normalization import normalize, normalize_batch
+from time import perf_counter
+import argparse
+import json
+import numpy as np
+import os
+import subprocess
+import sys
+import tensorflow as tf
+
+INTENTS_FILE_PATH = "data/simple_intent.json"
+
+# Run in a fresh process per runtime, so each one pays its own imports. Prints the timings and the peak RSS.
+STARTUP_SCRIPT = """
+from time import perf_counter
+import json, resource, sys
+start = perf_counter()
+from {module} import {cls}
+imported = perf_counter()
+classifier = {cls}.load(sys.argv[1])
+loaded = perf_counter()
+classifier.predict(["Muito obrigado"])
+predicted = perf_counter()
+print(json.dumps({{
+    'import': imported - start, 'load': loaded - imported, 'first_prediction': predicted - loaded,
+    'rss': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+}}))
+"""
+
+
+def load_or_train(model_directory: str):
+    if not os.path.exists(model_directory):
+        print(f"Training a model on {INTENTS_FILE_PATH}...")
+        IntentClassifier(seed=0).fit(INTENTS_FILE_PATH).save(model_directory)
+    return IntentClassifier.load(model_directory)
+
+
+def load_utterances(count: int):
+    """ Training texts of the intents file, repeated up to `count` utterances. """
+    texts, _, _ = load_intents(INTENTS_FILE_PATH)
+    return [texts[index % len(texts)] for index in range(count)]
+
+
+def notebook_response(classifier: IntentClassifier, sentence: str):
+    """ The notebook's response(): a word index lookup loop and an eager call with a batch of one. """
+    word_index = classifier.tokenizer.word_index
+    sent_tokens = [word_index.get(word, word_index['<unk>']) for word in sentence.split()]
+    pred = classifier.model(tf.expand_dims(sent_tokens, 0))
+    return classifier.intents[np.argmax(pred.numpy(), axis=1)[0]]
+
+
+def notebook_clean(line: str):
+    """ The notebook's clean(). """
+    cleaned_line = ''
+    for char in line:
+        if char.isalpha():
+            cleaned_line += char
+        else:
+            cleaned_line += ' '
+    cleaned_line = ' '.join(cleaned_line.split())
+    return cleaned_line
+
+
+def benchmark_batching(args):
+    classifier = load_or_train(args.model)
+    utterances = load_utterances(args.utterances)
+
+    # Warm up: traces the compiled forward pass and initializes the eager kernels.
+    classifier.predict_top_k(utterances[:1])
+    notebook_response(classifier, utterances[0])
+
+    print(f"{args.utterances} utterances on CPU:")
+
+    start = perf_counter()
+    for sentence in utterances:
+        notebook_response(classifier, sentence)
+    baseline = args.utterances / (perf_counter() - start)
+    print(f"notebook response()  {baseline:9,.0f} utterances/s")
+
+    for batch_size in (1, 32, 256):
+        start = perf_counter()
+        for batch_start in range(0, len(utterances), batch_size):
+            classifier.predict_top_k(utterances[batch_start:batch_start + batch_size], k=3)
+        throughput = args.utterances / (perf_counter() - start)
+        print(f"predict_top_k x{batch_size:<4} {throughput:9,.0f} utterances/s ({throughput / baseline:.1f}x)")
+
+
+def load_test(predict, utterances: list, clients: int):
+    """
+    Sends the utterances one at a time from `clients` threads, each waiting for its answer before sending the
+    next, like chat workers do. Returns the throughput in utterances/s and the latency of each utterance.
+    """
+    def send(sentence):
+        start = perf_counter()
+        predict([sentence])
+        return perf_counter() - start
+
+    start = perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as executor:
+        latencies = np.array(list(executor.map(send, utterances)))
+    return len(utterances) / (perf_counter() - start), latencies
+
+
+def print_load_test(name: str, throughput: float, latencies, baseline: float = None):
+    p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+    speedup = f" ({throughput / baseline:.1f}x)" if baseline else ""
+    print(f"{name:<15} {throughput:9,.0f} utterances/s{speedup}, latency p50 {p50:.1f}ms p99 {p99:.1f}ms")
+
+
+def benchmark_micro_batching(args):
+    classifier = load_or_train(args.model)
+    utterances = load_utterances(args.utterances)
+    classifier.predict(utterances[:1])
+
+    print(f"{args.utterances} utterances sent one at a time by {args.clients} clients, on CPU:")
+
+    throughput, latencies = load_test(classifier.predict, utterances, args.clients)
+    print_load_test("direct", throughput, latencies)
+    baseline = throughput
+
+    with MicroBatcher(classifier.predict, args.max_batch, args.max_wait) as batcher:
+        throughput, latencies = load_test(batcher.predict, utterances, args.clients)
+    print_load_test("micro-batched", throughput, latencies, baseline)
+    print(f"max_batch {args.max_batch}, max_wait {args.max_wait * 1000:.1f}ms: ", end='')
+    batcher.stats.print()
+
+
+def benchmark_normalization(args):
+    utterances = load_utterances(args.utterances)
+    runs = (
+        ("notebook clean()", lambda: [notebook_clean(text) for text in utterances]),
+        ("normalize()", lambda: [normalize(text) for text in utterances]),
+        ("normalize_batch()", lambda: normalize_batch(utterances)),
+    )
+
+    print(f"{args.utterances} utterances:")
+    baseline = None
+    for name, run in runs:
+        # Best of 5 runs, to leave out the noise of other processes.
+        seconds = []
+        for _ in range(5):
+            start = perf_counter()
+            run()
+            seconds.append(perf_counter() - start)
+
+        per_utterance = min(seconds) / args.utterances * 1e6
+        baseline = baseline or per_utterance
+        print(f"{name:<18} {per_utterance:6.2f}us/utterance ({baseline / per_utterance:.1f}x)")
+
+
+def benchmark_startup(args):
+    classifier = load_or_train(args.model)
+    if not os.path.exists(os.path.join(args.model, TFLITE_FILE)):
+        classifier.export_tflite(args.model)
+
+    print("Startup of a serving process, from imports to its first prediction:")
+    for module, cls in (("intent_classifier", "IntentClassifier"), ("lite_classifier", "LiteIntentClassifier")):
+        output = subprocess.run(
+            [sys.executable, '-c', STARTUP_SCRIPT.format(module=module, cls=cls), os.path.abspath(args.model)],
+            capture_output=True, text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout
+        startup = json.loads(output.splitlines()[-1])
+        total = startup['import'] + startup['load'] + startup['first_prediction']
+        print(
+            f"{cls:<21} import {startup['import']:5.2f}s, load {startup['load']:5.2f}s, "
+            f"first prediction {startup['first_prediction']:5.2f}s, total {total:5.2f}s, peak RSS {startup['rss'] / 2 ** 20:4.0f}MB"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    batching_parser = subparsers.add_parser('batching', help="Notebook response() versus batched top-k predictions of 1, 32 and 256 utterances.")
+    batching_parser.add_argument('--model', default='models/simple_intent')
+    batching_parser.add_argument('--utterances', type=int, default=2048)
+    batching_parser.set_defaults(run=benchmark_batching)
+
+    micro_batching_parser = subparsers.add_parser('micro-batching', help="Load test of single-utterance requests, direct versus through a MicroBatcher.")
+    micro_batching_parser.add_argument('--model', default='models/simple_intent')
+    micro_batching_parser.add_argument('--utterances', type=int, default=4096)
+    micro_batching_parser.add_argument('--clients', type=int, default=64)
+    micro_batching_parser.add_argument('--max-batch', type=int, default=32)
+    micro_batching_parser.add_argument('--max-wait', type=float, default=0.002, help="Seconds.")
+    micro_batching_parser.set_defaults(run=benchmark_micro_batching)
+
+    normalization_parser = subparsers.add_parser('normalization', help="Cost of the notebook clean() versus normalize() and normalize_batch().")
+    normalization_parser.add_argument('--utterances', type=int, default=100000)
+    normalization_parser.set_defaults(run=benchmark_normalization)
+
+    startup_parser = subparsers.add_parser('startup', help="Startup time and peak memory of IntentClassifier versus LiteIntentClassifier.")
+    startup_parser.add_argument('--model', default='models/simple_intent')
+    startup_parser.set_defaults(run=benchmark_startup)
+
+    args = parser.parse_args()
+    args.run(args)
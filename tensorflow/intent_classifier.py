@@ -0,0 +1,304 @@
+"""
+Local intent classifier: the Embedding + BiLSTM model of tensorflow.ipynb as an importable module.
+
+Train once and save the artifact, then load it in serving processes instead of training at startup:
+
+    python3 intent_classifier.py train data/simple_intent.json models/simple_intent
+    python3 intent_classifier.py evaluate models/simple_intent
+    python3 intent_classifier.py predict models/simple_intent "Muito obrigado"
+    python3 intent_classifier.py export models/simple_intent [--quantize]
+
+`export` adds a TensorFlow Lite model to the directory, served by lite_classifier.LiteIntentClassifier without TensorFlow.
+"""
+import os
+
+# CPU only: the model is small enough that GPU setup costs more than it saves.
+os.environ.setdefault('CUDA_VISIBLE_DEVICES', '-1')
+os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '2')
+
+from tensorflow.keras.preprocessing.sequence import pad_sequences
+from tensorflow.keras.preprocessing.text import Tokenizer, tokenizer_from_json
+from lite_classifier import METADATA_FILE, TFLITE_FILE, TOKENIZER_FILE, encode_texts, top_k
+from normalization import NORMALIZATION_VERSION, normalize_batch
+import json
+import numpy as np
+import random
+import tensorflow as tf
+
+# Evaluation set of the notebook, for data/simple_intent.json.
+NOTEBOOK_TESTS = [
+    ("Oi", "Greeting"),
+    ("Obrigado", "Thanks"),
+    ("Grato", "Thanks"),
+    ("Valeu", "Thanks"),
+    ("vlw", "Thanks"),
+    ("Opa", "Greeting"),
+    ("Dale", "Greeting"),
+    ("oioi", "Greeting"),
+    ("ei", "Greeting"),
+    ("Grata!", "Thanks"),
+    ("Muito obrigada, de verdade", "Thanks"),
+    ("Cancelar", "Cancel"),
+    ("Deixa para outro dia", "Cancel"),
+    ("encerrar", "Cancel"),
+    ("cancela", "Cancel"),
+    ("Esquece", "Cancel"),
+    ("encerra", "Cancel"),
+]
+
+MODEL_DIRECTORY = 'model'
+WEIGHTS_FILE = 'weights.h5'
+
+
+def load_intents(intent_json):
+    """
+    Reads intents in the format of data/intent.json, from a file path or an already loaded dict.
+    Returns the training texts, their intent, and a dict of intent name to responses.
+    """
+    if isinstance(intent_json, str):
+        with open(intent_json, 'r') as json_file:
+            intent_json = json.load(json_file)
+
+    texts, intents, responses = [], [], {}
+    for intent in intent_json['intents']:
+        for text in intent['text']:
+            texts.append(text)
+            intents.append(intent['intent'])
+        responses.setdefault(intent['intent'], []).extend(intent['responses'])
+
+    return texts, intents, responses
+
+
+def build_model(vocabulary_size: int, num_classes: int, embed_dim: int = 300, lstm_num: int = 50):
+    """ The notebook's architecture: Embedding, bidirectional LSTM, and two dense layers with dropout. """
+    model = tf.keras.models.Sequential([
+        tf.keras.layers.Embedding(vocabulary_size, embed_dim),
+        tf.keras.layers.Bidirectional(tf.keras.layers.LSTM(lstm_num, dropout=0.1)),
+        tf.keras.layers.Dense(lstm_num, activation='relu'),
+        tf.keras.layers.Dropout(0.4),
+        tf.keras.layers.Dense(num_classes, activation='softmax')
+    ])
+
+    optimizer = tf.keras.optimizers.Adam(learning_rate=0.001)
+    model.compile(optimizer=optimizer, loss='categorical_crossentropy', metrics=['accuracy'])
+    return model
+
+
+class IntentClassifier:
+    """
+    Trains, saves, loads and runs the notebook's intent model on CPU.
+
+    `predict(texts)` returns `(intent, confidence)` per text, the contract of the local classifiers used by
+    final/fast_path.LocalFastPath and final/nlu_backend.LocalBackend.
+    """
+    def __init__(self, embed_dim: int = 300, lstm_num: int = 50, epochs: int = 100, seed: int = None) -> None:
+        self.embed_dim = embed_dim
+        self.lstm_num = lstm_num
+        self.epochs = epochs
+        self.seed = seed
+        self.model = None
+        self.tokenizer = None
+        self.intents = [] # Output index -> intent name.
+        self.responses = {}
+        self.sequence_length = 0 # Length of the padded training sequences.
+        self._word_index = None
+        self._oov_index = None
+        self._forward = None
+
+    def fit(self, intent_json):
+        """ Trains on intents in the format of data/intent.json (a file path or a loaded dict). Returns self. """
+        if self.seed is not None:
+            tf.keras.utils.set_random_seed(self.seed)
+
+        texts, intents, self.responses = load_intents(intent_json)
+        texts = normalize_batch(texts)
+
+        self.tokenizer = Tokenizer(filters='', oov_token='<unk>')
+        self.tokenizer.fit_on_texts(texts)
+        padded_sequences = pad_sequences(self.tokenizer.texts_to_sequences(texts), padding='pre')
+        self.sequence_length = padded_sequences.shape[1]
+
+        self.intents = list(dict.fromkeys(intents))
+        intent_to_index = {intent: index for index, intent in enumerate(self.intents)}
+        targets = tf.keras.utils.to_categorical(
+            [intent_to_index[intent] for intent in intents],
+            num_classes=len(self.intents),
+            dtype='int32'
+        )
+
+        self.model = build_model(len(self.tokenizer.word_index) + 1, len(self.intents), self.embed_dim, self.lstm_num)
+        self.model.fit(padded_sequences, targets, epochs=self.epochs, verbose=0)
+        self._compile()
+        return self
+
+    def _compile(self):
+        """
+        Prepares the inference path: a plain dict lookup for the vocabulary and a single tf.function graph
+        for the forward pass. Every batch is padded to the training sequence length, so the graph is traced
+        once for any batch size.
+        """
+        self._word_index = dict(self.tokenizer.word_index)
+        self._oov_index = self._word_index.get(self.tokenizer.oov_token, 1)
+        model = self.model
+
+        @tf.function(input_signature=[tf.TensorSpec([None, self.sequence_length], tf.int32)])
+        def forward(sequences):
+            return model(sequences, training=False)
+
+        self._forward = forward
+
+    def encode(self, texts: list):
+        """
+        Normalizes, tokenizes and pre-pads the texts to the training sequence length, keeping the last words of
+        longer texts. Returns an int32 array of shape (len(texts), sequence_length). Same result as the
+        tokenizer's texts_to_sequences followed by pad_sequences, without their per-text overhead.
+        """
+        return encode_texts(texts, self._word_index, self._oov_index, self.sequence_length)
+
+    def predict_proba(self, texts: list, batch_size: int = 256):
+        """
+        Returns the probability of every intent for each text, as a float32 array of shape (len(texts), intents).
+        Texts are run through the compiled forward pass `batch_size` at a time.
+        """
+        if not texts:
+            return np.zeros((0, len(self.intents)), dtype=np.float32)
+
+        sequences = self.encode(texts)
+        return np.concatenate([
+            self._forward(sequences[start:start + batch_size]).numpy()
+            for start in range(0, len(sequences), batch_size)
+        ])
+
+    def predict_top_k(self, texts: list, k: int = 3, batch_size: int = 256):
+        """
+        Returns the `k` most likely intents of each text and their probabilities, from most to least likely,
+        as two arrays of shape (len(texts), k): intent names (object) and probabilities (float32).
+        """
+        return top_k(self.predict_proba(texts, batch_size), self.intents, k)
+
+    def predict(self, texts: list, batch_size: int = 256):
+        """ Returns a list of (intent, confidence), one per text. """
+        probabilities = self.predict_proba(texts, batch_size)
+        indexes = probabilities.argmax(axis=1)
+        return [(self.intents[index], float(probabilities[row, index])) for row, index in enumerate(indexes)]
+
+    def response(self, text: str):
+        """ Returns a random response of the predicted intent and the intent, like the notebook's response(). """
+        intent, _ = self.predict([text])[0]
+        return random.choice(self.responses[intent]), intent
+
+    def evaluate(self, tests: list = NOTEBOOK_TESTS):
+        """ Returns the accuracy on a list of (text, expected intent). """
+        predictions = self.predict([text for text, _ in tests])
+        return sum(predicted == expected for (predicted, _), (_, expected) in zip(predictions, tests)) / len(tests)
+
+    def save(self, directory: str):
+        """
+        Saves the model as a SavedModel (for exports and TensorFlow Serving), its weights (for fast loading),
+        the tokenizer vocabulary and the intents into the directory.
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.model.save(os.path.join(directory, MODEL_DIRECTORY), include_optimizer=False, save_format='tf')
+        self.model.save_weights(os.path.join(directory, WEIGHTS_FILE))
+
+        with open(os.path.join(directory, TOKENIZER_FILE), 'w') as json_file:
+            json_file.write(self.tokenizer.to_json())
+
+        with open(os.path.join(directory, METADATA_FILE), 'w') as json_file:
+            json.dump({
+                'intents': self.intents,
+                'responses': self.responses,
+                'sequence_length': self.sequence_length,
+                'embed_dim': self.embed_dim,
+                'lstm_num': self.lstm_num,
+                'normalization': NORMALIZATION_VERSION,
+            }, json_file, ensure_ascii=False, indent=2)
+
+    def export_tflite(self, directory: str, quantize: bool = False):
+        """
+        Converts the compiled forward pass to TensorFlow Lite, into the directory the classifier was saved to,
+        for lite_classifier.LiteIntentClassifier. The batch size stays dynamic. With `quantize`, the weights
+        are stored as 8 bit integers (a quarter of the size), at the cost of slightly different probabilities.
+        """
+        converter = tf.lite.TFLiteConverter.from_concrete_functions([self._forward.get_concrete_function()], self.model)
+        if quantize:
+            converter.optimizations = [tf.lite.Optimize.DEFAULT]
+
+        model_path = os.path.join(directory, TFLITE_FILE)
+        with open(model_path, 'wb') as model_file:
+            model_file.write(converter.convert())
+        return model_path
+
+    @classmethod
+    def load(cls, directory: str):
+        """
+        Loads a classifier saved with `save`, ready to predict. The model is rebuilt from its weights,
+        which takes a fraction of the time of restoring the SavedModel graph.
+        """
+        with open(os.path.join(directory, METADATA_FILE), 'r') as json_file:
+            metadata = json.load(json_file)
+
+        # The vocabulary only matches texts normalized the way the model was trained.
+        if metadata.get('normalization') != NORMALIZATION_VERSION:
+            raise ValueError(f"{directory} was trained with another text normalization; train it again.")
+
+        classifier = cls(metadata['embed_dim'], metadata['lstm_num'])
+        classifier.intents = metadata['intents']
+        classifier.responses = metadata['responses']
+        classifier.sequence_length = metadata['sequence_length']
+
+        with open(os.path.join(directory, TOKENIZER_FILE), 'r') as json_file:
+            classifier.tokenizer = tokenizer_from_json(json_file.read())
+
+        vocabulary_size = len(classifier.tokenizer.word_index) + 1
+        classifier.model = build_model(vocabulary_size, len(classifier.intents), classifier.embed_dim, classifier.lstm_num)
+        classifier.model.build((None, classifier.sequence_length))
+        classifier.model.load_weights(os.path.join(directory, WEIGHTS_FILE))
+        classifier._compile()
+        return classifier
+
+
+if __name__ == "__main__":
+    import argparse
+    from time import perf_counter
+
+    parser = argparse.ArgumentParser()
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    train_parser = subparsers.add_parser('train', help="Train on an intents file and save the model.")
+    train_parser.add_argument('intents_file')
+    train_parser.add_argument('model_directory')
+    train_parser.add_argument('--epochs', type=int, default=100)
+    train_parser.add_argument('--seed', type=int, default=None)
+
+    evaluate_parser = subparsers.add_parser('evaluate', help="Accuracy of a saved model on the notebook tests.")
+    evaluate_parser.add_argument('model_directory')
+
+    export_parser = subparsers.add_parser('export', help="Add a TensorFlow Lite export of a saved model to its directory.")
+    export_parser.add_argument('model_directory')
+    export_parser.add_argument('--quantize', action='store_true', help="Store the weights as 8 bit integers.")
+
+    predict_parser = subparsers.add_parser('predict', help="Predict the intent of texts with a saved model.")
+    predict_parser.add_argument('model_directory')
+    predict_parser.add_argument('texts', nargs='+')
+
+    args = parser.parse_args()
+
+    if args.command == 'train':
+        start = perf_counter()
+        classifier = IntentClassifier(epochs=args.epochs, seed=args.seed).fit(args.intents_file)
+        classifier.save(args.model_directory)
+        print(f"Trained on {len(classifier.intents)} intents in {perf_counter() - start:.1f}s, saved to {args.model_directory}.")
+    else:
+        start = perf_counter()
+        classifier = IntentClassifier.load(args.model_directory)
+        print(f"Loaded in {(perf_counter() - start) * 1000:.0f}ms.")
+
+        if args.command == 'evaluate':
+            print(f"Accuracy: {classifier.evaluate():.2%}")
+        elif args.command == 'export':
+            model_path = classifier.export_tflite(args.model_directory, args.quantize)
+            print(f"Exported to {model_path} ({os.path.getsize(model_path) / 1024:.0f}KB).")
+        else:
+            for text, (intent, confidence) in zip(args.texts, classifier.predict(args.texts)):
+                print(f"{text}: {intent} ({confidence:.2f})")
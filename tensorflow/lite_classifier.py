@@ -0,0 +1,209 @@
+"""
+Lightweight runtime of the local intent model: runs the TensorFlow Lite export of an IntentClassifier with the
+LiteRT interpreter, without importing TensorFlow, so serving workers start fast and use a fraction of the memory.
+
+    python3 intent_classifier.py export models/simple_intent
+    python3 lite_classifier.py parity models/simple_intent
+    python3 lite_classifier.py predict models/simple_intent "Muito obrigado"
+
+Only NumPy and the interpreter (pip install -r requirements-lite.txt) are needed to serve.
+"""
+from normalization import NORMALIZATION_VERSION, normalize_batch
+from threading import Lock
+import json
+import numpy as np
+import os
+
+TFLITE_FILE = 'model.tflite'
+TOKENIZER_FILE = 'tokenizer.json'
+METADATA_FILE = 'intents.json'
+
+
+def _load_interpreter(model_path: str, num_threads: int = None):
+    """ Loads the model with LiteRT (ai-edge-litert), or with the older tflite-runtime package. """
+    try:
+        from ai_edge_litert.interpreter import Interpreter
+    except ImportError:
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            raise ImportError("Running the exported model needs ai-edge-litert (or tflite-runtime): pip install -r requirements-lite.txt")
+
+    return Interpreter(model_path=model_path, num_threads=num_threads)
+
+
+def read_word_index(tokenizer_json: str):
+    """ Returns the word index and the index of the out of vocabulary token of a Keras Tokenizer saved with to_json(). """
+    config = json.loads(tokenizer_json)['config']
+    word_index = json.loads(config['word_index']) # Nested JSON string, as Keras saves it.
+    return word_index, word_index.get(config['oov_token'], 1)
+
+
+def encode_texts(texts: list, word_index: dict, oov_index: int, length: int):
+    """
+    Normalizes, tokenizes and pre-pads the texts to `length`, keeping the last words of longer texts. Returns an
+    int32 array of shape (len(texts), length), as the tokenizer's texts_to_sequences followed by pad_sequences.
+    """
+    sequences = np.zeros((len(texts), length), dtype=np.int32)
+
+    for row, text in enumerate(normalize_batch(texts)):
+        tokens = [word_index.get(word, oov_index) for word in text.split()][-length:]
+        if tokens:
+            sequences[row, length - len(tokens):] = tokens
+
+    return sequences
+
+
+def top_k(probabilities, intents: list, k: int):
+    """
+    Returns the `k` most likely intents of each row of probabilities and their probabilities, from most to least
+    likely, as two arrays of shape (rows, k): intent names (object) and probabilities.
+    """
+    k = min(k, len(intents))
+
+    top = np.argpartition(-probabilities, k - 1, axis=1)[:, :k]
+    top_probabilities = np.take_along_axis(probabilities, top, axis=1)
+    order = np.argsort(-top_probabilities, axis=1)
+    top = np.take_along_axis(top, order, axis=1)
+
+    return np.asarray(intents, dtype=object)[top], np.take_along_axis(top_probabilities, order, axis=1)
+
+
+class LiteIntentClassifier:
+    """
+    Runs a classifier exported with IntentClassifier.export_tflite. Same predictions and contract as
+    IntentClassifier (`predict`, `predict_proba`, `predict_top_k`), from the exported model, the tokenizer
+    vocabulary and the intents of the saved directory. Thread safe: calls share one interpreter under a lock.
+    """
+    def __init__(self, interpreter, word_index: dict, oov_index: int, intents: list, responses: dict, sequence_length: int) -> None:
+        self.interpreter = interpreter
+        self.word_index = word_index
+        self.oov_index = oov_index
+        self.intents = intents
+        self.responses = responses
+        self.sequence_length = sequence_length
+        self._input_index = interpreter.get_input_details()[0]['index']
+        self._output_index = interpreter.get_output_details()[0]['index']
+        self._batch_size = None # Batch size the interpreter tensors are allocated for.
+        self._lock = Lock()
+
+    @classmethod
+    def load(cls, directory: str, num_threads: int = None):
+        with open(os.path.join(directory, METADATA_FILE), 'r') as json_file:
+            metadata = json.load(json_file)
+
+        if metadata.get('normalization') != NORMALIZATION_VERSION:
+            raise ValueError(f"{directory} was trained with another text normalization; train it again.")
+
+        model_path = os.path.join(directory, TFLITE_FILE)
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"{model_path} does not exist; export it with: python3 intent_classifier.py export {directory}")
+
+        with open(os.path.join(directory, TOKENIZER_FILE), 'r') as json_file:
+            word_index, oov_index = read_word_index(json_file.read())
+
+        return cls(
+            _load_interpreter(model_path, num_threads), word_index, oov_index,
+            metadata['intents'], metadata['responses'], metadata['sequence_length']
+        )
+
+    def encode(self, texts: list):
+        return encode_texts(texts, self.word_index, self.oov_index, self.sequence_length)
+
+    def _run(self, sequences):
+        with self._lock:
+            # Resizing reallocates the tensors, so it is only done when the batch size changes.
+            if len(sequences) != self._batch_size:
+                self.interpreter.resize_tensor_input(self._input_index, sequences.shape)
+                self.interpreter.allocate_tensors()
+                self._batch_size = len(sequences)
+
+            self.interpreter.set_tensor(self._input_index, sequences)
+            self.interpreter.invoke()
+            return self.interpreter.get_tensor(self._output_index).copy()
+
+    def predict_proba(self, texts: list, batch_size: int = 256):
+        """ Returns the probability of every intent for each text, as a float32 array of shape (len(texts), intents). """
+        if not texts:
+            return np.zeros((0, len(self.intents)), dtype=np.float32)
+
+        sequences = self.encode(texts)
+        return np.concatenate([
+            self._run(sequences[start:start + batch_size])
+            for start in range(0, len(sequences), batch_size)
+        ])
+
+    def predict_top_k(self, texts: list, k: int = 3, batch_size: int = 256):
+        return top_k(self.predict_proba(texts, batch_size), self.intents, k)
+
+    def predict(self, texts: list, batch_size: int = 256):
+        """ Returns a list of (intent, confidence), one per text. """
+        probabilities = self.predict_proba(texts, batch_size)
+        indexes = probabilities.argmax(axis=1)
+        return [(self.intents[index], float(probabilities[row, index])) for row, index in enumerate(indexes)]
+
+
+def check_parity(directory: str, tolerance: float = 1e-4):
+    """
+    Compares the exported model with the Keras model of the same directory on the notebook tests.
+    Returns the largest probability difference and the texts whose predicted intent differs.
+    """
+    from intent_classifier import IntentClassifier, NOTEBOOK_TESTS
+
+    texts = [text for text, _ in NOTEBOOK_TESTS]
+    keras_classifier = IntentClassifier.load(directory)
+    lite_classifier = LiteIntentClassifier.load(directory)
+
+    keras_probabilities = keras_classifier.predict_proba(texts)
+    lite_probabilities = lite_classifier.predict_proba(texts)
+
+    difference = float(np.abs(keras_probabilities - lite_probabilities).max())
+    mismatches = [
+        text for text, keras_index, lite_index
+        in zip(texts, keras_probabilities.argmax(axis=1), lite_probabilities.argmax(axis=1))
+        if keras_index != lite_index
+    ]
+
+    for name, probabilities in (("Keras", keras_probabilities), ("TFLite", lite_probabilities)):
+        correct = sum(
+            lite_classifier.intents[index] == expected
+            for index, (_, expected) in zip(probabilities.argmax(axis=1), NOTEBOOK_TESTS)
+        )
+        print(f"{name} accuracy: {correct / len(texts):.2%}")
+    print(f"Largest probability difference: {difference:.2e} (tolerance {tolerance:.0e})")
+    for text in mismatches:
+        print(f"Different intent for {text!r}.")
+
+    return difference, mismatches
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+    from time import perf_counter
+
+    parser = argparse.ArgumentParser()
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    parity_parser = subparsers.add_parser('parity', help="Compare the exported model with the Keras model on the notebook tests.")
+    parity_parser.add_argument('model_directory')
+    parity_parser.add_argument('--tolerance', type=float, default=1e-4, help="Largest probability difference allowed, e.g. 0.05 for a quantized export.")
+
+    predict_parser = subparsers.add_parser('predict', help="Predict the intent of texts with an exported model.")
+    predict_parser.add_argument('model_directory')
+    predict_parser.add_argument('texts', nargs='+')
+
+    args = parser.parse_args()
+
+    if args.command == 'parity':
+        difference, mismatches = check_parity(args.model_directory, args.tolerance)
+        if mismatches or difference > args.tolerance:
+            sys.exit("The exported model does not match the Keras model.")
+        print("The exported model matches the Keras model.")
+    else:
+        start = perf_counter()
+        classifier = LiteIntentClassifier.load(args.model_directory)
+        print(f"Loaded in {(perf_counter() - start) * 1000:.0f}ms.")
+
+        for text, (intent, confidence) in zip(args.texts, classifier.predict(args.texts)):
+            print(f"{text}: {intent} ({confidence:.2f})")
@@ -0,0 +1,200 @@
+"""
+In-process micro-batching in front of the local intent model.
+
+Chat workers classify one utterance at a time, but the model runs a batch of 32 in about the time of a single
+utterance. MicroBatcher collects the utterances sent concurrently by many threads for up to `max_wait` seconds
+or `max_batch` utterances, runs them as one batch and resolves the future of each caller:
+
+    batcher = MicroBatcher(IntentClassifier.load('models/simple_intent').predict, max_batch=32, max_wait=0.002)
+    intent, confidence = batcher.submit("Muito obrigado").result()
+    batcher.close()
+
+A caller waits at most `max_wait` more than the batch it lands in takes to run.
+"""
+from collections import Counter
+from concurrent.futures import Future
+from threading import Lock, Thread
+from time import perf_counter
+import queue
+
+# Sent through the queue to stop the worker.
+_CLOSE = object()
+
+
+class BatcherStats:
+    """ Batch sizes and queue depth of a MicroBatcher. Thread safe. """
+    def __init__(self) -> None:
+        self.batch_sizes = Counter() # Batch size -> batches run.
+        self.batches = 0
+        self.items = 0
+        self.errors = 0 # Batches whose prediction raised.
+        self.queue_depth_total = 0
+        self.max_queue_depth = 0
+        self.busy = 0.0 # Seconds spent running batches.
+        self._lock = Lock()
+
+    def record_batch(self, size: int, queue_depth: int, seconds: float, failed: bool):
+        """ `queue_depth` is the number of utterances still waiting when the batch started running. """
+        with self._lock:
+            self.batch_sizes[size] += 1
+            self.batches += 1
+            self.items += size
+            self.errors += failed
+            self.queue_depth_total += queue_depth
+            self.max_queue_depth = max(self.max_queue_depth, queue_depth)
+            self.busy += seconds
+
+    def mean_batch_size(self):
+        return self.items / self.batches if self.batches else 0.0
+
+    def mean_queue_depth(self):
+        return self.queue_depth_total / self.batches if self.batches else 0.0
+
+    def reset(self):
+        with self._lock:
+            self.batch_sizes.clear()
+            self.batches = self.items = self.errors = 0
+            self.queue_depth_total = self.max_queue_depth = 0
+            self.busy = 0.0
+
+    def summary(self):
+        with self._lock:
+            return {
+                'batches': self.batches,
+                'items': self.items,
+                'errors': self.errors,
+                'mean_batch_size': self.mean_batch_size(),
+                'batch_sizes': dict(sorted(self.batch_sizes.items())),
+                'mean_queue_depth': self.mean_queue_depth(),
+                'max_queue_depth': self.max_queue_depth,
+                'busy': self.busy,
+            }
+
+    def print(self):
+        summary = self.summary()
+        print(
+            f"{summary['items']} utterances in {summary['batches']} batches: mean batch size "
+            f"{summary['mean_batch_size']:.1f}, queue depth mean {summary['mean_queue_depth']:.1f} "
+            f"max {summary['max_queue_depth']}, {summary['errors']} failed batches"
+        )
+
+
+class MicroBatcher:
+    """
+    Runs `predict_batch(items) -> results` (one result per item, e.g. IntentClassifier.predict) on a single
+    worker thread, over batches of the items submitted concurrently.
+
+    The worker takes the first waiting item, then keeps collecting until it has `max_batch` items or `max_wait`
+    seconds have passed since it took the first one. Items that arrive while a batch runs are batched next, so
+    under load the batches fill up without waiting. If `predict_batch` raises, or does not return one result per
+    item, every caller of the batch gets the exception.
+
+    `predict(texts)` has the contract of the local classifiers, so a MicroBatcher can stand in for one.
+    """
+    def __init__(self, predict_batch, max_batch: int = 32, max_wait: float = 0.002) -> None:
+        if max_batch < 1:
+            raise ValueError("max_batch must be at least 1.")
+        if max_wait < 0:
+            raise ValueError("max_wait must not be negative.")
+
+        self.predict_batch = predict_batch
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.stats = BatcherStats()
+        self._queue = queue.SimpleQueue()
+        self._closed = False
+        self._close_lock = Lock() # Makes the closed check and the put of submit atomic with close.
+        self._worker = Thread(target=self._run, name='micro-batcher', daemon=True)
+        self._worker.start()
+
+    def submit(self, item):
+        """ Queues an item and returns a Future of its result. """
+        future = Future()
+        with self._close_lock:
+            if self._closed:
+                raise RuntimeError("The MicroBatcher is closed.")
+            self._queue.put((item, future))
+        return future
+
+    def predict(self, texts: list):
+        """ Submits each text and waits for all of them. Returns one result per text. """
+        futures = [self.submit(text) for text in texts]
+        return [future.result() for future in futures]
+
+    def queue_depth(self):
+        """ Approximate number of items waiting for a batch. """
+        return self._queue.qsize()
+
+    def close(self):
+        """ Runs the items already submitted, then stops the worker. """
+        with self._close_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(_CLOSE)
+        self._worker.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _collect(self, first):
+        """ Returns the batch that starts with `first`, and whether the batcher was closed while collecting. """
+        batch = [first]
+        deadline = perf_counter() + self.max_wait
+
+        while len(batch) < self.max_batch:
+            try:
+                # Items already waiting are taken without blocking, so a full queue never waits for max_wait.
+                entry = self._queue.get_nowait()
+            except queue.Empty:
+                timeout = deadline - perf_counter()
+                if timeout <= 0:
+                    break
+                try:
+                    entry = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+
+            if entry is _CLOSE:
+                return batch, True
+            batch.append(entry)
+
+        return batch, False
+
+    def _run(self):
+        closed = False
+        while not closed:
+            first = self._queue.get()
+            if first is _CLOSE:
+                break
+
+            batch, closed = self._collect(first)
+            queue_depth = self._queue.qsize()
+            batch = [(item, future) for item, future in batch if future.set_running_or_notify_cancel()]
+            items = [item for item, _ in batch]
+            futures = [future for _, future in batch]
+            if not items:
+                continue
+
+            start = perf_counter()
+            try:
+                results = self.predict_batch(items)
+            except Exception as e:
+                self.stats.record_batch(len(items), queue_depth, perf_counter() - start, True)
+                for future in futures:
+                    future.set_exception(e)
+                continue
+
+            if len(results) != len(items):
+                error = ValueError(f"predict_batch returned {len(results)} results for {len(items)} items.")
+                self.stats.record_batch(len(items), queue_depth, perf_counter() - start, True)
+                for future in futures:
+                    future.set_exception(error)
+                continue
+
+            self.stats.record_batch(len(items), queue_depth, perf_counter() - start, False)
+            for future, result in zip(futures, results):
+                future.set_result(result)
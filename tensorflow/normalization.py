@@ -0,0 +1,61 @@
+"""
+Text normalization of the local intent model, used the same way at train and serve time.
+
+"Olá, tudo bem?!" and "ola tudo bem" both become "ola tudo bem": lowercase, accents folded (NFKD without the
+combining marks), and every run of characters that are not letters (digits, punctuation, spaces) replaced by a
+single space.
+"""
+import re
+import unicodedata
+
+# Bumped whenever the output changes, since saved models keep the vocabulary of the normalization they were trained with.
+NORMALIZATION_VERSION = 1
+
+# Combining diacritical marks, which NFKD splits from the accented letters of Portuguese and other Latin scripts.
+_MARKS = re.compile(r'[\u0300-\u036f\u1ab0-\u1aff\u1dc0-\u1dff\u20d0-\u20ff\ufe20-\ufe2f]+')
+
+# Runs of letters: word characters that are not digits or underscores.
+_WORDS = re.compile(r'[^\W\d_]+')
+
+# Byte tables that turn every ASCII character that is not a letter into a space (but keep the batch separator).
+_NON_LETTERS = bytes(code if chr(code).isalpha() else ord(' ') for code in range(256))
+_BATCH_NON_LETTERS = bytes(code if chr(code).isalpha() or chr(code) == '\n' else ord(' ') for code in range(256))
+
+# Joins the texts of a batch, which are normalized as a single string.
+_SEPARATOR = '\n'
+
+
+def _fold(text: str):
+    """ Lowercase text without accents. ASCII text, the common case, skips the Unicode decomposition. """
+    text = text.lower()
+    if text.isascii():
+        return text
+    return _MARKS.sub('', unicodedata.normalize('NFKD', text))
+
+
+def normalize(text: str):
+    """ Returns the normalized text, e.g. "Não, OBRIGADO!!" -> "nao obrigado". """
+    text = _fold(text)
+    if text.isascii():
+        return ' '.join(text.encode('ascii').translate(_NON_LETTERS).decode('ascii').split())
+    return ' '.join(_WORDS.findall(text))
+
+
+def normalize_batch(texts: list):
+    """
+    Returns the normalized texts, like [normalize(text) for text in texts], but faster on many texts: the whole batch
+    is lowercased, folded and stripped of non-letters as a single string.
+    """
+    if not texts:
+        return []
+
+    joined = _SEPARATOR.join(texts)
+    if joined.count(_SEPARATOR) != len(texts) - 1:
+        # Some text has a line break of its own, so the batch cannot be split back.
+        return [normalize(text) for text in texts]
+
+    joined = _fold(joined)
+    if joined.isascii():
+        lines = joined.encode('ascii').translate(_BATCH_NON_LETTERS).decode('ascii').split(_SEPARATOR)
+        return [' '.join(line.split()) for line in lines]
+    return [' '.join(_WORDS.findall(line)) for line in joined.split(_SEPARATOR)]